@@ -0,0 +1,148 @@
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import bindparam, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import changes
+from .schemas import BulkMode
+
+BULK_CHUNK_SIZE = 500
+MAX_BULK_ROWS = 10_000
+
+
+@dataclass
+class BulkOutcome:
+    ids: list
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)
+
+    def fail(self, index: int, detail: str):
+        self.errors.append({"index": index, "detail": detail})
+
+
+# precheck(db, chunk) -> {index: error detail} for rows that cannot be written.
+Precheck = Callable[[Session, list], dict]
+
+
+def _existing_by_key(db: Session, model, pk, key_cols, keys) -> dict:
+    if len(key_cols) == 1:
+        where = key_cols[0].in_([k[0] for k in keys])
+    else:
+        where = tuple_(*key_cols).in_(keys)
+    found = {}
+    for row in db.execute(select(pk, *key_cols).where(where)):
+        found.setdefault(tuple(row[1:]), []).append(row[0])
+    return found
+
+
+def _write_rows(db: Session, model, pk, inserts, updates, outcome: BulkOutcome):
+    if inserts:
+        stmt = insert(model).returning(pk, sort_by_parameter_order=True)
+        new_ids = db.execute(stmt, [row for _, row in inserts]).scalars().all()
+        for (index, _), new_id in zip(inserts, new_ids):
+            outcome.ids[index] = new_id
+        changes.record(db, changes.ENTITY_OF[model], new_ids, "insert")
+    if updates:
+        table = model.__table__
+        stmt = table.update().where(table.c[pk.key] == bindparam("pk_"))
+        if "version" in table.c:
+            stmt = stmt.values(version=table.c.version + 1)
+        params = [
+            {"pk_": row[pk.key], **{k: v for k, v in row.items() if k != pk.key}}
+            for _, row in updates
+        ]
+        db.execute(stmt, params)
+        for index, row in updates:
+            outcome.ids[index] = row[pk.key]
+        changes.record(db, changes.ENTITY_OF[model], [row[pk.key] for _, row in updates])
+
+
+def bulk_write(
+    db: Session,
+    model,
+    rows: Sequence[dict],
+    natural_key: Sequence[str],
+    mode: BulkMode,
+    precheck: Optional[Precheck] = None,
+) -> BulkOutcome:
+    """Insert (or upsert on `natural_key`) `rows` in chunked transactions.
+
+    Each chunk costs one indexed lookup of existing keys, one executemany
+    INSERT and one executemany UPDATE. Rows that cannot be written are
+    reported by index instead of aborting the batch; if a chunk still hits
+    an IntegrityError (e.g. a company deleted meanwhile) it is replayed row
+    by row under savepoints so only the offending rows fail.
+
+    The natural keys are not unique in the schema: POST /api/flights and
+    /api/companies accept repeats, and existing data has them. Upsert is
+    therefore not safe against itself. Two bulk writes of the same new
+    key at the same time can both miss the lookup and both insert it,
+    after which later upserts of that key fail with "matches more than
+    one row". Send concurrent upserts of overlapping keys through one
+    writer.
+    """
+    pk = model.__mapper__.primary_key[0]
+    key_cols = [getattr(model, name) for name in natural_key]
+    outcome = BulkOutcome(ids=[None] * len(rows))
+    seen = {}
+
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = list(enumerate(rows[start : start + BULK_CHUNK_SIZE], start))
+        rejected = precheck(db, chunk) if precheck else {}
+        candidates = []
+        for index, row in chunk:
+            key = tuple(row[name] for name in natural_key)
+            if index in rejected:
+                outcome.fail(index, rejected[index])
+            elif key in seen:
+                outcome.fail(index, f"Duplicate of row {seen[key]} in this batch")
+            else:
+                seen[key] = index
+                candidates.append((index, key, row))
+
+        existing = _existing_by_key(
+            db, model, pk, key_cols, list({key for _, key, _ in candidates})
+        )
+        inserts, updates = [], []
+        for index, key, row in candidates:
+            matches = existing.get(key, [])
+            if not matches:
+                inserts.append((index, row))
+            elif mode is BulkMode.INSERT:
+                outcome.fail(index, "Already exists")
+            elif len(matches) > 1:
+                outcome.fail(index, "Natural key matches more than one row")
+            else:
+                updates.append((index, {pk.key: matches[0], **row}))
+
+        try:
+            _write_rows(db, model, pk, inserts, updates, outcome)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            inserts, updates = _replay_rows(db, model, pk, inserts, updates, outcome)
+            db.commit()
+        outcome.created += len(inserts)
+        outcome.updated += len(updates)
+
+    outcome.errors.sort(key=lambda error: error["index"])
+    return outcome
+
+
+def _replay_rows(db: Session, model, pk, inserts, updates, outcome: BulkOutcome):
+    written = ([], [])
+    for kind, pending in enumerate((inserts, updates)):
+        for index, row in pending:
+            single = ([(index, row)], []) if kind == 0 else ([], [(index, row)])
+            try:
+                with db.begin_nested():
+                    _write_rows(db, model, pk, *single, outcome)
+            except IntegrityError:
+                outcome.ids[index] = None
+                outcome.fail(index, "Rejected by a database constraint")
+            else:
+                written[kind].append((index, row))
+    return written
@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+
+class CacheBackend(ABC):
+    """Response cache keyed on route + query, invalidated by tags.
+
+    Values must be JSON-compatible so every backend can store them.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]: ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, tags: Iterable[str] = ()) -> None: ...
+
+    @abstractmethod
+    def invalidate(self, *tags: str) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU with a per-entry TTL; the default backend."""
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 60.0):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any, tuple]] = OrderedDict()
+        self._tags: dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, tags=()):
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        return super().stats() | {"entries": len(self._entries)}
+
+
+class RedisCache(CacheBackend):
+    """Shared cache for multi-worker deployments (needs the `redis` package).
+
+    Tags are Redis sets of keys; entries expire through Redis TTLs, so
+    evictions are not counted here.
+    """
+
+    def __init__(self, client=None, url: Optional[str] = None, ttl: float = 60.0, prefix: str = "flights-api:"):
+        super().__init__()
+        if client is None:
+            try:
+                import redis
+            except ImportError as exc:
+                raise RuntimeError("CACHE_BACKEND=redis requires the redis package") from exc
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, tags=()):
+        key = self.prefix + key
+        pipe = self.client.pipeline()
+        pipe.set(key, json.dumps(value), ex=self.ttl)
+        for tag in tags:
+            pipe.sadd(self.prefix + "tag:" + tag, key)
+            pipe.expire(self.prefix + "tag:" + tag, self.ttl)
+        pipe.execute()
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            tag_key = self.prefix + "tag:" + tag
+            keys = self.client.smembers(tag_key)
+            if keys:
+                self.client.delete(*keys)
+                self.invalidations += len(keys)
+            self.client.delete(tag_key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class NullCache(CacheBackend):
+    """Caching disabled (CACHE_BACKEND=none)."""
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, tags=()):
+        pass
+
+    def invalidate(self, *tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+def build_cache() -> CacheBackend:
+    backend = os.getenv("CACHE_BACKEND", "lru").lower()
+    ttl = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+    if backend == "none":
+        return NullCache()
+    if backend == "redis":
+        return RedisCache(url=os.getenv("CACHE_REDIS_URL"), ttl=ttl)
+    return LRUCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")), ttl=ttl)
+
+
+response_cache = build_cache()
+
+
+def cache_key(request) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
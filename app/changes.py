@@ -0,0 +1,256 @@
+"""Change feed: the `changes` outbox and the two ways to read it.
+
+Every write to a flight, company or booking inserts a row into `changes`
+(entity, id, op) in the same transaction, so the feed has a change if and
+only if the write committed:
+
+- ORM writes (create, update, patch, delete, company cascades) are
+  picked up after each flush;
+- Core writes call `record()`. Seat inventory and the hold sweeper use
+  it, and so does bulk_write, with the ids they wrote.
+
+A booking whose flight is deleted loses its flight_pk through the foreign
+key. That change happens in the database and is not in the feed.
+
+GET /api/changes?since=<seq> returns the next batch after `since`, each
+change carrying the row as it is now (null once deleted). A consumer
+stores the last seq it applied and asks again. GET /api/changes/stream
+pushes the same records as Server-Sent Events. It catches up from
+`since`, or from Last-Event-ID after a reconnect, and then waits for new
+changes. It wakes at once for writes made in this process, and every
+CHANGES_POLL_SECONDS for writes from other workers, until the client
+disconnects.
+
+Sequence numbers are handed out when a row is inserted, not when its
+transaction commits. A lower seq can therefore become visible after a
+higher one. A batch stops at a gap in the numbers until the rows after
+the gap are CHANGES_SETTLE_SECONDS old, so a reader does not skip past a
+write that is about to commit. Set it above the longest write
+transaction. Rows older than CHANGES_RETENTION_SECONDS are pruned by a
+background task in the app's lifespan, every CHANGES_PRUNE_INTERVAL_SECONDS.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import suppress
+from datetime import timedelta
+from typing import AsyncIterator, Iterable, Optional
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from fastapi import Request
+from sqlalchemy.orm import Session, sessionmaker
+
+from .idempotency import utcnow
+from .models import BookingDB, ChangeDB, CompanyDB, FlightDB
+from .schemas import BookingRead, ChangeRead, CompanyRead, FlightRead
+
+POLL_SECONDS = float(os.getenv("CHANGES_POLL_SECONDS", "1"))
+HEARTBEAT_SECONDS = float(os.getenv("CHANGES_HEARTBEAT_SECONDS", "15"))
+SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "5"))
+RETENTION = timedelta(seconds=int(os.getenv("CHANGES_RETENTION_SECONDS", str(7 * 24 * 3600))))
+MAX_STREAMS = int(os.getenv("CHANGES_MAX_STREAMS", "100"))
+PRUNE_INTERVAL = float(os.getenv("CHANGES_PRUNE_INTERVAL_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+# entity name -> (model, read schema)
+ENTITIES = {
+    "flight": (FlightDB, FlightRead),
+    "company": (CompanyDB, CompanyRead),
+    "booking": (BookingDB, BookingRead),
+}
+ENTITY_OF = {model: name for name, (model, _) in ENTITIES.items()}
+
+_changes = ChangeDB.__table__
+_WRITTEN = "changes_written"
+
+
+def record(session: Session, entity: str, ids: Iterable[int], op: str = "update") -> None:
+    """Add changes for these rows to the session's current transaction."""
+    now = utcnow()
+    rows = [
+        {"entity": entity, "entity_id": entity_id, "op": op, "changed_at": now}
+        for entity_id in ids
+        if entity_id is not None
+    ]
+    if rows:
+        session.connection().execute(insert(_changes), rows)
+        session.info[_WRITTEN] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _record_orm_writes(session, flush_context):
+    # new/dirty/deleted still describe what this flush wrote; the new
+    # rows have their ids by now.
+    writes = defaultdict(list)
+    for op, instances in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for instance in instances:
+            entity = ENTITY_OF.get(type(instance))
+            if entity is None or (op == "update" and not session.is_modified(instance, include_collections=False)):
+                continue
+            mapper = inspect(instance).mapper
+            writes[entity, op].append(mapper.primary_key_from_instance(instance)[0])
+    for (entity, op), ids in writes.items():
+        record(session, entity, ids, op)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_streams(session):
+    if session.info.pop(_WRITTEN, False):
+        notifier.notify()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_on_rollback(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_WRITTEN, None)
+
+
+def prune(db: Session) -> int:
+    """Delete changes past retention in the session's transaction; returns rows removed."""
+    return db.execute(delete(_changes).where(_changes.c.changed_at < utcnow() - RETENTION)).rowcount
+
+
+def _prune_committed(session_factory: sessionmaker) -> int:
+    with session_factory() as db:
+        removed = prune(db)
+        db.commit()
+    return removed
+
+
+async def run_pruner(session_factory: sessionmaker, interval: float = PRUNE_INTERVAL):
+    """Prune forever, off the event loop; cancel the task to stop it."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_prune_committed, session_factory)
+        except Exception:
+            logger.exception("change feed prune failed")
+
+
+def head(db: Session) -> int:
+    """The newest seq, or 0 for an empty feed."""
+    return db.execute(select(func.coalesce(func.max(_changes.c.seq), 0))).scalar_one()
+
+
+def _settled(rows: list, since: int) -> list:
+    """`rows` up to the first gap whose later rows are still too new to trust."""
+    cutoff = utcnow() - timedelta(seconds=SETTLE_SECONDS)
+    expected, settled = since + 1, []
+    for row in rows:
+        if row.seq != expected and row.changed_at > cutoff:
+            break
+        settled.append(row)
+        expected = row.seq + 1
+    return settled
+
+
+def read_changes(db: Session, since: int, limit: int) -> list:
+    """Up to `limit` changes after `since`, as ChangeRead dicts, each with its row's current state."""
+    stmt = select(_changes).where(_changes.c.seq > since).order_by(_changes.c.seq).limit(limit)
+    rows = _settled(db.execute(stmt).all(), since)
+
+    wanted = defaultdict(set)
+    for row in rows:
+        wanted[row.entity].add(row.entity_id)
+    current = {}
+    for entity, ids in wanted.items():
+        model, schema = ENTITIES[entity]
+        pk = model.__mapper__.primary_key[0]
+        for instance in db.execute(select(model).where(pk.in_(ids))).scalars():
+            current[entity, getattr(instance, pk.key)] = schema.model_validate(instance).model_dump(mode="json")
+    return [
+        ChangeRead(
+            seq=row.seq, entity=row.entity, id=row.entity_id, op=row.op, changed_at=row.changed_at,
+            data=current.get((row.entity, row.entity_id)),
+        ).model_dump(mode="json")
+        for row in rows
+    ]
+
+
+class Notifier:
+    """Wakes the change streams of this process after a commit that wrote changes.
+
+    Commits happen on threadpool threads, so each waiting stream's event is
+    set through its own loop.
+    """
+
+    def __init__(self):
+        self._waiters = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Event:
+        wake = asyncio.Event()
+        with self._lock:
+            self._waiters.add((asyncio.get_running_loop(), wake))
+        return wake
+
+    def unsubscribe(self, wake: asyncio.Event) -> None:
+        with self._lock:
+            self._waiters = {(loop, event) for loop, event in self._waiters if event is not wake}
+
+    def notify(self) -> None:
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, wake in waiters:
+            # The loop may already be closed.
+            with suppress(RuntimeError):
+                loop.call_soon_threadsafe(wake.set)
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+
+notifier = Notifier()
+
+
+def _read(session_factory: sessionmaker, read, *args):
+    # A session per read, closed straight away, so no connection is held
+    # while the stream waits.
+    with session_factory() as db:
+        return read(db, *args)
+
+
+def sse_event(change: dict) -> str:
+    return f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change, separators=(',', ':'))}\n\n"
+
+
+async def stream(
+    session_factory: sessionmaker, request: Request, since: Optional[int], limit: int
+) -> AsyncIterator[str]:
+    """Server-Sent Events for every change after `since` (or from now on).
+
+    Batches are read only as fast as the client takes them: the next
+    batch is fetched after the last event was sent, so a slow consumer
+    holds back its own stream and nothing queues up in memory. A comment
+    line every CHANGES_HEARTBEAT_SECONDS keeps proxies from closing an
+    idle stream. The stream ends, and gives up its slot, once the client
+    has disconnected.
+    """
+    wake = notifier.subscribe()
+    try:
+        if since is None:
+            since = await asyncio.to_thread(_read, session_factory, head)
+        yield f"retry: {int(POLL_SECONDS * 1000)}\n\n"
+        quiet_since = time.monotonic()
+        while not await request.is_disconnected():
+            wake.clear()
+            batch = await asyncio.to_thread(_read, session_factory, read_changes, since, limit)
+            for change in batch:
+                yield sse_event(change)
+                since = change["seq"]
+            if batch:
+                quiet_since = time.monotonic()
+                if len(batch) == limit:
+                    continue
+            elif time.monotonic() - quiet_since >= HEARTBEAT_SECONDS:
+                yield ": keep-alive\n\n"
+                quiet_since = time.monotonic()
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(wake.wait(), POLL_SECONDS)
+    finally:
+        notifier.unsubscribe(wake)
@@ -1,10 +1,153 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from .pool import PoolStats, TimedAsyncQueuePool, TimedQueuePool
+from .replicas import Replica, ReplicaSet
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
\ No newline at end of file
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _env_int(name: str, default: int = None):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+# Optional read replicas for the GET routes, comma-separated; see app.replicas.
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URL", "").split(",") if url.strip()]
+
+# DB_ASYNC=true serves the API routes from an AsyncSession (aiosqlite /
+# psycopg async) on the event loop instead of Starlette's threadpool.
+DB_ASYNC = _env_flag("DB_ASYNC")
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching asyncio driver."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    elif backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+psycopg")
+    return parsed.render_as_string(hide_password=False)
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url: str, *, asyncio: bool = False) -> dict:
+    """create_engine() keyword arguments from the DB_* environment.
+
+    DB_POOL_SIZE / DB_MAX_OVERFLOW size the pool per worker process, so a
+    deployment running N workers opens at most N * (size + overflow)
+    connections. DB_POOL_TIMEOUT is how long a checkout waits for a free
+    connection before failing. Stale connections are recycled after
+    DB_POOL_RECYCLE seconds instead of being pinged on every checkout;
+    set DB_POOL_PRE_PING=true where the network drops idle connections
+    faster than that. DB_STATEMENT_TIMEOUT_MS caps a single statement on
+    PostgreSQL.
+    """
+    parsed = make_url(url)
+    options = {
+        "echo": _env_flag("SQL_ECHO"),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING"),
+    }
+    # In-memory SQLite has to stay on its single-connection pool: a
+    # QueuePool would hand every checkout its own empty database.
+    if _is_memory_sqlite(parsed):
+        return options
+
+    options["poolclass"] = TimedAsyncQueuePool if asyncio else TimedQueuePool
+    options["pool_size"] = _env_int("DB_POOL_SIZE", 5)
+    options["max_overflow"] = _env_int("DB_MAX_OVERFLOW", 10)
+    options["pool_timeout"] = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    options["pool_recycle"] = _env_int("DB_POOL_RECYCLE", 1800)
+
+    statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS")
+    if statement_timeout and parsed.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+def configure_sqlite(engine) -> None:
+    """Apply the dev-only SQLite pragmas on every new connection.
+
+    SQLITE_WAL=true switches file databases to write-ahead logging so
+    readers no longer block behind a writer; SQLITE_SYNCHRONOUS (OFF,
+    NORMAL, FULL) trades durability on power loss for fewer fsyncs.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    wal = _env_flag("SQLITE_WAL") and not _is_memory_sqlite(engine.url)
+    synchronous = os.getenv("SQLITE_SYNCHRONOUS", "").upper()
+    if synchronous and synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        raise RuntimeError(f"SQLITE_SYNCHRONOUS must be OFF, NORMAL, FULL or EXTRA, not {synchronous!r}")
+    if not (wal or synchronous):
+        return
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        if synchronous:
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.close()
+
+
+def instrument(engine):
+    configure_sqlite(engine)
+    engine.pool.stats = PoolStats().attach(engine)
+    return engine
+
+
+def pool_status(bind) -> dict:
+    """Checkout counters and live pool gauges for /metrics/pool."""
+    stats = getattr(bind.pool, "stats", None) or PoolStats()
+    return stats.snapshot(bind.pool)
+
+
+def dispose_after_fork() -> None:
+    """Drop the pooled connections a forked worker inherited from its parent.
+
+    With gunicorn's preload the engines are built before the fork, so
+    each worker must start from an empty pool instead of sharing sockets
+    with its siblings. close=False leaves those sockets to the parent.
+    """
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+    replicas.dispose(close=False)
+
+
+def connect_replica(name: str, url: str) -> Replica:
+    """A Replica with the same pool settings and pragmas as the primary."""
+    sync_engine = instrument(create_engine(url, **engine_options(url)))
+    replica_async_engine = None
+    if DB_ASYNC:
+        async_url = async_database_url(url)
+        replica_async_engine = create_async_engine(async_url, **engine_options(async_url, asyncio=True))
+        instrument(replica_async_engine.sync_engine)
+    return Replica(name, sync_engine, replica_async_engine)
+
+
+engine = instrument(create_engine(DATABASE_URL, **engine_options(DATABASE_URL)))
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    _async_url = async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(_async_url, **engine_options(_async_url, asyncio=True))
+    instrument(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+replicas = ReplicaSet(connect_replica(f"replica-{n}", url) for n, url in enumerate(DATABASE_READ_URLS))
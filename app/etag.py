@@ -0,0 +1,68 @@
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import inspect
+
+
+def make_etag(*parts) -> str:
+    return '"' + ".".join(str(part) for part in parts) + '"'
+
+
+def flight_etag(flight) -> str:
+    # The flight detail embeds its company, so both versions are part of it.
+    return make_etag("f", flight.id, flight.version, flight.company_id, flight.company.version)
+
+
+def company_etag(company) -> str:
+    return make_etag("c", company.company_id, company.version)
+
+
+def booking_etag(booking) -> str:
+    return make_etag("b", booking.id, booking.version)
+
+
+def collection_etag(
+    rows: Iterable, key: str = "id", next_cursor: Optional[str] = None, embedded: Optional[str] = None
+) -> str:
+    """Strong ETag for a page: it changes iff its rows or their versions change.
+
+    `embedded` names a relationship whose rows are part of the body too
+    (?include=), so their identities and versions are hashed with each row.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        digest.update(f"{getattr(row, key)}:{row.version},".encode())
+        if embedded:
+            related = getattr(row, embedded)
+            for child in related if isinstance(related, list) else [related]:
+                if child is not None:
+                    digest.update(f"{embedded}{inspect(child).identity}:{child.version},".encode())
+    digest.update((next_cursor or "").encode())
+    return '"' + digest.hexdigest() + '"'
+
+
+def _listed(header: str) -> list:
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A bodiless 304 when If-None-Match already names `etag`, else None."""
+    header = request.headers.get("if-none-match")
+    if header and (header.strip() == "*" or etag in _listed(header)):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def wants_precondition(request: Request) -> bool:
+    return "if-match" in request.headers
+
+
+def check_if_match(request: Request, etag: str):
+    """Optimistic concurrency: refuse the write unless If-Match names `etag`."""
+    header = request.headers.get("if-match")
+    if header is None or header.strip() == "*":
+        return
+    # If-Match uses strong comparison, so weak validators never match.
+    if etag not in [tag.strip() for tag in header.split(",")]:
+        raise HTTPException(status_code=412, detail="Precondition failed")
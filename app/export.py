@@ -0,0 +1,34 @@
+from typing import Callable, Iterator
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+EXPORT_BATCH_SIZE = 1000
+
+
+def _ndjson_chunks(
+    db: Session, stmt: Select, serialize: Callable[[object], str]
+) -> Iterator[bytes]:
+    # The request's dependency cleanup may already have run by the time the
+    # body is streamed, so the generator owns the session from here on.
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.scalars().partitions():
+            yield "".join(serialize(row) + "\n" for row in rows).encode()
+    finally:
+        db.close()
+
+
+def ndjson_export(
+    db: Session, stmt: Select, serialize: Callable[[object], str]
+) -> StreamingResponse:
+    """Stream `stmt` as newline-delimited JSON, one batch of rows per chunk.
+
+    Rows are fetched with yield_per (a server-side cursor on Postgres), so
+    memory stays flat regardless of table size.
+    """
+    return StreamingResponse(
+        _ndjson_chunks(db, stmt, serialize), media_type=NDJSON_MEDIA_TYPE
+    )
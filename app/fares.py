@@ -0,0 +1,162 @@
+"""Fare calendar: the `route_days` summary and how it is kept current.
+
+A route day is (origin_norm, destination_norm, departure day). Its row holds
+the lowest price among that day's flights that still have seats, the seats
+left and the number of flights. Rows are recomputed from `flights` per key,
+in the same transaction as the write that changed them:
+
+- ORM writes to FlightDB (create, update, patch, delete, company cascade)
+  are picked up at flush, from the old and new values of each row.
+- Core writes call `touch()`: seat inventory and bulk writes with the
+  flight ids they wrote, bulk upserts also with the keys the rows had
+  before.
+
+On commit the touched keys are recomputed, each one an index range scan
+over a single route and day plus an in-place UPDATE of its summary row.
+"""
+import itertools
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import Connection, and_, bindparam, event, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from .models import FlightDB, RouteDayDB
+
+RouteDay = tuple[str, str, date]
+
+# Longest range one calendar request may cover.
+MAX_CALENDAR_DAYS = 366
+
+_PENDING = "route_days"
+
+_flights = FlightDB.__table__
+_route_days = RouteDayDB.__table__
+
+# What a write reports so its route day can be refreshed.
+ROUTE_DAY_COLUMNS = (_flights.c.origin_norm, _flights.c.destination_norm, _flights.c.departure_at)
+SUMMARY_COLUMNS = (*ROUTE_DAY_COLUMNS, _flights.c.price_amount, _flights.c.business_seats + _flights.c.economy_seats)
+
+# Built once: these run on every commit that touches a flight or its seats.
+_DAY_FLIGHTS = select(*SUMMARY_COLUMNS).where(
+    _flights.c.origin_norm == bindparam("key_origin"),
+    _flights.c.destination_norm == bindparam("key_destination"),
+    _flights.c.departure_at >= bindparam("day_start"),
+    _flights.c.departure_at < bindparam("day_end"),
+)
+_ROUTE_DAY = and_(
+    _route_days.c.origin_norm == bindparam("key_origin"),
+    _route_days.c.destination_norm == bindparam("key_destination"),
+    _route_days.c.day == bindparam("key_day"),
+)
+# SET clause taken from the min_price, seats and flights parameters.
+_UPDATE_DAY = _route_days.update().where(_ROUTE_DAY)
+_DELETE_DAY = _route_days.delete().where(_ROUTE_DAY)
+
+
+def summarise(rows: Iterable) -> dict:
+    """`route_days` rows, keyed by route day, from SUMMARY_COLUMNS rows."""
+    days = {}
+    for origin, destination, departure_at, price, seats in rows:
+        key = (origin, destination, departure_at.date())
+        day = days.get(key)
+        if day is None:
+            day = days[key] = {"origin_norm": origin, "destination_norm": destination, "day": key[2], "min_price": None, "seats": 0, "flights": 0}
+        day["flights"] += 1
+        day["seats"] += seats
+        if seats > 0 and price is not None and (day["min_price"] is None or price < day["min_price"]):
+            day["min_price"] = price
+    return days
+
+
+def refresh_route_days(conn: Connection, keys: Iterable[RouteDay]) -> None:
+    """Recompute the `route_days` rows for `keys` inside `conn`'s transaction.
+
+    The row is updated in place when it exists, so the usual case (seats
+    or a price changed) is one SELECT and one UPDATE per key.
+    """
+    for origin, destination, day in keys:
+        start = datetime.combine(day, time.min)
+        key = {"key_origin": origin, "key_destination": destination, "key_day": day}
+        rows = conn.execute(_DAY_FLIGHTS, {**key, "day_start": start, "day_end": start + timedelta(days=1)})
+        summary = summarise(rows).get((origin, destination, day))
+        if summary is None:
+            conn.execute(_DELETE_DAY, key)
+            continue
+        totals = {name: summary[name] for name in ("min_price", "seats", "flights")}
+        if conn.execute(_UPDATE_DAY, {**key, **totals}).rowcount == 0:
+            conn.execute(insert(_route_days), summary)
+
+
+def rebuild_route_days(conn: Connection, batch_size: int = 1000) -> int:
+    """Recompute the whole `route_days` table from `flights`; returns its rows.
+
+    For rows written behind the ORM's back in bulk, such as a migration
+    backfill or a seeded benchmark database.
+    """
+    conn.execute(_route_days.delete())
+    days = list(summarise(conn.execute(select(*SUMMARY_COLUMNS).where(_flights.c.departure_at.is_not(None)))).values())
+    for start in range(0, len(days), batch_size):
+        conn.execute(insert(_route_days), days[start : start + batch_size])
+    return len(days)
+
+
+def route_days_where(bind, *criteria) -> set:
+    """The route days of the flights matching `criteria`."""
+    stmt = select(*ROUTE_DAY_COLUMNS).where(_flights.c.departure_at.is_not(None), *criteria)
+    return {(origin, destination, departure_at.date()) for origin, destination, departure_at in bind.execute(stmt)}
+
+
+def route_day(origin: Optional[str], destination: Optional[str], departure_at: Optional[datetime]) -> Optional[RouteDay]:
+    """The route day of a flight, from its ROUTE_DAY_COLUMNS values."""
+    if origin is None or destination is None or departure_at is None:
+        return None
+    return (origin, destination, departure_at.date())
+
+
+def _pending(session: Session) -> dict:
+    return session.info.setdefault(_PENDING, {"keys": set(), "flights": set()})
+
+
+def touch(session: Session, keys: Iterable[RouteDay] = (), flights: Iterable[int] = ()):
+    """Recompute these route days, and those of these flights, when the
+    session's transaction commits."""
+    pending = _pending(session)
+    pending["keys"].update(keys)
+    pending["flights"].update(flights)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_flight_writes(session, flush_context, instances):
+    keys = set()
+    for flight in itertools.chain(session.new, session.dirty, session.deleted):
+        if not isinstance(flight, FlightDB):
+            continue
+        state = inspect(flight)
+        histories = [state.attrs[column.key].history for column in ROUTE_DAY_COLUMNS]
+        keys.add(route_day(*(h.added[0] if h.added else (h.unchanged or [None])[0] for h in histories)))
+        keys.add(route_day(*(h.deleted[0] if h.deleted else (h.unchanged or h.added or [None])[0] for h in histories)))
+    keys.discard(None)
+    if keys:
+        touch(session, keys)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_on_commit(session):
+    # before_commit runs ahead of the final flush; flush now so flight
+    # writes still pending in the session are collected too.
+    session.flush()
+    pending = session.info.pop(_PENDING, None)
+    if pending is None:
+        return
+    conn = session.connection()
+    keys = pending["keys"]
+    if pending["flights"]:
+        keys |= route_days_where(conn, _flights.c.id.in_(pending["flights"]))
+    refresh_route_days(conn, keys)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_on_rollback(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
@@ -0,0 +1,68 @@
+"""Sparse fieldsets: `?fields=id,origin,price` on list reads.
+
+A fieldset narrows both ends of a list call. The SELECT only loads the
+requested columns (plus the ones paging and ETags need), and the rows are
+validated into a model with just those fields. Unloaded columns are set
+to raise on access, so nothing can quietly lazy-load them one row at a time.
+"""
+import functools
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, TypeAdapter, create_model
+from sqlalchemy import Select
+from sqlalchemy.orm import load_only
+
+from .schemas import BookingRead, FlightRead
+
+FIELDS_DESCRIPTION = "Comma-separated subset of the response fields to return"
+
+
+def parse_fields(model: type[BaseModel], fields: Optional[str]) -> Optional[tuple]:
+    """The requested field names in the model's declared order, or None for all."""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - model.model_fields.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if not requested:
+        raise HTTPException(status_code=400, detail="fields must name at least one field")
+    if requested == model.model_fields.keys():
+        return None
+    return tuple(name for name in model.model_fields if name in requested)
+
+
+def flight_fields(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)) -> Optional[tuple]:
+    return parse_fields(FlightRead, fields)
+
+
+def booking_fields(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)) -> Optional[tuple]:
+    return parse_fields(BookingRead, fields)
+
+
+@functools.lru_cache(maxsize=256)
+def subset_model(model: type[BaseModel], names: tuple) -> type[BaseModel]:
+    """`model` cut down to `names`; field types, constraints and serializers carry over."""
+    return create_model(
+        f"{model.__name__}Fields",
+        __config__=model.model_config,
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in names},
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def subset_list_adapter(model: type[BaseModel], names: tuple) -> TypeAdapter:
+    return TypeAdapter(list[subset_model(model, names)])
+
+
+def load_fields(stmt: Select, entity, names: tuple, keys: Sequence = ()) -> Select:
+    """Restrict `stmt` to the columns behind `names`.
+
+    `keys` are the pagination keys; they and the row version are always
+    loaded because the next cursor and the collection ETag read them.
+    """
+    columns = {name: getattr(entity, name) for name in names}
+    columns.update((key.key, key) for key in keys if key.class_ is entity)
+    columns["version"] = entity.version
+    return stmt.options(load_only(*columns.values(), raiseload=True))
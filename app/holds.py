@@ -0,0 +1,130 @@
+"""Expiry of pending bookings and the background sweeper that enforces it.
+
+A booking that is still "pending" BOOKING_HOLD_TTL_SECONDS after it was
+created has its hold cancelled and its seats returned to the flight. The
+sweeper runs inside the app's lifespan every BOOKING_SWEEP_INTERVAL_SECONDS
+and works in batches of BOOKING_SWEEP_BATCH_SIZE: each batch picks the
+oldest expired holds off ix_bookings_status_created_at, cancels them in one
+UPDATE that re-checks the status, and releases their seats with one UPDATE
+per flight and seat class, all in one transaction. Holds are kept forever
+when the TTL is 0, the default.
+
+Several workers may sweep at once. On PostgreSQL each skips rows another
+has locked; elsewhere the status check in the UPDATE means a hold is only
+cancelled, and its seats only released, once.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import changes, metrics
+from .inventory import release_seats
+from .models import BookingDB
+from .schemas import BookingStatus
+
+logger = logging.getLogger(__name__)
+
+HOLD_TTL = timedelta(seconds=int(os.getenv("BOOKING_HOLD_TTL_SECONDS", "0")))
+SWEEP_INTERVAL = float(os.getenv("BOOKING_SWEEP_INTERVAL_SECONDS", "30"))
+SWEEP_BATCH_SIZE = int(os.getenv("BOOKING_SWEEP_BATCH_SIZE", "500"))
+
+EXPIRED = metrics.registry.counter("booking_holds_expired_total", "Pending bookings cancelled because their hold expired.")
+SWEEP_LAG = metrics.registry.gauge(
+    "booking_hold_sweep_lag_seconds", "How long past its expiry the most overdue hold was when the last sweep reached it."
+)
+SWEEP_BATCH_TIME = metrics.registry.histogram("booking_hold_sweep_batch_seconds", "Duration of one sweeper batch.")
+LAST_SWEEP = metrics.registry.gauge("booking_hold_sweep_last_run_timestamp_seconds", "When the sweeper last finished a run.")
+
+_bookings = BookingDB.__table__
+
+# Called with the ids of the flights that got seats back, after commit.
+SeatsReleased = Callable[..., None]
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive UTC timestamps, PostgreSQL aware ones.
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _sweep_batch(db: Session, cutoff: datetime, batch_size: int) -> tuple:
+    """Cancel up to `batch_size` expired holds; returns (rows, flight ids)."""
+    pick = (
+        select(_bookings.c.id)
+        .where(_bookings.c.status == BookingStatus.PENDING.value, _bookings.c.created_at < cutoff)
+        .order_by(_bookings.c.created_at, _bookings.c.id)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        pick = pick.with_for_update(skip_locked=True)
+    ids = db.execute(pick).scalars().all()
+    if not ids:
+        return [], set()
+    cancel = (
+        _bookings.update()
+        .where(_bookings.c.id.in_(ids), _bookings.c.status == BookingStatus.PENDING.value)
+        .values(status=BookingStatus.CANCELLED.value, version=_bookings.c.version + 1, updated_at=func.now())
+        .returning(_bookings.c.flight_pk, _bookings.c.seat_class, _bookings.c.seats, _bookings.c.created_at, _bookings.c.id)
+    )
+    cancelled = db.execute(cancel).all()
+    changes.record(db, "booking", [row.id for row in cancelled])
+    held = defaultdict(int)
+    for flight_pk, seat_class, seats, *_ in cancelled:
+        if flight_pk is not None:
+            held[flight_pk, seat_class] += seats
+    for (flight_pk, seat_class), seats in held.items():
+        release_seats(db, flight_pk, seat_class, seats)
+    db.commit()
+    return cancelled, {flight_pk for flight_pk, _ in held}
+
+
+def sweep_expired_holds(
+    session_factory: sessionmaker,
+    ttl: timedelta = HOLD_TTL,
+    batch_size: int = SWEEP_BATCH_SIZE,
+    on_released: Optional[SeatsReleased] = None,
+) -> int:
+    """Cancel every hold older than `ttl`, batch by batch; returns how many."""
+    now = datetime.now(timezone.utc)
+    cutoff = now - ttl
+    total, lag = 0, 0.0
+    while True:
+        started = time.perf_counter()
+        with session_factory() as db:
+            cancelled, flights = _sweep_batch(db, cutoff, batch_size)
+        SWEEP_BATCH_TIME.observe(time.perf_counter() - started)
+        if cancelled:
+            oldest = min(_utc(row.created_at) for row in cancelled)
+            lag = max(lag, (datetime.now(timezone.utc) - (oldest + ttl)).total_seconds())
+            total += len(cancelled)
+            EXPIRED.inc(amount=len(cancelled))
+            if on_released is not None and flights:
+                on_released(*flights)
+        if len(cancelled) < batch_size:
+            break
+    SWEEP_LAG.set(lag)
+    LAST_SWEEP.set(time.time())
+    return total
+
+
+async def run_sweeper(session_factory: sessionmaker, on_released: Optional[SeatsReleased] = None, interval: float = SWEEP_INTERVAL):
+    """Sweep forever, off the event loop; cancel the task to stop it."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(sweep_expired_holds, session_factory, on_released=on_released)
+        except Exception:
+            logger.exception("booking hold sweep failed")
+
+
+def start_sweeper(session_factory: sessionmaker, on_released: Optional[SeatsReleased] = None) -> Optional[asyncio.Task]:
+    """The sweeper task for the app's lifespan, or None when holds never expire."""
+    if not HOLD_TTL:
+        return None
+    return asyncio.create_task(run_sweeper(session_factory, on_released))
@@ -0,0 +1,139 @@
+"""Idempotency-Key support for POST writes that clients retry.
+
+A request that carries an Idempotency-Key header claims the key by
+inserting a row into `idempotency_keys`. The table's primary key is what
+turns concurrent duplicates away: the second INSERT waits on the first
+writer's index entry and then fails, so there is no read-then-write window.
+The row keeps a hash of the request and, once the write has succeeded, the
+status and JSON body it answered with. A retry with the same key gets that
+response back, marked with Idempotent-Replayed, without running the write
+again. A key reused for a different request is refused with 422.
+
+Rows expire IDEMPOTENCY_TTL_SECONDS after they were claimed. Expired rows
+are deleted by later claims, at most once every SWEEP_INTERVAL seconds per
+process, through the index on expires_at.
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import IdempotencyKeyDB
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_TTL = timedelta(seconds=int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")))
+SWEEP_INTERVAL = 60.0
+
+_keys = IdempotencyKeyDB.__table__
+_last_sweep = 0.0
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def fingerprint(request: Request, payload) -> str:
+    """Hash of what makes two requests the same write: route, query and body."""
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url.path}?{sorted(request.query_params.multi_items())}".encode())
+    digest.update(json.dumps(payload, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def sweep_expired(db: Session) -> int:
+    """Delete expired keys in the session's transaction; returns rows removed."""
+    return db.execute(delete(_keys).where(_keys.c.expires_at < utcnow())).rowcount
+
+
+def _maybe_sweep(db: Session):
+    global _last_sweep
+    now = time.monotonic()
+    if now - _last_sweep >= SWEEP_INTERVAL:
+        _last_sweep = now
+        sweep_expired(db)
+
+
+@dataclass(frozen=True)
+class IdempotentRequest:
+    scope: str
+    key: str
+    request_hash: str
+
+    @property
+    def _where(self):
+        return (_keys.c.scope == self.scope, _keys.c.key == self.key)
+
+    def _insert(self, db: Session):
+        values = {"scope": self.scope, "key": self.key, "request_hash": self.request_hash, "expires_at": utcnow() + IDEMPOTENCY_TTL}
+        db.execute(insert(_keys).values(values))
+
+    def acquire(self, db: Session, commit: bool = False) -> Optional[Response]:
+        """Claim the key, or return the response to send instead of running the write.
+
+        The claim is part of the session's transaction, so a write that
+        completes the key and commits with it is replayed exactly when it
+        happened. With `commit`, the claim is committed straight away, for
+        writes that commit more than once; those must `release()` the key
+        if they fail.
+        """
+        for _ in range(2):
+            try:
+                self._insert(db)
+            except IntegrityError:
+                # The claim is the write's first statement, so rolling back
+                # here loses nothing.
+                db.rollback()
+                row = db.execute(select(_keys).where(*self._where)).one_or_none()
+                if row is None:
+                    # Its writer rolled back in the meantime: try again.
+                    continue
+                if row.expires_at < utcnow():
+                    db.execute(delete(_keys).where(*self._where, _keys.c.expires_at < utcnow()))
+                    continue
+                db.rollback()
+                return self._answer(row)
+            _maybe_sweep(db)
+            if commit:
+                db.commit()
+            return None
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress")
+
+    def _answer(self, row) -> Response:
+        if row.request_hash != self.request_hash:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+        if row.status_code is None:
+            raise HTTPException(status_code=409, detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress")
+        return Response(row.response, status_code=row.status_code, media_type="application/json", headers={REPLAYED_HEADER: "true"})
+
+    def complete(self, db: Session, status_code: int, body: bytes):
+        """Store the response for replays; it is saved when the session commits."""
+        stmt = _keys.update().where(*self._where).values(status_code=status_code, response=body.decode())
+        db.execute(stmt)
+
+    def release(self, db: Session):
+        """Give up a committed claim so the client can retry the write."""
+        db.execute(delete(_keys).where(*self._where, _keys.c.status_code.is_(None)))
+        db.commit()
+
+
+def idempotent_request(request: Request, payload) -> Optional[IdempotentRequest]:
+    """The request's idempotency claim, or None when it sent no key."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+    return IdempotentRequest(f"{request.method} {request.url.path}", key, fingerprint(request, payload))
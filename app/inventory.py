@@ -0,0 +1,121 @@
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from . import changes, fares
+from .models import BookingDB, FlightDB
+from .schemas import BookingStatus, SeatClass
+
+_bookings = BookingDB.__table__
+
+
+def _seat_column(seat_class: str):
+    if seat_class == SeatClass.BUSINESS:
+        return FlightDB.business_seats
+    return FlightDB.economy_seats
+
+
+def find_flight_pk(
+    db: Session, flight_id: str, departure_date: str, company_id: int
+) -> Optional[int]:
+    """Resolve a booking's flight number/date/airline to the flights row id."""
+    stmt = (
+        select(FlightDB.id)
+        .where(
+            FlightDB.flight_id == flight_id,
+            FlightDB.departure_date == departure_date,
+            FlightDB.company_id == company_id,
+        )
+        .order_by(FlightDB.id)
+        .limit(1)
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def reserve_seats(db: Session, flight_pk: int, seat_class: str, seats: int) -> bool:
+    """Atomically take `seats` from the flight's inventory, in the caller's transaction.
+
+    A single conditional UPDATE ... WHERE seats >= n: concurrent bookers
+    serialize on the row lock and re-check the condition, so the count can
+    never go negative. Returns False when there are not enough seats left
+    (or the flight does not exist).
+    """
+    column = _seat_column(seat_class)
+    stmt = (
+        update(FlightDB)
+        .where(FlightDB.id == flight_pk, column >= seats)
+        .values({column: column - seats, FlightDB.version: FlightDB.version + 1})
+        .execution_options(synchronize_session="fetch")
+    )
+    if db.execute(stmt).rowcount != 1:
+        return False
+    fares.touch(db, flights=[flight_pk])
+    changes.record(db, "flight", [flight_pk])
+    return True
+
+
+def release_seats(db: Session, flight_pk: Optional[int], seat_class: str, seats: int):
+    """Return seats held by a cancelled or deleted booking to the flight.
+
+    Call it only from the transaction whose UPDATE or DELETE took the
+    booking out of an active status (see set_booking_status and
+    remove_booking), so a booking's seats go back once however many
+    requests cancel it at the same time.
+    """
+    if flight_pk is None:
+        return
+    column = _seat_column(seat_class)
+    stmt = (
+        update(FlightDB)
+        .where(FlightDB.id == flight_pk)
+        .values({column: column + seats, FlightDB.version: FlightDB.version + 1})
+        .execution_options(synchronize_session="fetch")
+    )
+    db.execute(stmt)
+    fares.touch(db, flights=[flight_pk])
+    changes.record(db, "flight", [flight_pk])
+
+
+def set_booking_status(db: Session, booking_id: int, current: str, status: str) -> Optional[bool]:
+    """Move a booking from `current` to `status`, and its seats with it.
+
+    The UPDATE only matches while the booking is still `current`, so when
+    two requests (or a request and the hold sweeper) change it at once,
+    only one of them moves the seats. Returns None when the booking was
+    changed in the meantime, False when a reinstated booking's seats are
+    gone, True otherwise.
+    """
+    stmt = (
+        update(_bookings)
+        .where(_bookings.c.id == booking_id, _bookings.c.status == current)
+        .values(status=status, version=_bookings.c.version + 1, updated_at=func.now())
+        .returning(_bookings.c.flight_pk, _bookings.c.seat_class, _bookings.c.seats)
+    )
+    row = db.execute(stmt).one_or_none()
+    if row is None:
+        return None
+    changes.record(db, "booking", [booking_id])
+    cancelled = BookingStatus.CANCELLED.value
+    if status == cancelled and current != cancelled:
+        release_seats(db, row.flight_pk, row.seat_class, row.seats)
+    elif current == cancelled and status != cancelled and row.flight_pk is not None:
+        return reserve_seats(db, row.flight_pk, row.seat_class, row.seats)
+    return True
+
+
+def remove_booking(db: Session, booking_id: int) -> Optional[Row]:
+    """Delete a booking and return its seats if it held any; None when it is already gone."""
+    stmt = (
+        delete(_bookings)
+        .where(_bookings.c.id == booking_id)
+        .returning(_bookings.c.status, _bookings.c.flight_pk, _bookings.c.seat_class, _bookings.c.seats)
+    )
+    row = db.execute(stmt).one_or_none()
+    if row is None:
+        return None
+    changes.record(db, "booking", [booking_id], "delete")
+    if row.status != BookingStatus.CANCELLED.value:
+        release_seats(db, row.flight_pk, row.seat_class, row.seats)
+    return row
@@ -0,0 +1,259 @@
+"""Connecting itineraries over an in-memory route graph.
+
+Airports are the normalized place names; every flight with a parsed
+departure, arrival and price is an edge. Each airport has an adjacency list
+of its departures sorted by time, so the flights that can follow an arrival
+are one bisect away. Search runs best-first over partial itineraries:
+extending a trip never lowers its price or its elapsed time, so trips
+reach the destination cheapest (or fastest) first and the first `limit`
+of them are the k best.
+
+The graph is built on first use and kept current incrementally. Writes
+mark flight ids dirty (`invalidate`) and the next search reloads just
+those rows with its own session before searching. Other workers' writes
+are not seen here, so the whole graph is rebuilt once it is older than
+ITINERARY_GRAPH_TTL seconds.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time as clock
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import FlightDB
+
+# Cap on partial itineraries taken off the heap per search, so a dense
+# network with a generous max_stops cannot run away.
+MAX_EXPANSIONS = 100_000
+
+
+class ItinerarySort(str, Enum):
+    PRICE = "price"
+    DURATION = "duration"
+
+
+@dataclass(frozen=True)
+class ConnectionRules:
+    """How long a passenger needs, and may wait, between two legs."""
+
+    min_connection: timedelta = timedelta(minutes=60)
+    # Same-airline connections share a terminal and through-check bags.
+    same_carrier_min_connection: timedelta = timedelta(minutes=45)
+    max_layover: timedelta = timedelta(hours=24)
+
+    @classmethod
+    def from_env(cls) -> "ConnectionRules":
+        return cls(
+            min_connection=timedelta(minutes=int(os.getenv("ITINERARY_MIN_CONNECTION_MINUTES", "60"))),
+            same_carrier_min_connection=timedelta(minutes=int(os.getenv("ITINERARY_SAME_CARRIER_MIN_CONNECTION_MINUTES", "45"))),
+            max_layover=timedelta(hours=int(os.getenv("ITINERARY_MAX_LAYOVER_HOURS", "24"))),
+        )
+
+    def allows(self, arriving: "Leg", departing: "Leg") -> bool:
+        gap = departing.departure_at - arriving.arrival_at
+        minimum = self.same_carrier_min_connection if arriving.company_id == departing.company_id else self.min_connection
+        return minimum <= gap <= self.max_layover
+
+
+class Leg(NamedTuple):
+    departure_at: datetime
+    arrival_at: datetime
+    id: int
+    origin: str
+    destination: str
+    price: Decimal
+    company_id: int
+
+
+LEG_COLUMNS = (
+    FlightDB.departure_at,
+    FlightDB.arrival_at,
+    FlightDB.id,
+    FlightDB.origin_norm,
+    FlightDB.destination_norm,
+    FlightDB.price_amount,
+    FlightDB.company_id,
+)
+
+
+def _departure(leg: Leg) -> datetime:
+    return leg.departure_at
+
+
+def _legs(rows) -> Iterable[Leg]:
+    for row in rows:
+        leg = Leg(*row)
+        # Rows whose schedule or price could not be parsed are not routable.
+        if None not in (leg.departure_at, leg.arrival_at, leg.price) and leg.arrival_at >= leg.departure_at:
+            yield leg
+
+
+def _cost(path: tuple, sort: ItinerarySort) -> tuple:
+    price = sum(leg.price for leg in path)
+    duration = path[-1].arrival_at - path[0].departure_at
+    return (price, duration) if sort is ItinerarySort.PRICE else (duration, price)
+
+
+class RouteGraph:
+    def __init__(self, ttl: Optional[float] = None, rules: Optional[ConnectionRules] = None):
+        self.ttl = float(os.getenv("ITINERARY_GRAPH_TTL", "300")) if ttl is None else ttl
+        self.rules = rules or ConnectionRules.from_env()
+        # origin -> departures sorted by (departure_at, id). Lists are
+        # replaced, never mutated, so a search holding one sees a snapshot.
+        self._by_origin: dict[str, list[Leg]] = {}
+        self._legs: dict[int, Leg] = {}
+        self._dirty: set[int] = set()
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.refreshes = 0
+
+    def invalidate(self, *flight_ids: int):
+        """Flights were written; reload them before the next search."""
+        with self._lock:
+            self._dirty.update(flight_ids)
+
+    def drop_company(self, company_id: int):
+        """The company and its flights are gone; remove their legs."""
+        with self._lock:
+            self._apply({leg.id for leg in self._legs.values() if leg.company_id == company_id}, ())
+
+    def clear(self):
+        with self._lock:
+            self._by_origin, self._legs, self._dirty, self._built_at = {}, {}, set(), None
+
+    def stats(self) -> dict:
+        return {
+            "airports": len(self._by_origin),
+            "legs": len(self._legs),
+            "builds": self.builds,
+            "refreshes": self.refreshes,
+        }
+
+    def sync(self, db: Session):
+        """Bring the graph up to date: a full build when missing or stale,
+        otherwise a reload of only the flights written since the last sync."""
+        with self._lock:
+            if self._built_at is None or clock.monotonic() - self._built_at > self.ttl:
+                self._build(db)
+            elif self._dirty:
+                ids, self._dirty = self._dirty, set()
+                rows = db.execute(select(*LEG_COLUMNS).where(FlightDB.id.in_(ids))).all()
+                self._apply(ids, _legs(rows))
+                self.refreshes += 1
+
+    def _build(self, db: Session):
+        by_origin: dict[str, list[Leg]] = {}
+        legs = {}
+        for leg in _legs(db.execute(select(*LEG_COLUMNS))):
+            by_origin.setdefault(leg.origin, []).append(leg)
+            legs[leg.id] = leg
+        for departures in by_origin.values():
+            departures.sort()
+        self._by_origin, self._legs, self._dirty = by_origin, legs, set()
+        self._built_at = clock.monotonic()
+        self.builds += 1
+
+    def _apply(self, removed: set, added: Iterable[Leg]):
+        """Replace the legs for `removed` ids with `added`, touching only the
+        adjacency lists of the origins involved."""
+        touched: dict[str, list[Leg]] = {}
+        for flight_id in removed:
+            old = self._legs.pop(flight_id, None)
+            if old is not None:
+                touched.setdefault(old.origin, [])
+        for leg in added:
+            self._legs[leg.id] = leg
+            touched.setdefault(leg.origin, []).append(leg)
+        for origin, new_legs in touched.items():
+            kept = [leg for leg in self._by_origin.get(origin, ()) if leg.id not in removed]
+            departures = sorted(kept + new_legs)
+            if departures:
+                self._by_origin[origin] = departures
+            else:
+                self._by_origin.pop(origin, None)
+
+    def departures(self, origin: str, earliest: datetime, latest: datetime) -> list[Leg]:
+        """Legs leaving `origin` in [earliest, latest)."""
+        legs = self._by_origin.get(origin, [])
+        return legs[bisect_left(legs, earliest, key=_departure):bisect_left(legs, latest, key=_departure)]
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        day: date,
+        max_stops: int = 1,
+        sort: ItinerarySort = ItinerarySort.PRICE,
+        limit: int = 5,
+    ) -> list[tuple]:
+        """The `limit` best itineraries leaving `origin` on `day`, as tuples of legs."""
+        rules = self.rules
+        start = datetime.combine(day, time.min)
+        seq = itertools.count()
+        heap = [(_cost((leg,), sort), next(seq), (leg,)) for leg in self.departures(origin, start, start + timedelta(days=1))]
+        heapq.heapify(heap)
+        # Trips ending in the same leg with the same number of legs have the
+        # same onward options; only the `limit` best of them are worth extending.
+        extended: dict[tuple, int] = {}
+        found, expansions = [], 0
+        while heap and len(found) < limit and expansions < MAX_EXPANSIONS:
+            _, _, path = heapq.heappop(heap)
+            expansions += 1
+            last = path[-1]
+            if last.destination == destination:
+                found.append(path)
+                continue
+            if len(path) > max_stops:
+                continue
+            state = (last.id, len(path))
+            if extended.get(state, 0) >= limit:
+                continue
+            extended[state] = extended.get(state, 0) + 1
+
+            visited = {leg.origin for leg in path}
+            final_leg = len(path) == max_stops
+            earliest = last.arrival_at + min(rules.min_connection, rules.same_carrier_min_connection)
+            following = self._by_origin.get(last.destination, [])
+            lo = bisect_left(following, earliest, key=_departure)
+            hi = bisect_right(following, last.arrival_at + rules.max_layover, key=_departure)
+            for leg in following[lo:hi]:
+                if leg.destination in visited or (final_leg and leg.destination != destination):
+                    continue
+                if rules.allows(last, leg):
+                    extended_path = path + (leg,)
+                    heapq.heappush(heap, (_cost(extended_path, sort), next(seq), extended_path))
+        return found
+
+
+def load_itineraries(db: Session, paths: list[tuple]) -> list[dict]:
+    """ItineraryRead bodies for `paths`, with every leg loaded in one query.
+
+    A trip whose flight was deleted since the graph was synced is dropped.
+    """
+    ids = {leg.id for path in paths for leg in path}
+    flights = {f.id: f for f in db.execute(select(FlightDB).where(FlightDB.id.in_(ids))).scalars()}
+    return [
+        {
+            "price": sum(leg.price for leg in path),
+            "duration_minutes": int((path[-1].arrival_at - path[0].departure_at).total_seconds() // 60),
+            "stops": len(path) - 1,
+            "departure_at": path[0].departure_at,
+            "arrival_at": path[-1].arrival_at,
+            "legs": [flights[leg.id] for leg in path],
+        }
+        for path in paths
+        if all(leg.id in flights for leg in path)
+    ]
+
+
+route_graph = RouteGraph()
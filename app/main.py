@@ -1,31 +1,106 @@
-from contextlib import asynccontextmanager
-from typing import Optional
+import asyncio
+import functools
+import inspect
+from contextlib import asynccontextmanager, suppress
+from datetime import date
+from typing import Annotated, Callable, Optional
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, Depends, HTTPException, status, Response, Query
+from fastapi import FastAPI, Body, Depends, HTTPException, status, Request, Response, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
-from .database import engine, SessionLocal
-from .models import Base, FlightDB, CompanyDB, BookingDB
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import changes, database, fares, holds
+from .database import SessionLocal
+from .migrations import check_schema
+from .models import FlightDB, CompanyDB, BookingDB, RouteDayDB, normalize_place, with_derived_columns
+from .search import (
+    FlightFilters,
+    FlightSort,
+    MatchMode,
+    apply_flight_filters,
+    flight_filters,
+    route_search,
+    sort_keys,
+)
+from .pagination import NEXT_CURSOR_HEADER, PageParams, page_params, paginate
+from .export import ndjson_export
+from .itineraries import ItinerarySort, load_itineraries, route_graph
+from .fields import booking_fields, flight_fields, load_fields, subset_list_adapter
+from .responses import (
+    FAST_JSON,
+    FastJSONResponse,
+    TrustedModelRoute,
+    booking_adapter,
+    booking_list_adapter,
+    company_with_flights_list_adapter,
+    json_response,
+    model_response,
+)
+from .bulk import MAX_BULK_ROWS, BulkOutcome, bulk_write
+from .idempotency import REPLAYED_HEADER, IdempotentRequest, idempotent_request
+from .inventory import find_flight_pk, remove_booking, reserve_seats, set_booking_status
+from .cache import cache_key, response_cache
+from .snapshots import flight_snapshot, flight_snapshots
+from .replicas import ReadYourWritesMiddleware
+from . import metrics
+from .etag import (
+    booking_etag,
+    check_if_match,
+    collection_etag,
+    company_etag,
+    flight_etag,
+    not_modified,
+    wants_precondition,
+)
 from .schemas import (
     FlightCreate,
     FlightUpdate,
     FlightPatch,
     FlightRead,
     FlightReadWithCompany,
+    FlightReadCompany,
+    FlightInclude,
+    CompanyInclude,
     FlightCreateForCompany,
+    ItineraryRead,
+    FareDayRead,
     CompanyCreate,
     CompanyRead,
     CompanyUpdate,
     BookingCreate,
+    BookingCreateForFlight,
     BookingUpdate,
     BookingRead,
+    BookingStatus,
+    BulkMode,
+    BulkResult,
+    ChangeRead,
 )
 
-app = FastAPI()
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Only reads schema_version; DDL runs from `python -m app.migrations`
+    # (or here, once, when DB_AUTO_MIGRATE is set).
+    check_schema(database.engine)
+    sweeper = holds.start_sweeper(database.SessionLocal, seats_changed)
+    pruner = asyncio.create_task(changes.run_pruner(database.SessionLocal))
+    yield
+    for task in (sweeper, pruner):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if FAST_JSON else metrics.TimedJSONResponse,
+)
+app.router.route_class = TrustedModelRoute
 
 
 def get_db():
@@ -36,6 +111,66 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """The session for a read-only handler: a replica when one can serve
+    this client, otherwise the primary session from get_db (which costs
+    nothing until it is used)."""
+    replica = database.replicas.open(request.cookies)
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        replica.close()
+
+
+async def get_async_read_db(request: Request, db: AsyncSession = Depends(get_async_db)):
+    replica = await database.replicas.open_async(request.cookies)
+    if replica is None:
+        yield db
+        return
+    async with replica:
+        yield replica
+
+
+ASYNC_SESSIONS = {get_db: get_async_db, get_read_db: get_async_read_db}
+
+
+def db_endpoint(fn):
+    """Serve a `db: Session` handler from the configured session flavour.
+
+    In sync mode the handler is registered unchanged and runs in the
+    threadpool. With DB_ASYNC it becomes a coroutine that runs the same
+    code through AsyncSession.run_sync: ORM calls execute in a greenlet on
+    the event loop and every database round trip is awaited on the async
+    driver, so no threadpool slot is held per request.
+    """
+    if not database.DB_ASYNC:
+        return fn
+
+    signature = inspect.signature(fn)
+    parameters = [
+        p.replace(default=Depends(ASYNC_SESSIONS[p.default.dependency]), annotation=AsyncSession)
+        if p.name == "db"
+        else p
+        for p in signature.parameters.values()
+    ]
+
+    @functools.wraps(fn)
+    async def run_on_async_session(**kwargs):
+        db = kwargs.pop("db")
+        return await db.run_sync(lambda session: fn(db=session, **kwargs))
+
+    run_on_async_session.__signature__ = signature.replace(parameters=parameters)
+    return run_on_async_session
+
+
 def commit_or_rollback(db: Session, error_msg: str):
     try:
         db.commit()
@@ -44,28 +179,174 @@ def commit_or_rollback(db: Session, error_msg: str):
         raise HTTPException(status_code=409, detail=error_msg)
 
 
+def flush_or_rollback(db: Session, error_msg: str):
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=error_msg)
+
+
+def idempotent_bulk(db: Session, idempotent: Optional[IdempotentRequest], write: Callable[[], BulkOutcome]):
+    """Run a bulk write at most once per Idempotency-Key.
+
+    Bulk writes commit chunk by chunk, so the key is claimed in a
+    transaction of its own first and given back if the write fails.
+    """
+    if idempotent is None:
+        return vars(write())
+    replay = idempotent.acquire(db, commit=True)
+    if replay is not None:
+        return replay
+    try:
+        body = vars(write())
+    except Exception:
+        db.rollback()
+        idempotent.release(db)
+        raise
+    idempotent.complete(db, status.HTTP_200_OK, BulkResult.model_validate(body).model_dump_json().encode())
+    db.commit()
+    return body
+
+
+def flights_changed(*flight_ids: int):
+    """Drop cached flight reads after a committed flight write."""
+    response_cache.invalidate("flights", *(f"flight:{fid}" for fid in flight_ids))
+    flight_snapshots.invalidate(*(f"flight:{fid}" for fid in flight_ids))
+    route_graph.invalidate(*flight_ids)
+
+
+def seats_changed(*flight_pks: Optional[int]):
+    # Seat counts never change which flights a list or search returns, so
+    # only entries containing these flights are stale.
+    tags = [f"flight:{pk}" for pk in flight_pks if pk is not None]
+    if tags:
+        response_cache.invalidate(*tags)
+
+
+def company_changed(company_id: int, flights_removed: bool = False):
+    tags = [f"company:{company_id}"]
+    if flights_removed:
+        tags.append("flights")
+        route_graph.drop_company(company_id)
+        flight_snapshots.invalidate(f"company:{company_id}")
+    response_cache.invalidate(*tags)
+
+
+def page_etag(request: Request, response: Response, rows, key: str = "id", embedded: Optional[str] = None):
+    """Set the collection ETag on a page; returns a 304 if the client has it."""
+    etag = collection_etag(rows, key, response.headers.get(NEXT_CURSOR_HEADER), embedded)
+    response.headers["ETag"] = etag
+    return not_modified(request, etag)
+
+
+def flight_list_adapter(fields: Optional[tuple], include: Optional[FlightInclude]):
+    if include is None:
+        return subset_list_adapter(FlightRead, fields)
+    return subset_list_adapter(FlightReadWithCompany, (fields or tuple(FlightRead.model_fields)) + ("company",))
+
+
+def include_options(stmt, include: Optional[FlightInclude], fields: Optional[tuple], keys: list):
+    """Batch-load the flights' companies for ?include=company.
+
+    One extra SELECT ... WHERE company_id IN (...) per page, whatever the
+    page size. A fieldset still loads company_id, which the load needs.
+    """
+    if include is not None:
+        stmt = stmt.options(selectinload(FlightDB.company))
+        keys = [*keys, FlightDB.company_id]
+    if fields:
+        stmt = load_fields(stmt, FlightDB, fields, keys)
+    return stmt
+
+
+def cached_flight_page(
+    request: Request,
+    response: Response,
+    load,
+    fields: Optional[tuple] = None,
+    include: Optional[FlightInclude] = None,
+):
+    key = cache_key(request)
+    entry = response_cache.get(key)
+    if entry is None:
+        flights = load()
+        if fields is None and include is None:
+            body = [FlightRead.model_validate(f).model_dump(mode="json") for f in flights]
+        else:
+            adapter = flight_list_adapter(fields, include)
+            body = adapter.dump_python(adapter.validate_python(flights, from_attributes=True), mode="json")
+        headers = {
+            name: response.headers[name]
+            for name in (NEXT_CURSOR_HEADER, "Link")
+            if name in response.headers
+        }
+        headers["ETag"] = collection_etag(flights, next_cursor=headers.get(NEXT_CURSOR_HEADER), embedded=include and "company")
+        entry = {"body": body, "headers": headers}
+        tags = ["flights", *(f"flight:{f.id}" for f in flights)]
+        if include is not None:
+            tags.extend({f"company:{f.company_id}" for f in flights})
+        response_cache.set(key, entry, tags)
+    unchanged = not_modified(request, entry["headers"]["ETag"])
+    if unchanged is not None:
+        return unchanged
+    response.headers.update(entry["headers"])
+    if fields is not None or include is not None:
+        return json_response(entry["body"], response)
+    return entry["body"]
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics/cache")
+def cache_stats():
+    return response_cache.stats()
+
+
+@app.get("/metrics/pool")
+def pool_stats():
+    stats = database.pool_status(database.engine)
+    if database.async_engine is not None:
+        stats["async"] = database.pool_status(database.async_engine.sync_engine)
+    for replica in database.replicas.replicas:
+        stats[replica.name] = database.pool_status(replica.engine) | {"healthy": replica.healthy}
+    return stats
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_exposition():
+    pools = [({"engine": "sync"}, database.pool_status(database.engine))]
+    if database.async_engine is not None:
+        pools.append(({"engine": "async"}, database.pool_status(database.async_engine.sync_engine)))
+    pools.extend(({"engine": replica.name}, database.pool_status(replica.engine)) for replica in database.replicas.replicas)
+    extra = metrics.stats_lines(
+        "response_cache", [({}, response_cache.stats())], counters=("hits", "misses", "evictions", "invalidations")
+    ) + metrics.stats_lines(
+        "flight_snapshot_cache", [({}, flight_snapshots.stats())], counters=("hits", "misses", "evictions", "invalidations")
+    ) + metrics.stats_lines(
+        "db_pool", pools, counters=("connects", "checkouts", "checkins", "invalidations", "timeouts", "waits", "wait_seconds_total")
+    )
+    return PlainTextResponse(metrics.registry.render(extra), media_type=metrics.CONTENT_TYPE)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Link", "ETag", REPLAYED_HEADER],
 )
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
-    yield
+app.add_middleware(ReadYourWritesMiddleware, replicas=database.replicas)
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 @app.post(
     "/api/companies", response_model=CompanyRead, status_code=status.HTTP_201_CREATED
 )
+@db_endpoint
 def create_company(company: CompanyCreate, db: Session = Depends(get_db)):
     db_company = CompanyDB(**company.model_dump())
     db.add(db_company)
@@ -74,27 +355,107 @@ def create_company(company: CompanyCreate, db: Session = Depends(get_db)):
     return db_company
 
 
+@app.post("/api/companies:bulk", response_model=BulkResult)
+@db_endpoint
+def bulk_create_companies(
+    companies: Annotated[list[CompanyCreate], Body(max_length=MAX_BULK_ROWS)],
+    request: Request,
+    mode: BulkMode = BulkMode.INSERT,
+    db: Session = Depends(get_db),
+):
+    rows = [company.model_dump() for company in companies]
+
+    def write():
+        outcome = bulk_write(db, CompanyDB, rows, ("code",), mode)
+        if outcome.updated:
+            response_cache.invalidate(*(f"company:{cid}" for cid in outcome.ids if cid))
+        return outcome
+
+    return idempotent_bulk(db, idempotent_request(request, rows), write)
+
+
 @app.get("/api/companies", response_model=list[CompanyRead])
-def list_courses(db: Session = Depends(get_db)):
-    stmt = select(CompanyDB).order_by(CompanyDB.company_id)
-    return db.execute(stmt).scalars().all()
+@db_endpoint
+def list_courses(
+    request: Request,
+    response: Response,
+    code: Optional[str] = None,
+    country: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    include: Optional[CompanyInclude] = None,
+    db: Session = Depends(get_read_db),
+):
+    stmt = select(CompanyDB)
+    if code:
+        stmt = stmt.where(CompanyDB.code == code)
+    if country:
+        stmt = stmt.where(CompanyDB.country == country)
+    if include is not None:
+        # All the page's flights in one SELECT ... WHERE company_id IN (...).
+        stmt = stmt.options(selectinload(CompanyDB.flights))
+    companies = paginate(db, stmt, [CompanyDB.company_id], page, request, response)
+    unchanged = page_etag(request, response, companies, key="company_id", embedded=include and "flights")
+    if unchanged is not None:
+        return unchanged
+    if include is not None:
+        return model_response(company_with_flights_list_adapter, companies, response)
+    return companies
 
 
 @app.get("/api/companies/{company_id}", response_model=CompanyRead)
-def get_company(company_id: int, db: Session = Depends(get_db)):
-    company = db.get(CompanyDB, company_id)
-    if not company:
-        raise HTTPException(status_code=404, detail="company not found")
-    return company
+@db_endpoint
+def get_company(
+    company_id: int,
+    request: Request,
+    response: Response,
+    include: Optional[CompanyInclude] = None,
+    db: Session = Depends(get_read_db),
+):
+    key = cache_key(request)
+    entry = response_cache.get(key)
+    if entry is None:
+        options = [selectinload(CompanyDB.flights)] if include is not None else []
+        company = db.get(CompanyDB, company_id, options=options)
+        if not company:
+            raise HTTPException(status_code=404, detail="company not found")
+        tags = [f"company:{company_id}"]
+        if include is None:
+            etag = company_etag(company)
+            body = CompanyRead.model_validate(company).model_dump(mode="json")
+        else:
+            etag = collection_etag([company], key="company_id", embedded="flights")
+            body = FlightReadCompany.model_validate(company).model_dump(mode="json")
+            tags += ["flights", *(f"flight:{f.id}" for f in company.flights)]
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+        entry = {"etag": etag, "body": body}
+        response_cache.set(key, entry, tags)
+
+    unchanged = not_modified(request, entry["etag"])
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = entry["etag"]
+    if include is not None:
+        return json_response(entry["body"], response)
+    return entry["body"]
 
 
 @app.put("/api/companies/{company_id}", response_model=CompanyRead)
+@db_endpoint
 def update_company(
-    company_id: int, updated: CompanyCreate, db: Session = Depends(get_db)
+    company_id: int,
+    updated: CompanyCreate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
 ):
-    company = db.get(CompanyDB, company_id)
+    company = db.get(
+        CompanyDB, company_id, with_for_update=wants_precondition(request)
+    )
     if not company:
         raise HTTPException(status_code=404, detail="company not found")
+    check_if_match(request, company_etag(company))
 
     company.code = updated.code
     company.name = updated.name
@@ -109,16 +470,26 @@ def update_company(
         db.rollback()
         raise HTTPException(status_code=409, detail="Company already exists!")
 
+    company_changed(company_id)
+    response.headers["ETag"] = company_etag(company)
     return company
 
 
 @app.patch("/api/companies/{company_id}", response_model=CompanyRead)
+@db_endpoint
 def patch_company(
-    company_id: int, updated: CompanyUpdate, db: Session = Depends(get_db)
+    company_id: int,
+    updated: CompanyUpdate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
 ):
-    company = db.get(CompanyDB, company_id)
+    company = db.get(
+        CompanyDB, company_id, with_for_update=wants_precondition(request)
+    )
     if not company:
         raise HTTPException(status_code=404, detail="company not found")
+    check_if_match(request, company_etag(company))
 
     changes = updated.model_dump(exclude_unset=True, exclude_none=True)
     for field, value in changes.items():
@@ -126,69 +497,237 @@ def patch_company(
 
     commit_or_rollback(db, "Company update failed")
     db.refresh(company)
+    company_changed(company_id)
+    response.headers["ETag"] = company_etag(company)
     return company
 
 
 @app.delete("/api/companies/{company_id}", status_code=204)
+@db_endpoint
 def delete_company(company_id: int, db: Session = Depends(get_db)):
     company = db.get(CompanyDB, company_id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     db.delete(company)
     db.commit()
+    company_changed(company_id, flights_removed=True)
     return Response(status_code=204)
 
 
 @app.post("/api/flights", response_model=FlightRead, status_code=201)
+@db_endpoint
 def create_flight(flight: FlightCreate, db: Session = Depends(get_db)):
     db_flight = FlightDB(**flight.model_dump())
     db.add(db_flight)
     commit_or_rollback(db, "Flight already exists")
     db.refresh(db_flight)
+    flights_changed(db_flight.id)
     return db_flight
 
 
+def _unknown_companies(db: Session, chunk: list) -> dict:
+    wanted = {row["company_id"] for _, row in chunk}
+    stmt = select(CompanyDB.company_id).where(CompanyDB.company_id.in_(wanted))
+    known = set(db.execute(stmt).scalars())
+    return {
+        index: "Company not found"
+        for index, row in chunk
+        if row["company_id"] not in known
+    }
+
+
+@app.post("/api/flights:bulk", response_model=BulkResult)
+@db_endpoint
+def bulk_create_flights(
+    flights: Annotated[list[FlightCreate], Body(max_length=MAX_BULK_ROWS)],
+    request: Request,
+    mode: BulkMode = BulkMode.INSERT,
+    db: Session = Depends(get_db),
+):
+    payload = [flight.model_dump() for flight in flights]
+    rows = [with_derived_columns(flight) for flight in payload]
+
+    def write():
+        moved = set()
+        if mode is BulkMode.UPSERT:
+            # Upserted flights may leave the route days they are on now.
+            natural_keys = [(row["flight_id"], row["departure_date"]) for row in rows]
+            moved = fares.route_days_where(db, tuple_(FlightDB.flight_id, FlightDB.departure_date).in_(natural_keys))
+        outcome = bulk_write(
+            db,
+            FlightDB,
+            rows,
+            ("flight_id", "departure_date"),
+            mode,
+            precheck=_unknown_companies,
+        )
+        written = [fid for fid in outcome.ids if fid]
+        fares.touch(db, keys=moved, flights=written)
+        db.commit()
+        flights_changed(*written)
+        return outcome
+
+    return idempotent_bulk(db, idempotent_request(request, payload), write)
+
+
 @app.get("/api/flights", response_model=list[FlightRead])
-def list_flights(db: Session = Depends(get_db)):
+@db_endpoint
+def list_flights(
+    request: Request,
+    response: Response,
+    company_id: Optional[int] = None,
+    filters: FlightFilters = Depends(flight_filters),
+    sort: FlightSort = FlightSort.ID,
+    page: PageParams = Depends(page_params),
+    fields: Optional[tuple] = Depends(flight_fields),
+    include: Optional[FlightInclude] = None,
+    db: Session = Depends(get_read_db),
+):
+    stmt = apply_flight_filters(select(FlightDB), filters)
+    if company_id is not None:
+        stmt = stmt.where(FlightDB.company_id == company_id)
+    stmt, keys = sort_keys(stmt, sort)
+    stmt = include_options(stmt, include, fields, keys)
+    return cached_flight_page(
+        request,
+        response,
+        lambda: paginate(db, stmt, keys, page, request, response),
+        fields,
+        include,
+    )
+
+
+@app.get("/api/flights/export")
+def export_flights(company_id: Optional[int] = None, db: Session = Depends(get_read_db)):
     stmt = select(FlightDB).order_by(FlightDB.id)
-    return db.execute(stmt).scalars().all()
+    if company_id is not None:
+        stmt = stmt.where(FlightDB.company_id == company_id)
+    return ndjson_export(
+        db, stmt, lambda f: FlightRead.model_validate(f).model_dump_json()
+    )
 
 
 @app.get("/api/flights/search", response_model=list[FlightRead])
+@db_endpoint
 def search_flights(
-    origin: str = None, destination: str = None, db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    origin: str = None,
+    destination: str = None,
+    match: MatchMode = MatchMode.PREFIX,
+    company_id: Optional[int] = None,
+    filters: FlightFilters = Depends(flight_filters),
+    sort: FlightSort = FlightSort.ID,
+    page: PageParams = Depends(page_params),
+    fields: Optional[tuple] = Depends(flight_fields),
+    include: Optional[FlightInclude] = None,
+    db: Session = Depends(get_read_db),
 ):
-    stmt = select(FlightDB)
-
-    if origin:
-        stmt = stmt.where(FlightDB.origin.ilike(f"%{origin}%"))
-    if destination:
-        stmt = stmt.where(FlightDB.destination.ilike(f"%{destination}%"))
-
-    stmt = stmt.order_by(FlightDB.id)
-    return db.execute(stmt).scalars().all()
+    stmt = apply_flight_filters(route_search(db, origin, destination, match), filters)
+    if company_id is not None:
+        stmt = stmt.where(FlightDB.company_id == company_id)
+    stmt, keys = sort_keys(stmt, sort)
+    stmt = include_options(stmt, include, fields, keys)
+    return cached_flight_page(
+        request,
+        response,
+        lambda: paginate(db, stmt, keys, page, request, response),
+        fields,
+        include,
+    )
 
 
-@app.get("/api/flights/{flight_id}", response_model=FlightReadWithCompany)
-def get_flight(flight_id: int, db: Session = Depends(get_db)):
+@app.get("/api/itineraries/search", response_model=list[ItineraryRead])
+@db_endpoint
+def search_itineraries(
+    origin: str = Query(..., min_length=1),
+    destination: str = Query(..., min_length=1),
+    day: date = Query(..., alias="date", description="Departure day of the first leg (YYYY-MM-DD)"),
+    max_stops: int = Query(1, ge=0, le=3),
+    sort: ItinerarySort = ItinerarySort.PRICE,
+    limit: int = Query(5, ge=1, le=20),
+    db: Session = Depends(get_read_db),
+):
+    origin, destination = normalize_place(origin), normalize_place(destination)
+    if origin == destination:
+        raise HTTPException(status_code=400, detail="origin and destination are the same")
+    route_graph.sync(db)
+    paths = route_graph.search(origin, destination, day, max_stops, sort, limit)
+    return load_itineraries(db, paths)
+
+
+@app.get("/api/fares/calendar", response_model=list[FareDayRead])
+@db_endpoint
+def fare_calendar(
+    origin: str = Query(..., min_length=1),
+    destination: str = Query(..., min_length=1),
+    departure_from: date = Query(..., description="First day, inclusive (YYYY-MM-DD)"),
+    departure_to: date = Query(..., description="Last day, inclusive (YYYY-MM-DD)"),
+    db: Session = Depends(get_read_db),
+):
+    if departure_from > departure_to:
+        raise HTTPException(status_code=400, detail="departure_from is after departure_to")
+    if (departure_to - departure_from).days >= fares.MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {fares.MAX_CALENDAR_DAYS} days per calendar")
     stmt = (
-        select(FlightDB)
-        .where(FlightDB.id == flight_id)
-        .options(selectinload(FlightDB.company))
+        select(RouteDayDB)
+        .where(
+            RouteDayDB.origin_norm == normalize_place(origin),
+            RouteDayDB.destination_norm == normalize_place(destination),
+            RouteDayDB.day.between(departure_from, departure_to),
+        )
+        .order_by(RouteDayDB.day)
     )
-    flight = db.execute(stmt).scalar_one_or_none()
+    return db.execute(stmt).scalars().all()
 
-    if not flight:
-        raise HTTPException(status_code=404, detail="flight not found")
 
-    return flight
+@app.get("/api/flights/{flight_id}", response_model=FlightReadWithCompany)
+@db_endpoint
+def get_flight(
+    flight_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)
+):
+    key = cache_key(request)
+    entry = response_cache.get(key)
+    if entry is None:
+        stmt = (
+            select(FlightDB)
+            .where(FlightDB.id == flight_id)
+            .options(selectinload(FlightDB.company))
+        )
+        flight = db.execute(stmt).scalar_one_or_none()
+
+        if not flight:
+            raise HTTPException(status_code=404, detail="flight not found")
+
+        etag = flight_etag(flight)
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+        body = FlightReadWithCompany.model_validate(flight).model_dump(mode="json")
+        entry = {"etag": etag, "body": body}
+        tags = [f"flight:{flight_id}", f"company:{flight.company_id}"]
+        response_cache.set(key, entry, tags)
+
+    unchanged = not_modified(request, entry["etag"])
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = entry["etag"]
+    return entry["body"]
 
 
 @app.patch("/api/flights/{flight_id}", response_model=FlightRead)
-def patch_flight(flight_id: int, updated: FlightPatch, db: Session = Depends(get_db)):
-    flight = db.get(FlightDB, flight_id)
+@db_endpoint
+def patch_flight(
+    flight_id: int,
+    updated: FlightPatch,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    flight = db.get(FlightDB, flight_id, with_for_update=wants_precondition(request))
     if not flight:
         raise HTTPException(status_code=404, detail="Flight not found")
+    check_if_match(request, flight_etag(flight))
 
     changes = updated.model_dump(exclude_unset=True, exclude_none=True)
     for field, value in changes.items():
@@ -196,14 +735,24 @@ def patch_flight(flight_id: int, updated: FlightPatch, db: Session = Depends(get
 
     commit_or_rollback(db, "Flight update failed")
     db.refresh(flight)
+    flights_changed(flight_id)
+    response.headers["ETag"] = flight_etag(flight)
     return flight
 
 
 @app.put("/api/flights/{flight_id}", response_model=FlightRead)
-def update_flight(flight_id: int, updated: FlightUpdate, db: Session = Depends(get_db)):
-    flight = db.get(FlightDB, flight_id)
+@db_endpoint
+def update_flight(
+    flight_id: int,
+    updated: FlightUpdate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    flight = db.get(FlightDB, flight_id, with_for_update=wants_precondition(request))
     if not flight:
         raise HTTPException(status_code=404, detail="Flight not found")
+    check_if_match(request, flight_etag(flight))
 
     flight.name = updated.name
     flight.flight_id = updated.flight_id
@@ -225,22 +774,27 @@ def update_flight(flight_id: int, updated: FlightUpdate, db: Session = Depends(g
         db.rollback()
         raise HTTPException(status_code=409, detail="Flight already exists")
 
+    flights_changed(flight_id)
+    response.headers["ETag"] = flight_etag(flight)
     return flight
 
 
 @app.delete("/api/flights/{flight_id}", status_code=204)
+@db_endpoint
 def delete_flight(flight_id: int, db: Session = Depends(get_db)):
     flight = db.get(FlightDB, flight_id)
     if not flight:
         raise HTTPException(status_code=404, detail="Flight not found")
     db.delete(flight)
     db.commit()
+    flights_changed(flight_id)
     return Response(status_code=204)
 
 
 @app.post(
     "/api/companies/{company_id}/flights", response_model=FlightRead, status_code=201
 )
+@db_endpoint
 def create_flight_for_company(
     company_id: int, flight: FlightCreateForCompany, db: Session = Depends(get_db)
 ):
@@ -255,184 +809,289 @@ def create_flight_for_company(
     db.add(db_flight)
     commit_or_rollback(db, "Flight Creation Failed!")
     db.refresh(db_flight)
+    flights_changed(db_flight.id)
 
     return db_flight
 
 
 @app.get("/api/companies/{company_id}/flights", response_model=list[FlightRead])
-def list_flights_for_company(company_id: int, db: Session = Depends(get_db)):
+@db_endpoint
+def list_flights_for_company(
+    company_id: int,
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    fields: Optional[tuple] = Depends(flight_fields),
+    include: Optional[FlightInclude] = None,
+    db: Session = Depends(get_read_db),
+):
     stmt = select(FlightDB).where(FlightDB.company_id == company_id)
-    flights = db.execute(stmt).scalars().all()
+    stmt = include_options(stmt, include, fields, [FlightDB.id])
+    flights = paginate(db, stmt, [FlightDB.id], page, request, response)
 
     if not flights:
         if not db.get(CompanyDB, company_id):
             raise HTTPException(status_code=404, detail="Company not found")
 
+    unchanged = page_etag(request, response, flights, embedded=include and "company")
+    if unchanged is not None:
+        return unchanged
+    if fields or include:
+        return model_response(flight_list_adapter(fields, include), flights, response)
     return flights
 
 
+def _reserve_or_409(db: Session, flight_pk: int, seat_class: str, seats: int):
+    if reserve_seats(db, flight_pk, seat_class, seats):
+        return
+    db.rollback()
+    if db.get(FlightDB, flight_pk) is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    raise HTTPException(status_code=409, detail="Not enough seats available")
+
+
+def insert_booking(
+    db: Session, booking_data: dict, response: Response, idempotent: Optional[IdempotentRequest]
+) -> Response:
+    """Reserve the seats and insert the booking, in one transaction."""
+    if booking_data["status"] != BookingStatus.CANCELLED:
+        _reserve_or_409(db, booking_data["flight_pk"], booking_data["seat_class"], booking_data["seats"])
+    db_booking = BookingDB(**booking_data)
+    db.add(db_booking)
+    if idempotent is None:
+        commit_or_rollback(db, "Booking creation failed")
+        db.refresh(db_booking)
+        created = model_response(booking_adapter, db_booking, response, status.HTTP_201_CREATED)
+    else:
+        # The stored response commits with the booking: a retry finds
+        # both or neither.
+        flush_or_rollback(db, "Booking creation failed")
+        created = model_response(booking_adapter, db_booking, response, status.HTTP_201_CREATED)
+        idempotent.complete(db, created.status_code, created.body)
+        commit_or_rollback(db, "Booking creation failed")
+    seats_changed(db_booking.flight_pk)
+    return created
+
+
 @app.post(
     "/api/bookings", response_model=BookingRead, status_code=status.HTTP_201_CREATED
 )
-def create_booking(booking: BookingCreate, db: Session = Depends(get_db)):
-    booking_data = booking.model_dump()
-    db_booking = BookingDB(**booking_data)
-    db.add(db_booking)
-    commit_or_rollback(db, "Booking creation failed")
-    db.refresh(db_booking)
-    # Convert datetime to string for response
-    booking_dict = {
-        "id": db_booking.id,
-        "user_id": db_booking.user_id,
-        "flight_id": db_booking.flight_id,
-        "flight_name": db_booking.flight_name,
-        "origin": db_booking.origin,
-        "destination": db_booking.destination,
-        "departure_time": db_booking.departure_time,
-        "arrival_time": db_booking.arrival_time,
-        "departure_date": db_booking.departure_date,
-        "arrival_date": db_booking.arrival_date,
-        "price": db_booking.price,
-        "company_id": db_booking.company_id,
-        "status": db_booking.status,
-        "payment_id": db_booking.payment_id,
-        "paid_at": db_booking.paid_at,
-        "created_at": db_booking.created_at.isoformat()
-        if db_booking.created_at
-        else "",
-        "updated_at": db_booking.updated_at.isoformat()
-        if db_booking.updated_at
-        else "",
-    }
-    return booking_dict
+@db_endpoint
+def create_booking(
+    booking: BookingCreate, request: Request, response: Response, db: Session = Depends(get_db)
+):
+    booking_data = booking.model_dump(mode="json")
+    idempotent = idempotent_request(request, booking_data)
+    if idempotent is not None:
+        replay = idempotent.acquire(db)
+        if replay is not None:
+            return replay
+    if booking_data["flight_pk"] is None:
+        booking_data["flight_pk"] = find_flight_pk(
+            db, booking.flight_id, booking.departure_date, booking.company_id
+        )
+        if booking_data["flight_pk"] is None:
+            raise HTTPException(status_code=404, detail="Flight not found")
+    else:
+        # The seats come off flight_pk, so the flight the booking names
+        # has to be that one.
+        snapshot = flight_snapshot(db, booking_data["flight_pk"])
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail="Flight not found")
+        if any(snapshot[key] != booking_data[key] for key in ("flight_id", "departure_date", "company_id")):
+            raise HTTPException(
+                status_code=422, detail="flight_pk does not match flight_id, departure_date and company_id"
+            )
+    return insert_booking(db, booking_data, response, idempotent)
+
+
+@app.post(
+    "/api/flights/{flight_id}/bookings", response_model=BookingRead, status_code=status.HTTP_201_CREATED
+)
+@db_endpoint
+def create_booking_for_flight(
+    flight_id: int,
+    booking: BookingCreateForFlight,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    booking_data = booking.model_dump(mode="json")
+    idempotent = idempotent_request(request, booking_data)
+    if idempotent is not None:
+        replay = idempotent.acquire(db)
+        if replay is not None:
+            return replay
+    snapshot = flight_snapshot(db, flight_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    booking_data.update(snapshot, flight_pk=flight_id, status=BookingStatus.PENDING.value)
+    return insert_booking(db, booking_data, response, idempotent)
 
 
 @app.get("/api/bookings", response_model=list[BookingRead])
-def list_bookings(user_id: Optional[str] = None, db: Session = Depends(get_db)):
+@db_endpoint
+def list_bookings(
+    request: Request,
+    response: Response,
+    user_id: Optional[str] = None,
+    booking_status: Optional[BookingStatus] = Query(None, alias="status"),
+    company_id: Optional[int] = None,
+    flight_id: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    fields: Optional[tuple] = Depends(booking_fields),
+    db: Session = Depends(get_read_db),
+):
     stmt = select(BookingDB)
     if user_id:
         stmt = stmt.where(BookingDB.user_id == user_id)
-    stmt = stmt.order_by(BookingDB.id)
-    bookings = db.execute(stmt).scalars().all()
-
-    return [
-        {
-            "id": b.id,
-            "user_id": b.user_id,
-            "flight_id": b.flight_id,
-            "flight_name": b.flight_name,
-            "origin": b.origin,
-            "destination": b.destination,
-            "departure_time": b.departure_time,
-            "arrival_time": b.arrival_time,
-            "departure_date": b.departure_date,
-            "arrival_date": b.arrival_date,
-            "price": b.price,
-            "company_id": b.company_id,
-            "status": b.status,
-            "payment_id": b.payment_id,
-            "paid_at": b.paid_at,
-            "created_at": b.created_at.isoformat() if b.created_at else "",
-            "updated_at": b.updated_at.isoformat() if b.updated_at else "",
-        }
-        for b in bookings
-    ]
+    if booking_status:
+        stmt = stmt.where(BookingDB.status == booking_status.value)
+    if company_id is not None:
+        stmt = stmt.where(BookingDB.company_id == company_id)
+    if flight_id:
+        stmt = stmt.where(BookingDB.flight_id == flight_id)
+    if fields:
+        stmt = load_fields(stmt, BookingDB, fields, [BookingDB.id])
+    bookings = paginate(db, stmt, [BookingDB.id], page, request, response)
+    unchanged = page_etag(request, response, bookings)
+    if unchanged is not None:
+        return unchanged
+    adapter = subset_list_adapter(BookingRead, fields) if fields else booking_list_adapter
+    return model_response(adapter, bookings, response)
+
+
+@app.get("/api/bookings/export")
+def export_bookings(
+    user_id: Optional[str] = None,
+    booking_status: Optional[BookingStatus] = Query(None, alias="status"),
+    db: Session = Depends(get_read_db),
+):
+    stmt = select(BookingDB).order_by(BookingDB.id)
+    if user_id:
+        stmt = stmt.where(BookingDB.user_id == user_id)
+    if booking_status:
+        stmt = stmt.where(BookingDB.status == booking_status.value)
+    return ndjson_export(
+        db, stmt, lambda b: BookingRead.model_validate(b).model_dump_json()
+    )
 
 
 @app.get("/api/bookings/{booking_id}", response_model=BookingRead)
-def get_booking(booking_id: int, db: Session = Depends(get_db)):
+@db_endpoint
+def get_booking(
+    booking_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)
+):
     booking = db.get(BookingDB, booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
-    return {
-        "id": booking.id,
-        "user_id": booking.user_id,
-        "flight_id": booking.flight_id,
-        "flight_name": booking.flight_name,
-        "origin": booking.origin,
-        "destination": booking.destination,
-        "departure_time": booking.departure_time,
-        "arrival_time": booking.arrival_time,
-        "departure_date": booking.departure_date,
-        "arrival_date": booking.arrival_date,
-        "price": booking.price,
-        "company_id": booking.company_id,
-        "status": booking.status,
-        "payment_id": booking.payment_id,
-        "paid_at": booking.paid_at,
-        "created_at": booking.created_at.isoformat() if booking.created_at else "",
-        "updated_at": booking.updated_at.isoformat() if booking.updated_at else "",
-    }
+    etag = booking_etag(booking)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    return model_response(booking_adapter, booking, response)
 
 
 @app.put("/api/bookings/{booking_id}", response_model=BookingRead)
+@db_endpoint
 def update_booking(
-    booking_id: int, updated: BookingUpdate, db: Session = Depends(get_db)
+    booking_id: int,
+    updated: BookingUpdate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
 ):
-    booking = db.get(BookingDB, booking_id)
+    booking = db.get(
+        BookingDB, booking_id, with_for_update=wants_precondition(request)
+    )
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
-
-    changes = updated.model_dump(exclude_unset=True, exclude_none=True)
-    for field, value in changes.items():
-        setattr(booking, field, value.value if hasattr(value, "value") else value)
+    check_if_match(request, booking_etag(booking))
+
+    updates = updated.model_dump(mode="json", exclude_unset=True, exclude_none=True)
+    current, status_value = booking.status, updates.pop("status", booking.status)
+    for field, value in updates.items():
+        setattr(booking, field, value)
+
+    seats_moved = False
+    if status_value != current:
+        moved = set_booking_status(db, booking_id, current, status_value)
+        if moved is None:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Booking was changed by another request")
+        if moved is False:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Not enough seats available")
+        cancelled = BookingStatus.CANCELLED.value
+        seats_moved = (current == cancelled) != (status_value == cancelled)
 
     commit_or_rollback(db, "Booking update failed")
     db.refresh(booking)
-    return {
-        "id": booking.id,
-        "user_id": booking.user_id,
-        "flight_id": booking.flight_id,
-        "flight_name": booking.flight_name,
-        "origin": booking.origin,
-        "destination": booking.destination,
-        "departure_time": booking.departure_time,
-        "arrival_time": booking.arrival_time,
-        "departure_date": booking.departure_date,
-        "arrival_date": booking.arrival_date,
-        "price": booking.price,
-        "company_id": booking.company_id,
-        "status": booking.status,
-        "payment_id": booking.payment_id,
-        "paid_at": booking.paid_at,
-        "created_at": booking.created_at.isoformat() if booking.created_at else "",
-        "updated_at": booking.updated_at.isoformat() if booking.updated_at else "",
-    }
+    if seats_moved:
+        seats_changed(booking.flight_pk)
+    response.headers["ETag"] = booking_etag(booking)
+    return model_response(booking_adapter, booking, response)
 
 
 @app.delete("/api/bookings/{booking_id}", status_code=204)
+@db_endpoint
 def delete_booking(booking_id: int, db: Session = Depends(get_db)):
-    booking = db.get(BookingDB, booking_id)
-    if not booking:
+    removed = remove_booking(db, booking_id)
+    if removed is None:
         raise HTTPException(status_code=404, detail="Booking not found")
-    db.delete(booking)
     db.commit()
+    seats_changed(removed.flight_pk)
     return Response(status_code=204)
 
 
 @app.get("/api/users/{user_id}/bookings", response_model=list[BookingRead])
-def get_user_bookings(user_id: str, db: Session = Depends(get_db)):
-    stmt = select(BookingDB).where(BookingDB.user_id == user_id).order_by(BookingDB.id)
-    bookings = db.execute(stmt).scalars().all()
-    return [
-        {
-            "id": b.id,
-            "user_id": b.user_id,
-            "flight_id": b.flight_id,
-            "flight_name": b.flight_name,
-            "origin": b.origin,
-            "destination": b.destination,
-            "departure_time": b.departure_time,
-            "arrival_time": b.arrival_time,
-            "departure_date": b.departure_date,
-            "arrival_date": b.arrival_date,
-            "price": b.price,
-            "company_id": b.company_id,
-            "status": b.status,
-            "payment_id": b.payment_id,
-            "paid_at": b.paid_at,
-            "created_at": b.created_at.isoformat() if b.created_at else "",
-            "updated_at": b.updated_at.isoformat() if b.updated_at else "",
-        }
-        for b in bookings
-    ]
+@db_endpoint
+def get_user_bookings(
+    user_id: str,
+    request: Request,
+    response: Response,
+    booking_status: Optional[BookingStatus] = Query(None, alias="status"),
+    page: PageParams = Depends(page_params),
+    fields: Optional[tuple] = Depends(booking_fields),
+    db: Session = Depends(get_read_db),
+):
+    stmt = select(BookingDB).where(BookingDB.user_id == user_id)
+    if booking_status:
+        stmt = stmt.where(BookingDB.status == booking_status.value)
+    if fields:
+        stmt = load_fields(stmt, BookingDB, fields, [BookingDB.id])
+    bookings = paginate(db, stmt, [BookingDB.id], page, request, response)
+    unchanged = page_etag(request, response, bookings)
+    if unchanged is not None:
+        return unchanged
+    adapter = subset_list_adapter(BookingRead, fields) if fields else booking_list_adapter
+    return model_response(adapter, bookings, response)
+
+
+@app.get("/api/changes", response_model=list[ChangeRead])
+@db_endpoint
+def list_changes(
+    since: int = Query(0, ge=0, description="Last seq already applied; 0 for the start of the feed"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    return changes.read_changes(db, since, limit)
+
+
+@app.get("/api/changes/stream", response_class=StreamingResponse)
+def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Replay the changes after this seq first; omit to start from now"),
+    limit: int = Query(100, ge=1, le=1000, description="Changes read per batch"),
+):
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    if len(changes.notifier) >= changes.MAX_STREAMS:
+        raise HTTPException(status_code=503, detail="Too many change streams", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        changes.stream(SessionLocal, request, since, limit),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
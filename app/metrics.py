@@ -0,0 +1,293 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are plain dicts keyed by label values and
+guarded by one lock each, so recording a sample costs a dict lookup and a
+few additions. `MetricsMiddleware` times every request against its route
+template, and the cursor events below attribute database round trips to
+the request that issued them through a context variable.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def collect(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self.header()
+        lines.extend(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items)
+        return lines
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; values are [bucket counts..., sum, count]."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *labels) -> int:
+        series = self._values.get(labels)
+        return series[-1] if series else 0
+
+    def collect(self) -> list:
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._values.items())
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        for labels, series in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), series):
+                cumulative += hits
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self, extra: Iterable[str] = ()) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        lines.extend(extra)
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self._metrics:
+            metric.clear()
+
+
+def stats_lines(prefix: str, snapshots, counters: Iterable[str] = ()) -> list:
+    """Expose the numeric fields of stats dicts (cache, pool) as samples.
+
+    `snapshots` is a list of (labels, stats) pairs so several sources, e.g.
+    the sync and async pools, share one family per field.
+    """
+    counters = set(counters)
+    families = {}
+    for labels, stats in snapshots:
+        for field, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                families.setdefault(field, []).append((labels, value))
+    lines = []
+    for field, samples in families.items():
+        kind = "counter" if field in counters else "gauge"
+        name = f"{prefix}_{field}"
+        if kind == "counter" and not name.endswith("_total"):
+            name += "_total"
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    return lines
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    "http_requests_total", "Requests by route template, method and status.", ("method", "route", "status")
+)
+LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route")
+)
+IN_FLIGHT = registry.gauge("http_requests_in_flight", "Requests currently being served.", ("method",))
+DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "SQL statements issued per request.", ("route",), buckets=QUERY_COUNT_BUCKETS
+)
+DB_TIME = registry.histogram("http_request_db_seconds", "Time spent in SQL statements per request.", ("route",))
+SERIALIZE_TIME = registry.histogram(
+    "http_response_serialize_seconds", "Time spent encoding JSON response bodies per request.", ("route",)
+)
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_seconds", "serialize_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+# Set by the middleware for the duration of a request. Threadpool and
+# run_sync calls copy the context, so handlers mutate the same object.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    started = conn.info.pop("metrics_query_started", None)
+    if stats is not None and started is not None:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+@contextmanager
+def serializing():
+    """Charge the time spent in the block to the current request's serialization."""
+    stats = current_request.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialize_seconds += time.perf_counter() - started
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that charges its encoding time to the current request."""
+
+    def render(self, content) -> bytes:
+        with serializing():
+            return super().render(content)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so timing adds no extra task or body copy.
+
+    Requests are labelled with the matched route's path template
+    (`/api/flights/{flight_id}`), never the raw path, so the number of
+    series stays bounded; anything that matched no route is "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec(method)
+            current_request.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            REQUESTS.inc(method, template, str(status))
+            LATENCY.observe(elapsed, method, template)
+            DB_QUERIES.observe(stats.db_queries, template)
+            DB_TIME.observe(stats.db_seconds, template)
+            SERIALIZE_TIME.observe(stats.serialize_seconds, template)
@@ -0,0 +1,313 @@
+"""Versioned schema migrations.
+
+Each migration is a numbered step applied in its own transaction, together
+with the row that records it in `schema_version`. Steps only create what is
+missing, so a database built by the old import-time create_all() (which
+has no `schema_version` table) is brought up to date by the same path as a
+new one:
+
+    python -m app.migrations            # upgrade to the latest version
+    python -m app.migrations --check    # exit 1 if an upgrade is pending
+
+The app itself never runs DDL at import. On startup it reads the current
+version (one query) and refuses to serve a database that is behind, unless
+DB_AUTO_MIGRATE=true, in which case it upgrades first. That keeps worker
+cold start cheap and leaves DDL to a single deploy step.
+"""
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    bindparam,
+    func,
+    inspect,
+    insert,
+    select,
+    text,
+)
+from sqlalchemy.schema import CreateColumn
+
+from .fares import rebuild_route_days
+from .models import (
+    FLIGHTS_FTS_DDL,
+    Base,
+    BookingDB,
+    ChangeDB,
+    CompanyDB,
+    FlightDB,
+    IdempotencyKeyDB,
+    RouteDayDB,
+    normalize_place,
+    sqlite_has_fts5_trigram,
+    typed_schedule,
+)
+
+FILL_BATCH_SIZE = 1000
+# Serialises concurrent upgrades (several workers with DB_AUTO_MIGRATE) on Postgres.
+ADVISORY_LOCK_ID = 7_201_012
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: list = []
+
+
+def migration(version: int, name: str):
+    def register(apply):
+        assert version == len(MIGRATIONS) + 1, "migrations must be numbered consecutively"
+        MIGRATIONS.append(Migration(version, name, apply))
+        return apply
+
+    return register
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+# Helpers: every one of these is a no-op when the object already exists.
+
+def add_missing_columns(conn: Connection, model, defaults: dict) -> list:
+    """ALTER TABLE ADD COLUMN for each of `defaults` the table lacks.
+
+    `defaults` maps column name to the SQL default that existing rows get,
+    or None for nullable columns.
+    """
+    table = model.__table__
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    added = []
+    for name, default in defaults.items():
+        if name in existing:
+            continue
+        ddl = str(CreateColumn(table.c[name]).compile(dialect=conn.dialect))
+        if default is not None and table.c[name].server_default is None:
+            ddl += f" DEFAULT {default}"
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+        added.append(name)
+    return added
+
+
+def create_missing_indexes(conn: Connection, model) -> list:
+    table = model.__table__
+    existing = {i["name"] for i in inspect(conn).get_indexes(table.name)}
+    created = []
+    for index in sorted(table.indexes, key=lambda i: i.name):
+        if index.name not in existing:
+            index.create(conn)
+            created.append(index.name)
+    return created
+
+
+def drop_index_if_exists(conn: Connection, model, name: str) -> None:
+    if name in {i["name"] for i in inspect(conn).get_indexes(model.__tablename__)}:
+        conn.execute(text(f"DROP INDEX {name}"))
+
+
+def fill_in_batches(conn: Connection, model, sources: Iterable[str], derive, batch_size: int = FILL_BATCH_SIZE) -> int:
+    """Recompute derived columns from `sources` in id order; returns rows written.
+
+    `derive(row)` returns the new column values for one row. Core UPDATEs do
+    not bump the row version: derived columns never change the API
+    representation, so cached copies and ETags stay valid.
+    """
+    table = model.__table__
+    pk = table.primary_key.columns.values()[0]
+    written, last = 0, None
+    while True:
+        stmt = select(pk, *(table.c[name] for name in sources)).order_by(pk).limit(batch_size)
+        if last is not None:
+            stmt = stmt.where(pk > last)
+        rows = conn.execute(stmt).all()
+        if not rows:
+            return written
+        values = [{"pk_": row[0], **derive(row)} for row in rows]
+        update = table.update().where(pk == bindparam("pk_"))
+        conn.execute(update.values({name: bindparam(name) for name in values[0] if name != "pk_"}), values)
+        written += len(rows)
+        last = rows[-1][0]
+
+
+@migration(1, "baseline tables")
+def _baseline(conn: Connection) -> None:
+    # Creates only tables that do not exist yet (all of them, with their
+    # indexes, on an empty database). Later steps patch older databases.
+    Base.metadata.create_all(conn)
+
+
+@migration(2, "row versions and seat inventory")
+def _versions_and_inventory(conn: Connection) -> None:
+    for model in (FlightDB, CompanyDB, BookingDB):
+        add_missing_columns(conn, model, {"version": "1"})
+    add_missing_columns(conn, FlightDB, {"business_seats": "0", "economy_seats": "0"})
+    added = add_missing_columns(conn, BookingDB, {"flight_pk": None, "seat_class": "'economy'", "seats": "1"})
+    if "flight_pk" in added:
+        # Link existing bookings to the flight they were made on.
+        flights, bookings = FlightDB.__table__, BookingDB.__table__
+        match = (
+            select(flights.c.id)
+            .where(
+                flights.c.flight_id == bookings.c.flight_id,
+                flights.c.departure_date == bookings.c.departure_date,
+                flights.c.company_id == bookings.c.company_id,
+            )
+            .order_by(flights.c.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        conn.execute(bookings.update().values(flight_pk=match))
+
+
+@migration(3, "normalized route keys and fuzzy search")
+def _route_keys(conn: Connection) -> None:
+    if add_missing_columns(conn, FlightDB, {"origin_norm": "''", "destination_norm": "''"}):
+        fill_in_batches(
+            conn,
+            FlightDB,
+            ("origin", "destination"),
+            lambda row: {"origin_norm": normalize_place(row.origin), "destination_norm": normalize_place(row.destination)},
+        )
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    elif conn.dialect.name == "sqlite" and sqlite_has_fts5_trigram():
+        if not inspect(conn).has_table("flights_fts"):
+            for statement in FLIGHTS_FTS_DDL:
+                conn.execute(text(statement))
+            conn.execute(text("INSERT INTO flights_fts(flights_fts) VALUES ('rebuild')"))
+
+
+@migration(4, "typed schedule columns")
+def _typed_columns(conn: Connection) -> None:
+    for model in (FlightDB, BookingDB):
+        typed = {"departure_at": None, "arrival_at": None, "price_amount": None}
+        if add_missing_columns(conn, model, typed):
+            fill_in_batches(
+                conn,
+                model,
+                ("departure_date", "departure_time", "arrival_date", "arrival_time", "price"),
+                lambda row: typed_schedule(row._mapping),
+            )
+
+
+@migration(5, "lookup indexes")
+def _lookup_indexes(conn: Connection) -> None:
+    # ix_flights_route is a prefix of ix_flights_route_departure.
+    drop_index_if_exists(conn, FlightDB, "ix_flights_route")
+    for model in (FlightDB, CompanyDB, BookingDB):
+        create_missing_indexes(conn, model)
+
+
+@migration(6, "fare calendar")
+def _fare_calendar(conn: Connection) -> None:
+    # Step 1's create_all may already have made the empty table on an older
+    # database, so the summary is always rebuilt from the flights here.
+    RouteDayDB.__table__.create(conn, checkfirst=True)
+    rebuild_route_days(conn, FILL_BATCH_SIZE)
+
+
+@migration(7, "idempotency keys")
+def _idempotency_keys(conn: Connection) -> None:
+    IdempotencyKeyDB.__table__.create(conn, checkfirst=True)
+
+
+@migration(8, "booking hold index")
+def _booking_holds(conn: Connection) -> None:
+    create_missing_indexes(conn, BookingDB)
+
+
+@migration(9, "change feed")
+def _changes(conn: Connection) -> None:
+    ChangeDB.__table__.create(conn, checkfirst=True)
+
+
+@migration(10, "company code index")
+def _company_code(conn: Connection) -> None:
+    create_missing_indexes(conn, CompanyDB)
+
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(func.coalesce(func.max(schema_version.c.version), 0))).scalar_one()
+
+
+def upgrade(engine: Engine, target: int = None) -> list:
+    """Apply pending migrations up to `target`; returns the versions applied."""
+    target = LATEST_VERSION if target is None else target
+    schema_version.create(engine, checkfirst=True)
+    applied = []
+    for step in MIGRATIONS[:target]:
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+            if current_version(conn) >= step.version:
+                continue
+            step.apply(conn)
+            conn.execute(insert(schema_version).values(version=step.version, name=step.name))
+        applied.append(step.version)
+    return applied
+
+
+def check_schema(engine: Engine, auto_migrate: bool = None) -> int:
+    """Startup check: the database must be at LATEST_VERSION (or be upgraded)."""
+    if auto_migrate is None:
+        auto_migrate = os.getenv("DB_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return version
+    if not auto_migrate:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {version}, this build needs {LATEST_VERSION}; "
+            "run `python -m app.migrations` or set DB_AUTO_MIGRATE=true"
+        )
+    upgrade(engine)
+    return LATEST_VERSION
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="only report; exit 1 if migrations are pending")
+    parser.add_argument("--target", type=int, default=None, help="upgrade up to this version")
+    args = parser.parse_args(argv)
+
+    from .database import engine
+
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if args.check:
+        print(f"schema version {version}, latest {LATEST_VERSION}")
+        return 0 if version >= LATEST_VERSION else 1
+    for applied in upgrade(engine, args.target):
+        print(f"applied {applied}: {MIGRATIONS[applied - 1].name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
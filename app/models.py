@@ -1,15 +1,158 @@
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, ForeignKey, DateTime
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, validates
+from sqlalchemy import BigInteger, String, Integer, ForeignKey, Date, DateTime, Numeric, Text, Index, DDL, event
 from sqlalchemy.sql import func
-from datetime import datetime
+from contextlib import closing
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+import functools
+import re
+import sqlite3
 from typing import Optional, List
  
  
 class Base(DeclarativeBase):
     pass
+
+
+class Versioned:
+    """Row version for ETags; bumped in SQL on every UPDATE of the row."""
+
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+
+
+@event.listens_for(Versioned, "before_update", propagate=True)
+def _bump_version(mapper, connection, target):
+    # Rendered as SET version = version + 1, so concurrent writers never
+    # hand out the same version twice. Core UPDATEs bump it themselves.
+    target.version = mapper.class_.version + 1
  
-class FlightDB(Base):
+def normalize_place(value: str) -> str:
+    """Case-fold and collapse whitespace so route lookups can use plain indexes."""
+    return " ".join(value.split()).casefold()
+
+
+_DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d")
+_PRICE_JUNK = re.compile(r"[^\d.,]")
+
+
+def parse_date(value: Optional[str]) -> Optional[date]:
+    """Read the API's date strings: 12/11/2025, 20-11-2025 or 2025-11-22."""
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime((value or "").strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_time(value: Optional[str]) -> Optional[time]:
+    try:
+        return datetime.strptime((value or "").strip(), "%H:%M").time()
+    except ValueError:
+        return None
+
+
+def parse_timestamp(date_value: Optional[str], time_value: Optional[str]) -> Optional[datetime]:
+    day, clock = parse_date(date_value), parse_time(time_value)
+    if day is None or clock is None:
+        return None
+    return datetime.combine(day, clock)
+
+
+def parse_price(value: Optional[str]) -> Optional[Decimal]:
+    """Amount from a price string such as "€1234567", "€99.50" or "1,299".
+
+    Currency symbols and spaces are dropped. A comma followed by exactly two
+    trailing digits is a decimal comma; any other comma separates thousands.
+    """
+    digits = _PRICE_JUNK.sub("", value or "")
+    if "," in digits:
+        whole, _, tail = digits.rpartition(",")
+        if "." not in digits and len(tail) == 2:
+            digits = whole.replace(",", "") + "." + tail
+        else:
+            digits = digits.replace(",", "")
+    try:
+        amount = Decimal(digits)
+    except InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+
+def typed_schedule(values: dict) -> dict:
+    """The typed columns derived from the string date, time and price fields."""
+    return {
+        "departure_at": parse_timestamp(values.get("departure_date"), values.get("departure_time")),
+        "arrival_at": parse_timestamp(values.get("arrival_date"), values.get("arrival_time")),
+        "price_amount": parse_price(values.get("price")),
+    }
+
+
+def with_derived_columns(values: dict) -> dict:
+    """Add the normalized route and typed schedule columns for Core writes,
+    which skip the ORM validators."""
+    return {
+        **values,
+        "origin_norm": normalize_place(values["origin"]),
+        "destination_norm": normalize_place(values["destination"]),
+        **typed_schedule(values),
+    }
+
+
+class TypedSchedule:
+    """Typed copies of the string schedule fields, kept in sync on assignment.
+
+    The strings stay the API's source of truth; these columns exist so date
+    windows and price ceilings are index range scans in SQL. Values that do
+    not parse are stored as NULL and never match a typed filter.
+    """
+
+    departure_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    arrival_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    price_amount: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 2), nullable=True)
+
+    @validates("departure_date", "departure_time", "arrival_date", "arrival_time", "price")
+    def _sync_typed_schedule(self, key, value):
+        if key == "price":
+            self.price_amount = parse_price(value)
+            return value
+        side = key.split("_")[0]
+        day = value if key.endswith("_date") else getattr(self, f"{side}_date")
+        clock = value if key.endswith("_time") else getattr(self, f"{side}_time")
+        setattr(self, f"{side}_at", parse_timestamp(day, clock))
+        return value
+
+
+def _place_key(length: int):
+    # Binary collation on Postgres so prefix ranges on the normalized columns
+    # follow byte order, the same as SQLite's default BINARY collation.
+    return String(length).with_variant(String(length, collation="C"), "postgresql")
+
+
+class FlightDB(TypedSchedule, Versioned, Base):
     __tablename__ = "flights"
+    __table_args__ = (
+        # Route lookups, optionally narrowed to a departure window.
+        Index("ix_flights_route_departure", "origin_norm", "destination_norm", "departure_at"),
+        Index("ix_flights_destination_norm", "destination_norm"),
+        Index("ix_flights_departure_at", "departure_at", "id"),
+        Index("ix_flights_price_amount", "price_amount", "id"),
+        Index("ix_flights_company_id", "company_id", "id"),
+        # Natural key used by booking resolution and bulk upserts.
+        Index("ix_flights_natural_key", "flight_id", "departure_date"),
+        Index(
+            "ix_flights_origin_norm_trgm",
+            "origin_norm",
+            postgresql_using="gin",
+            postgresql_ops={"origin_norm": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_flights_destination_norm_trgm",
+            "destination_norm",
+            postgresql_using="gin",
+            postgresql_ops={"destination_norm": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     flight_id: Mapped[str] = mapped_column(String(8), nullable=False)
@@ -24,19 +167,35 @@ class FlightDB(Base):
     economy_seats: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     company_id: Mapped[int] = mapped_column(ForeignKey("companies.company_id", ondelete="CASCADE"), nullable=False)
     company: Mapped["CompanyDB"] = relationship(back_populates="flights")
+    origin_norm: Mapped[str] = mapped_column(_place_key(32), nullable=False)
+    destination_norm: Mapped[str] = mapped_column(_place_key(255), nullable=False)
+
+    @validates("origin", "destination")
+    def _sync_route_keys(self, key, value):
+        setattr(self, f"{key}_norm", normalize_place(value))
+        return value
 
-class CompanyDB(Base):
+class CompanyDB(Versioned, Base):
     __tablename__ = "companies"
+    # Looked up by bulk upserts; not unique, codes may repeat.
+    __table_args__ = (Index("ix_companies_code", "code"),)
     company_id: Mapped[int] = mapped_column(primary_key=True)
     code: Mapped[str] = mapped_column(String(3), nullable=False)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     country: Mapped[str] = mapped_column(String(100), nullable=False)
     email: Mapped[str] = mapped_column(String(255), nullable=False)
     phone: Mapped[str] = mapped_column(String(20), nullable=False)
-    flights: Mapped[List["FlightDB"]] = relationship(back_populates="company",cascade="all, delete-orphan")
+    flights: Mapped[List["FlightDB"]] = relationship(back_populates="company", cascade="all, delete-orphan", order_by="FlightDB.id")
 
-class BookingDB(Base):
+class BookingDB(TypedSchedule, Versioned, Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        Index("ix_bookings_user_id", "user_id", "id"),
+        Index("ix_bookings_flight_id", "flight_id"),
+        Index("ix_bookings_flight_pk", "flight_pk"),
+        # The hold sweeper's scan for the oldest pending bookings.
+        Index("ix_bookings_status_created_at", "status", "created_at", "id"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[str] = mapped_column(String(100), nullable=False)
     flight_id: Mapped[str] = mapped_column(String(8), nullable=False)
@@ -49,9 +208,112 @@ class BookingDB(Base):
     arrival_date: Mapped[str] = mapped_column(String(10), nullable=False)
     price: Mapped[str] = mapped_column(String(10), nullable=False)
     company_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    flight_pk: Mapped[Optional[int]] = mapped_column(ForeignKey("flights.id", ondelete="SET NULL"), nullable=True)
+    seat_class: Mapped[str] = mapped_column(String(10), nullable=False, default="economy")
+    seats: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
     payment_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     paid_at: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+
+class RouteDayDB(Base):
+    """Lowest fare on sale and seats left per route and departure day.
+
+    A summary of `flights`, recomputed per key by app.fares whenever a
+    flight or its seat inventory changes, so fare calendars read one row
+    per day instead of every flight.
+    """
+    __tablename__ = "route_days"
+    origin_norm: Mapped[str] = mapped_column(_place_key(32), primary_key=True)
+    destination_norm: Mapped[str] = mapped_column(_place_key(255), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    # Cheapest flight that still has seats; NULL when the day is sold out.
+    min_price: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 2), nullable=True)
+    seats: Mapped[int] = mapped_column(Integer, nullable=False)
+    flights: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class IdempotencyKeyDB(Base):
+    """An Idempotency-Key a client sent, with the response its first request got.
+
+    The primary key is what collapses concurrent duplicates; app.idempotency
+    claims a key by inserting its row.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+    scope: Mapped[str] = mapped_column(String(100), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Both NULL while the first request is still running.
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    response: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Naive UTC, compared against the app clock rather than the database's.
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class ChangeDB(Base):
+    """One row of the change feed outbox: which row was written, and how.
+
+    Inserted by app.changes in the same transaction as the write. `seq`
+    only grows (AUTOINCREMENT on SQLite, so pruned numbers are never
+    reused) and is the feed's cursor.
+    """
+    __tablename__ = "changes"
+    __table_args__ = (Index("ix_changes_changed_at", "changed_at"), {"sqlite_autoincrement": True})
+    seq: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(10), nullable=False)
+    # Naive UTC from the app clock, like idempotency_keys.expires_at.
+    changed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+@functools.cache
+def sqlite_has_fts5_trigram() -> bool:
+    """Whether the linked SQLite library offers FTS5 with the trigram tokenizer."""
+    if sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    with closing(sqlite3.connect(":memory:")) as conn:
+        try:
+            conn.execute("CREATE VIRTUAL TABLE probe USING fts5(x, tokenize='trigram')")
+        except sqlite3.OperationalError:
+            return False
+    return True
+
+
+def _fts5_available(ddl, target, bind, **kw):
+    return bind.dialect.name == "sqlite" and sqlite_has_fts5_trigram()
+
+
+# Fuzzy route search: pg_trgm GIN indexes on Postgres (declared above), an
+# external-content FTS5 trigram table kept in sync by triggers on SQLite.
+event.listen(
+    FlightDB.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+FLIGHTS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS flights_fts USING fts5("
+    "origin_norm, destination_norm, content='flights', content_rowid='id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS flights_fts_ai AFTER INSERT ON flights BEGIN "
+    "INSERT INTO flights_fts(rowid, origin_norm, destination_norm) "
+    "VALUES (new.id, new.origin_norm, new.destination_norm); END",
+    "CREATE TRIGGER IF NOT EXISTS flights_fts_ad AFTER DELETE ON flights BEGIN "
+    "INSERT INTO flights_fts(flights_fts, rowid, origin_norm, destination_norm) "
+    "VALUES ('delete', old.id, old.origin_norm, old.destination_norm); END",
+    "CREATE TRIGGER IF NOT EXISTS flights_fts_au "
+    "AFTER UPDATE OF origin_norm, destination_norm ON flights BEGIN "
+    "INSERT INTO flights_fts(flights_fts, rowid, origin_norm, destination_norm) "
+    "VALUES ('delete', old.id, old.origin_norm, old.destination_norm); "
+    "INSERT INTO flights_fts(rowid, origin_norm, destination_norm) "
+    "VALUES (new.id, new.origin_norm, new.destination_norm); END",
+)
+for _statement in FLIGHTS_FTS_DDL:
+    event.listen(
+        FlightDB.__table__,
+        "after_create",
+        DDL(_statement).execute_if(callable_=_fts5_available),
+    )
@@ -0,0 +1,109 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Query, Request, Response
+from sqlalchemy import Select, tuple_
+from sqlalchemy.orm import Session
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class PageParams:
+    limit: int
+    after: Optional[str]
+
+
+def page_params(
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    after: Optional[str] = Query(None, description="Cursor from X-Next-Cursor"),
+) -> PageParams:
+    return PageParams(limit=limit, after=after)
+
+
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError):
+        raise _invalid_cursor()
+    if not isinstance(values, list) or len(values) != size:
+        raise _invalid_cursor()
+    return values
+
+
+def _cursor_value(key, value):
+    # Cursors carry datetimes and decimals as strings; bind them back as the
+    # column's type so SQLite's DateTime accepts them and the order is typed.
+    # Anything that is not what the column's own cursor would hold is a 400,
+    # not a comparison the database rejects.
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise _invalid_cursor()
+    try:
+        python_type = key.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is int:
+            if not isinstance(value, int):
+                raise _invalid_cursor()
+            return value
+        if python_type in (datetime, date):
+            if not isinstance(value, str):
+                raise _invalid_cursor()
+            return python_type.fromisoformat(value)
+        if python_type is Decimal:
+            return Decimal(str(value))
+        if python_type is str and not isinstance(value, str):
+            raise _invalid_cursor()
+    except (TypeError, ValueError, InvalidOperation):
+        raise _invalid_cursor()
+    return value
+
+
+def paginate(
+    db: Session,
+    stmt: Select,
+    keys: Sequence,
+    page: PageParams,
+    request: Request,
+    response: Response,
+) -> list:
+    """Run `stmt` as one keyset page ordered by `keys` (ascending, unique).
+
+    When more rows remain, the cursor for the next page is returned in the
+    X-Next-Cursor header and as a rel="next" Link; the body stays a plain list.
+    """
+    if page.after:
+        values = [_cursor_value(key, value) for key, value in zip(keys, decode_cursor(page.after, len(keys)))]
+        if len(keys) == 1:
+            stmt = stmt.where(keys[0] > values[0])
+        else:
+            stmt = stmt.where(tuple_(*keys) > tuple_(*values))
+
+    rows = db.execute(stmt.order_by(*keys).limit(page.limit + 1)).scalars().all()
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        cursor = encode_cursor([getattr(rows[-1], key.key) for key in keys])
+        next_url = request.url.include_query_params(after=cursor)
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return rows
@@ -0,0 +1,158 @@
+"""Routing of read-only requests to database replicas.
+
+DATABASE_READ_URL names one or more replicas (comma-separated). GET
+handlers take their session from `get_read_db`, which picks a replica
+round-robin; everything else stays on the primary. Three things send a
+read back to the primary:
+
+- read-your-writes: a successful write sets the REPLICA_STICKY_COOKIE
+  cookie, and the client's reads go to the primary until it expires
+  DB_READ_STICKY_SECONDS later, long enough for replication to catch up;
+- a replica that fails to connect, or drops a connection mid-query, is
+  skipped for DB_REPLICA_RETRY_SECONDS;
+- no replica is configured, or every one is down.
+
+Other clients may read up to the replica's lag behind the primary, and a
+response cached from such a read lives until its cache TTL.
+"""
+import itertools
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import metrics
+
+REPLICA_STICKY_COOKIE = "db_read_primary_until"
+STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", "5"))
+RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+READS = metrics.registry.counter("db_read_sessions_total", "Read-only sessions by where they were served from.", ("target",))
+FAILURES = metrics.registry.counter("db_replica_failures_total", "Replica connection failures that took it out of rotation.", ("replica",))
+
+
+class Replica:
+    """One read replica: its engine, session factories and health."""
+
+    def __init__(self, name: str, engine, async_engine=None):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.sessions = sessionmaker(bind=engine, expire_on_commit=False)
+        self.async_sessions = None
+        self.down_until = 0.0
+        event.listen(engine, "handle_error", self._on_error)
+        if async_engine is not None:
+            self.async_sessions = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+            event.listen(async_engine.sync_engine, "handle_error", self._on_error)
+
+    @property
+    def healthy(self) -> bool:
+        return self.down_until <= time.monotonic()
+
+    def mark_down(self) -> None:
+        self.down_until = time.monotonic() + RETRY_SECONDS
+        FAILURES.inc(self.name)
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect:
+            self.mark_down()
+
+
+class ReplicaSet:
+    """The configured replicas, handed out round-robin while healthy."""
+
+    def __init__(self, replicas: list):
+        self.replicas = list(replicas)
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def candidates(self) -> list:
+        """Healthy replicas, starting from the next one in rotation."""
+        with self._lock:
+            start = next(self._turn) % len(self.replicas) if self.replicas else 0
+        rotated = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in rotated if replica.healthy]
+
+    def dispose(self, close: bool = True) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose(close=close)
+            if replica.async_engine is not None:
+                replica.async_engine.sync_engine.dispose(close=close)
+
+    def open(self, cookies) -> Optional[Session]:
+        """A session on a healthy replica, or None to use the primary."""
+        if self.replicas and not sticky(cookies):
+            for replica in self.candidates():
+                db = replica.sessions()
+                try:
+                    db.connection()
+                except DBAPIError:
+                    db.close()
+                    replica.mark_down()
+                    continue
+                READS.inc("replica")
+                return db
+        READS.inc("primary")
+        return None
+
+    async def open_async(self, cookies):
+        """The AsyncSession flavour of open()."""
+        if self.replicas and not sticky(cookies):
+            for replica in self.candidates():
+                if replica.async_sessions is None:
+                    continue
+                db = replica.async_sessions()
+                try:
+                    await db.connection()
+                except DBAPIError:
+                    await db.close()
+                    replica.mark_down()
+                    continue
+                READS.inc("replica")
+                return db
+        READS.inc("primary")
+        return None
+
+
+def sticky(cookies) -> bool:
+    """Whether the client wrote recently enough to need the primary."""
+    try:
+        return float(cookies.get(REPLICA_STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """Pin a client's reads to the primary for a while after it writes.
+
+    Sets REPLICA_STICKY_COOKIE on every successful response to an unsafe
+    method. Does nothing when `replicas` is empty.
+    """
+
+    def __init__(self, app, replicas: ReplicaSet):
+        self.app = app
+        self.replicas = replicas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS or not self.replicas:
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + STICKY_SECONDS
+                cookie = f"{REPLICA_STICKY_COOKIE}={until:.3f}; Max-Age={int(STICKY_SECONDS) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,152 @@
+"""JSON encoding for API responses.
+
+By default routes go through FastAPI's response_model path: the handler's
+return value is validated against the model, dumped to Python objects and
+encoded with the stdlib json module. With FAST_JSON_RESPONSES=true, routes
+whose response_model is one of our own read models are served by
+`TrustedModelRoute` instead, which validates ORM rows once and lets
+pydantic-core write the JSON bytes directly. Either way the bytes on the
+wire are the same.
+"""
+import copy
+import functools
+import inspect
+import os
+from typing import get_args, get_origin
+
+import pydantic_core
+from fastapi import Response
+from fastapi.routing import APIRoute, get_request_handler
+from pydantic import TypeAdapter
+
+from .metrics import TimedJSONResponse, serializing
+from .schemas import BookingRead, CompanyRead, FlightRead, FlightReadCompany
+
+try:
+    import orjson
+except ImportError:  # optional: pydantic-core's encoder is the fallback
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+FAST_JSON = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+# Output models built by this service from its own rows; their output is
+# already valid by construction, so it is never validated a second time.
+TRUSTED_MODELS = (FlightRead, CompanyRead, BookingRead)
+
+booking_adapter = TypeAdapter(BookingRead)
+booking_list_adapter = TypeAdapter(list[BookingRead])
+company_with_flights_list_adapter = TypeAdapter(list[FlightReadCompany])
+
+
+def dumps(content) -> bytes:
+    """Encode plain JSON-ready data; byte-identical to JSONResponse's compact output."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return pydantic_core.to_json(content)
+
+
+def model_response(adapter: TypeAdapter, value, response: Response, status_code: int = 200) -> Response:
+    """Validate ORM rows and encode them to JSON in a single pass.
+
+    Returning a Response skips FastAPI's serialize_response, which would
+    dump a returned model to dicts and validate those again against the
+    route's response_model (still declared, for OpenAPI). Headers already set
+    on the injected `response`, such as ETag or X-Next-Cursor, are kept.
+    """
+    with serializing():
+        body = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+    return Response(body, status_code=status_code, media_type=JSON_MEDIA_TYPE, headers=response.headers)
+
+
+def json_response(content, response: Response) -> Response:
+    """Send JSON-ready `content` as it is, keeping the injected response's headers.
+
+    For bodies that deliberately don't match the route's response_model,
+    such as sparse fieldsets, which FastAPI would otherwise reject.
+    """
+    response_class = FastJSONResponse if FAST_JSON else TimedJSONResponse
+    return response_class(content, headers=response.headers)
+
+
+class EncodedJSON(str):
+    """A response body that is already JSON text.
+
+    FastAPI's jsonable_encoder hands str instances back untouched, so this
+    passes through serialize_response to FastJSONResponse as is.
+    """
+
+
+class FastJSONResponse(TimedJSONResponse):
+    def render(self, content) -> bytes:
+        with serializing():
+            if isinstance(content, EncodedJSON):
+                return content.encode()
+            return dumps(content)
+
+
+def is_trusted(response_model) -> bool:
+    if get_origin(response_model) is list:
+        (response_model,) = get_args(response_model)
+    return isinstance(response_model, type) and issubclass(response_model, TRUSTED_MODELS)
+
+
+def _encoder(response_model):
+    adapter = TypeAdapter(response_model)
+
+    def encode(result):
+        if isinstance(result, Response):
+            return result
+        with serializing():
+            # Cached bodies are dicts that a read model already dumped in
+            # JSON mode; only ORM rows and model instances need validating.
+            first = result[0] if isinstance(result, list) and result else result
+            if isinstance(first, dict):
+                return EncodedJSON(dumps(result).decode())
+            return EncodedJSON(adapter.dump_json(adapter.validate_python(result, from_attributes=True)).decode())
+
+    return encode
+
+
+class TrustedModelRoute(APIRoute):
+    """APIRoute that encodes trusted read models without re-validating them.
+
+    The endpoint's return value is turned into JSON text right after the
+    handler returns, and the request handler is built without a response
+    field so FastAPI does not validate it again. response_model is left in
+    place, so the OpenAPI schema is unchanged. Headers, status codes and
+    Response return values behave as on a normal route.
+    """
+
+    def get_route_handler(self):
+        if not FAST_JSON or self.response_field is None or not is_trusted(self.response_model):
+            return super().get_route_handler()
+
+        call, encode = self.dependant.call, _encoder(self.response_model)
+        if inspect.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def encoded(**values):
+                return encode(await call(**values))
+        else:
+            @functools.wraps(call)
+            def encoded(**values):
+                return encode(call(**values))
+
+        dependant = copy.copy(self.dependant)
+        dependant.call = encoded
+        return get_request_handler(
+            dependant=dependant,
+            body_field=self.body_field,
+            status_code=self.status_code,
+            response_class=FastJSONResponse,
+            response_field=None,
+            response_model_include=self.response_model_include,
+            response_model_exclude=self.response_model_exclude,
+            response_model_by_alias=self.response_model_by_alias,
+            response_model_exclude_unset=self.response_model_exclude_unset,
+            response_model_exclude_defaults=self.response_model_exclude_defaults,
+            response_model_exclude_none=self.response_model_exclude_none,
+            dependency_overrides_provider=self.dependency_overrides_provider,
+            embed_body_fields=self._embed_body_fields,
+        )
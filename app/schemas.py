@@ -1,6 +1,8 @@
 from typing import Annotated, Optional, List
 from annotated_types import Ge, Le
-from pydantic import BaseModel, EmailStr, ConfigDict, StringConstraints, Field
+from pydantic import BaseModel, EmailStr, ConfigDict, StringConstraints, Field, PlainSerializer
+from datetime import date, datetime
+from decimal import Decimal
 from enum import Enum
  
 FlightNameStr = Annotated[str, StringConstraints(min_length=1, max_length=100)]
@@ -18,6 +20,8 @@ CompanyAirlineCodeStr = Annotated[str, StringConstraints(min_length=1, max_lengt
 CompanyCountryStr = Annotated[str, StringConstraints(min_length=2, max_length=100)]
 CompanyEmailStr = EmailStr
 CompanyPhoneStr = Annotated[str, StringConstraints(min_length=5, max_length=20)]
+# Read straight off the ORM row; rendered as ISO 8601, "" when unset.
+Timestamp = Annotated[Optional[datetime], PlainSerializer(lambda value: value.isoformat() if value else "", return_type=str)]
  
 class FlightCreate(BaseModel):
     name: FlightNameStr
@@ -78,6 +82,24 @@ class FlightRead(BaseModel):
     company_id: int
 
 
+class ItineraryRead(BaseModel):
+    price: Decimal
+    duration_minutes: int
+    stops: int
+    departure_at: datetime
+    arrival_at: datetime
+    legs: List[FlightRead]
+
+
+class FareDayRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    day: date
+    # Lowest price among the day's flights with seats left; null when sold out.
+    min_price: Optional[Decimal] = None
+    seats: int
+    flights: int
+
+
 class CompanyRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     company_id: int
@@ -118,13 +140,24 @@ class CompanyUpdate(BaseModel):
     phone: Optional[CompanyPhoneStr] = None
  
 class FlightReadCompany(CompanyRead):
-    flights: Optional[FlightRead] = Field(default_factory=list) 
+    flights: List[FlightRead] = Field(default_factory=list)
+
+class FlightInclude(str, Enum):
+    COMPANY = "company"
+
+class CompanyInclude(str, Enum):
+    FLIGHTS = "flights"
 
 class BookingStatus(str, Enum):
     PENDING = "pending"
     PAID = "paid"
     CANCELLED = "cancelled"
 
+class SeatClass(str, Enum):
+    ECONOMY = "economy"
+    BUSINESS = "business"
+
+BookingSeatsInt = Annotated[int, Ge(1), Le(9)]
 BookingUserIdStr = Annotated[str, StringConstraints(min_length=1, max_length=100)]
 BookingFlightIdStr = Annotated[str, StringConstraints(min_length=1, max_length=8)]
 BookingStatusStr = Annotated[str, StringConstraints(min_length=1, max_length=20)]
@@ -144,6 +177,14 @@ class BookingCreate(BaseModel):
     status: BookingStatus = Field(default=BookingStatus.PENDING)
     payment_id: Optional[str] = None
     paid_at: Optional[str] = None
+    flight_pk: Optional[int] = Field(default=None, description="Flight row id; looked up from flight_id, departure_date and company_id when omitted")
+    seat_class: SeatClass = Field(default=SeatClass.ECONOMY)
+    seats: BookingSeatsInt = Field(default=1, description="Number of seats to reserve")
+
+class BookingCreateForFlight(BaseModel):
+    user_id: BookingUserIdStr
+    seat_class: SeatClass = Field(default=SeatClass.ECONOMY)
+    seats: BookingSeatsInt = Field(default=1, description="Number of seats to reserve")
 
 class BookingUpdate(BaseModel):
     status: Optional[BookingStatus] = None
@@ -167,5 +208,31 @@ class BookingRead(BaseModel):
     status: str
     payment_id: Optional[str] = None
     paid_at: Optional[str] = None
-    created_at: str
-    updated_at: str
+    flight_pk: Optional[int] = None
+    seat_class: str = SeatClass.ECONOMY.value
+    seats: int = 1
+    created_at: Timestamp = None
+    updated_at: Timestamp = None
+
+class ChangeRead(BaseModel):
+    seq: int
+    entity: str
+    id: int
+    op: str
+    changed_at: datetime
+    # The row as it is now; null once it has been deleted.
+    data: Optional[dict] = None
+
+class BulkMode(str, Enum):
+    INSERT = "insert"
+    UPSERT = "upsert"
+
+class BulkRowError(BaseModel):
+    index: int
+    detail: str
+
+class BulkResult(BaseModel):
+    created: int
+    updated: int
+    ids: List[Optional[int]]
+    errors: List[BulkRowError] = Field(default_factory=list)
@@ -0,0 +1,130 @@
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Optional
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, select, text
+from sqlalchemy.orm import Session
+
+from .models import FlightDB, normalize_place, sqlite_has_fts5_trigram
+
+
+class MatchMode(str, Enum):
+    EXACT = "exact"
+    PREFIX = "prefix"
+    FUZZY = "fuzzy"
+
+
+class FlightSort(str, Enum):
+    ID = "id"
+    PRICE = "price"
+    DEPARTURE = "departure"
+
+
+@dataclass
+class FlightFilters:
+    departure_from: Optional[date]
+    departure_to: Optional[date]
+    min_price: Optional[Decimal]
+    max_price: Optional[Decimal]
+
+
+def flight_filters(
+    departure_from: Optional[date] = Query(None, description="First departure day, inclusive (YYYY-MM-DD)"),
+    departure_to: Optional[date] = Query(None, description="Last departure day, inclusive (YYYY-MM-DD)"),
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+) -> FlightFilters:
+    if departure_from and departure_to and departure_from > departure_to:
+        raise HTTPException(status_code=400, detail="departure_from is after departure_to")
+    return FlightFilters(departure_from, departure_to, min_price, max_price)
+
+
+def apply_flight_filters(stmt: Select, filters: FlightFilters) -> Select:
+    """Date windows and price bounds as range predicates on the typed columns."""
+    if filters.departure_from:
+        stmt = stmt.where(FlightDB.departure_at >= datetime.combine(filters.departure_from, time.min))
+    if filters.departure_to:
+        stmt = stmt.where(FlightDB.departure_at < datetime.combine(filters.departure_to + timedelta(days=1), time.min))
+    if filters.min_price is not None:
+        stmt = stmt.where(FlightDB.price_amount >= filters.min_price)
+    if filters.max_price is not None:
+        stmt = stmt.where(FlightDB.price_amount <= filters.max_price)
+    return stmt
+
+
+def sort_keys(stmt: Select, sort: FlightSort) -> tuple[Select, list]:
+    """Keyset order for `sort`, with the id as tie-breaker.
+
+    Rows whose price or departure could not be parsed have no place in that
+    order, so they are left out rather than paged through as NULLs.
+    """
+    if sort is FlightSort.PRICE:
+        return stmt.where(FlightDB.price_amount.is_not(None)), [FlightDB.price_amount, FlightDB.id]
+    if sort is FlightSort.DEPARTURE:
+        return stmt.where(FlightDB.departure_at.is_not(None)), [FlightDB.departure_at, FlightDB.id]
+    return stmt, [FlightDB.id]
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    # Smallest string greater than every string starting with `prefix`, or
+    # None when there is none: U+10FFFF has no successor, so trailing ones
+    # are dropped before the last character is bumped.
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return None
+    return stem[:-1] + chr(ord(stem[-1]) + 1)
+
+
+def _fts_rowids(column: str, term: str):
+    # FTS5 phrase query restricted to one column; quotes are doubled per FTS5 syntax.
+    phrase = '"' + term.replace('"', '""') + '"'
+    return text(
+        "SELECT rowid FROM flights_fts WHERE flights_fts MATCH :q"
+    ).bindparams(q=f"{column} : {phrase}")
+
+
+def _route_clause(db: Session, column, name: str, term: str, mode: MatchMode):
+    if mode is MatchMode.EXACT:
+        return column == term
+    if mode is MatchMode.PREFIX:
+        upper = _prefix_upper_bound(term)
+        if upper is None:
+            return column >= term
+        return (column >= term) & (column < upper)
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # pg_trgm similarity, served by the GIN trigram indexes.
+        return column.op("%")(term) | column.startswith(term, autoescape=True)
+    if dialect == "sqlite" and len(term) >= 3 and sqlite_has_fts5_trigram():
+        return FlightDB.id.in_(_fts_rowids(name, term))
+    return column.contains(term, autoescape=True)
+
+
+def route_search(
+    db: Session,
+    origin: Optional[str] = None,
+    destination: Optional[str] = None,
+    mode: MatchMode = MatchMode.PREFIX,
+) -> Select:
+    """Build a flight search on the normalized, indexed route columns."""
+    stmt = select(FlightDB)
+    if origin:
+        term = normalize_place(origin)
+        if term:
+            stmt = stmt.where(
+                _route_clause(db, FlightDB.origin_norm, "origin_norm", term, mode)
+            )
+    if destination:
+        term = normalize_place(destination)
+        if term:
+            stmt = stmt.where(
+                _route_clause(
+                    db, FlightDB.destination_norm, "destination_norm", term, mode
+                )
+            )
+    return stmt
@@ -0,0 +1,53 @@
+"""In-process snapshots of the flight fields a booking copies onto its row.
+
+A booking stores the flight's number, name, route, schedule, price and
+airline. POST /api/flights/{id}/bookings fills those in from this cache,
+so the booking path costs one SELECT per flight per TTL instead of one per
+booking. Seat counts are not part of a snapshot, so bookings never
+invalidate it. Flight writes drop the flight's snapshot
+(main.flights_changed), and a company delete drops its flights'
+snapshots. Like the response cache, the snapshots are per process.
+Another worker's flight edit reaches this process after at most
+FLIGHT_SNAPSHOT_TTL_SECONDS.
+"""
+import os
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .cache import LRUCache
+from .models import FlightDB
+
+# BookingDB column -> the FlightDB column it is copied from.
+BOOKING_FLIGHT_COLUMNS = {
+    "flight_id": FlightDB.flight_id,
+    "flight_name": FlightDB.name,
+    "origin": FlightDB.origin,
+    "destination": FlightDB.destination,
+    "departure_time": FlightDB.departure_time,
+    "arrival_time": FlightDB.arrival_time,
+    "departure_date": FlightDB.departure_date,
+    "arrival_date": FlightDB.arrival_date,
+    "price": FlightDB.price,
+    "company_id": FlightDB.company_id,
+}
+
+flight_snapshots = LRUCache(
+    max_entries=int(os.getenv("FLIGHT_SNAPSHOT_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("FLIGHT_SNAPSHOT_TTL_SECONDS", "60")),
+)
+
+
+def flight_snapshot(db: Session, flight_pk: int) -> Optional[dict]:
+    """The booking's copy of flight `flight_pk`, or None if there is no such flight."""
+    key = f"flight:{flight_pk}"
+    snapshot = flight_snapshots.get(key)
+    if snapshot is None:
+        stmt = select(*BOOKING_FLIGHT_COLUMNS.values()).where(FlightDB.id == flight_pk)
+        row = db.execute(stmt).one_or_none()
+        if row is None:
+            return None
+        snapshot = dict(zip(BOOKING_FLIGHT_COLUMNS, row))
+        flight_snapshots.set(key, snapshot, [key, f"company:{snapshot['company_id']}"])
+    return snapshot
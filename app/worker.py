@@ -0,0 +1,17 @@
+"""The gunicorn worker class for production serving; see gunicorn.conf.py."""
+from uvicorn_worker import UvicornWorker
+
+
+class ServiceWorker(UvicornWorker):
+    """uvicorn's gunicorn worker, with the app lifespan on and a graceful drain.
+
+    On SIGTERM (a deploy, or a max_requests restart) the worker stops
+    accepting connections and gives in-flight requests up to gunicorn's
+    graceful_timeout to finish before the lifespan shutdown runs.
+    """
+
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto", "lifespan": "on"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = self.cfg.graceful_timeout
@@ -0,0 +1,81 @@
+"""Sync (threadpool) vs async (DB_ASYNC) request handling under load.
+
+    python -m benchmarks.bench_async --concurrency 50 200 1000 --requests 5000
+
+For each mode a single uvicorn worker serves a seeded SQLite file (or
+--url) with the response cache disabled, so every request reaches the
+database.  The mix is flight detail reads plus a paged list.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+
+from app.migrations import upgrade
+
+from .datagen import populate
+from .loadgen import drive, wait_until_up
+
+
+def serve(url: str, port: int, async_mode: bool) -> subprocess.Popen:
+    env = os.environ | {
+        "DATABASE_URL": url,
+        "DB_ASYNC": "true" if async_mode else "false",
+        "CACHE_BACKEND": "none",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def measure(base_url: str, flights: int, concurrency: int, total: int) -> dict:
+    rng = random.Random(1)
+    paths = [f"/api/flights/{rng.randrange(1, flights + 1)}" for _ in range(200)]
+    paths += ["/api/flights?limit=20"] * 20
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60, trust_env=False) as client:
+        return await drive(client, paths, concurrency, total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL (default: seeded temporary SQLite file)")
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{Path(tmp) / 'load.db'}"
+        if not args.url:
+            engine = create_engine(url)
+            upgrade(engine)
+            populate(engine, args.flights)
+            engine.dispose()
+
+        for async_mode in (False, True):
+            server = serve(url, args.port, async_mode)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                wait_until_up(base_url)
+                for concurrency in args.concurrency:
+                    result = asyncio.run(measure(base_url, args.flights, concurrency, args.requests))
+                    mode = "async" if async_mode else "sync"
+                    print(json.dumps({"mode": mode, "concurrency": concurrency, **result}))
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Connecting-itinerary search on a synthetic flight network.
+
+    python -m benchmarks.bench_itineraries                  # 50k flights
+    python -m benchmarks.bench_itineraries --flights 200000
+    python -m benchmarks.bench_itineraries --months 1     # same flights, 12x denser
+
+Loads the network into a fresh SQLite file and reports:
+
+  build    - full graph load from the database
+  refresh  - incremental sync after --changed flights are rewritten
+  search   - /api/itineraries/search's graph search and leg loading for
+             random origin/destination/day triples, per max_stops and sort
+
+Prints one JSON object per line.
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+from app.itineraries import ItinerarySort, RouteGraph, load_itineraries
+from app.migrations import upgrade
+from app.models import FlightDB, normalize_place
+
+from .datagen import AIRPORTS, populate
+from .bench_search import percentile
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flights", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--changed", type=int, default=100)
+    parser.add_argument("--months", type=int, default=12, help="spread departures over this many months")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'itineraries.db'}")
+        upgrade(engine)
+        populate(engine, args.flights, seed=args.seed, months=args.months)
+        graph = RouteGraph(ttl=float("inf"))
+        rng = random.Random(args.seed)
+
+        with Session(engine) as db:
+            build_ms = timed(lambda: graph.sync(db))
+            print(json.dumps({"step": "build", "flights": args.flights, **graph.stats(), "ms": round(build_ms, 1)}))
+
+            changed = rng.sample(range(1, args.flights + 1), args.changed)
+            with engine.begin() as conn:
+                conn.execute(update(FlightDB).where(FlightDB.id.in_(changed)).values(price_amount=FlightDB.price_amount + 1))
+            graph.invalidate(*changed)
+            refresh_ms = timed(lambda: graph.sync(db))
+            print(json.dumps({"step": "refresh", "changed": args.changed, "ms": round(refresh_ms, 2), "full_build_ms": round(build_ms, 1)}))
+
+            queries = [
+                (*(normalize_place(a) for a in rng.sample(AIRPORTS, 2)), date(2025, rng.randrange(1, args.months + 1), rng.randrange(1, 29)))
+                for _ in range(args.queries)
+            ]
+            for max_stops in (0, 1, 2):
+                for sort in ItinerarySort:
+                    search_ms, total_ms, found = [], [], []
+                    for origin, destination, day in queries:
+                        started = time.perf_counter()
+                        paths = graph.search(origin, destination, day, max_stops, sort, limit=5)
+                        searched = time.perf_counter()
+                        load_itineraries(db, paths)
+                        search_ms.append((searched - started) * 1000)
+                        total_ms.append((time.perf_counter() - started) * 1000)
+                        found.append(len(paths))
+                        db.expunge_all()
+                    print(json.dumps({
+                        "step": "search",
+                        "max_stops": max_stops,
+                        "sort": sort.value,
+                        "queries": args.queries,
+                        "avg_itineraries": round(statistics.mean(found), 2),
+                        "search_p50_ms": round(statistics.median(search_ms), 3),
+                        "search_p99_ms": round(percentile(search_ms, 99), 3),
+                        "with_legs_p50_ms": round(statistics.median(total_ms), 3),
+                    }))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""List endpoint latency with the default vs FAST_JSON_RESPONSES encoder.
+
+    python -m benchmarks.bench_responses --rows 10000 --repeat 20
+
+For each mode a uvicorn worker serves the same seeded SQLite file with the
+response cache disabled. Each list endpoint is read as one 1k-row page and
+then walked through ten 1k-row pages (10k rows) following X-Next-Cursor.
+Reports median milliseconds and rows/sec, and checks that both modes
+return identical bytes. --fields reads a sparse fieldset instead, e.g.
+--fields id,flight_id,origin,destination,departure_date,departure_time,price
+(flight fields; booking lists share all of these).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from sqlalchemy import create_engine
+
+from app.migrations import upgrade
+
+from .datagen import populate
+from .loadgen import wait_until_up
+
+PAGE = 1000
+ENDPOINTS = ("/api/flights", "/api/bookings", "/api/companies/1/flights")
+
+
+def serve(url: str, port: int, fast: bool) -> subprocess.Popen:
+    env = os.environ | {
+        "DATABASE_URL": url,
+        "CACHE_BACKEND": "none",
+        "FAST_JSON_RESPONSES": "true" if fast else "false",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+def walk(client: httpx.Client, path: str, rows: int, fields: Optional[str] = None) -> tuple:
+    """Read `rows` rows of `path` page by page; returns (seconds, bodies)."""
+    base = {"limit": PAGE} | ({"fields": fields} if fields else {})
+    bodies, params = [], base
+    started = time.perf_counter()
+    while sum(len(json.loads(b)) for b in bodies) < rows:
+        resp = client.get(path, params=params)
+        resp.raise_for_status()
+        bodies.append(resp.content)
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = base | {"after": cursor}
+    return time.perf_counter() - started, bodies
+
+
+def measure(base_url: str, rows: int, repeat: int, fields: Optional[str] = None) -> dict:
+    results, bodies = {}, {}
+    with httpx.Client(base_url=base_url, timeout=120, trust_env=False) as client:
+        for path in ENDPOINTS:
+            for total in (PAGE, rows):
+                timings = []
+                for _ in range(repeat):
+                    seconds, pages = walk(client, path, total, fields)
+                    timings.append(seconds)
+                returned = sum(len(json.loads(b)) for b in pages)
+                median = statistics.median(timings)
+                results[f"{path} {total}"] = {
+                    "rows": returned,
+                    "ms": round(median * 1000, 1),
+                    "rows_per_sec": round(returned / median),
+                }
+                bodies[f"{path} {total}"] = pages
+    return {"results": results, "bodies": bodies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000, help="rows per walked list (and flights/bookings seeded)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--fields", help="comma-separated sparse fieldset to request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'responses.db'}"
+        engine = create_engine(url)
+        upgrade(engine)
+        # One company, so /api/companies/1/flights lists every flight.
+        populate(engine, flights=args.rows, companies=1, bookings=args.rows)
+        engine.dispose()
+
+        measured = {}
+        for fast in (False, True):
+            server = serve(url, args.port, fast)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                wait_until_up(base_url)
+                measured[fast] = measure(base_url, args.rows, args.repeat, args.fields)
+            finally:
+                server.terminate()
+                server.wait()
+
+        assert measured[False]["bodies"] == measured[True]["bodies"], "modes returned different bytes"
+        for key, default in measured[False]["results"].items():
+            fast = measured[True]["results"][key]
+            print(json.dumps({
+                "endpoint": key,
+                "default_ms": default["ms"],
+                "fast_ms": fast["ms"],
+                "default_rows_per_sec": default["rows_per_sec"],
+                "fast_rows_per_sec": fast["rows_per_sec"],
+                "speedup": round(default["ms"] / fast["ms"], 2),
+            }))
+
+
+if __name__ == "__main__":
+    main()
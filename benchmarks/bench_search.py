@@ -0,0 +1,84 @@
+"""Route search latency: legacy ILIKE scan vs. indexed exact/prefix/fuzzy.
+
+    python -m benchmarks.bench_search                 # 10k, 100k, 1M flights
+    python -m benchmarks.bench_search --sizes 10000   # just one size
+
+Each size is loaded into a fresh SQLite file; the queries are the ones
+`/api/flights/search` issues, executed through a Session so the numbers
+include ORM row construction.  Prints one JSON object per (size, mode).
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models import Base, FlightDB
+from app.search import MatchMode, route_search
+
+from .datagen import AIRPORTS, populate
+
+
+def _legacy(db, origin, destination):
+    return select(FlightDB).where(
+        FlightDB.origin.ilike(f"%{origin}%"),
+        FlightDB.destination.ilike(f"%{destination}%"),
+    )
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(size: int, queries: int, seed: int = 0) -> list[dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        populate(engine, size, seed=seed)
+
+        rng = random.Random(seed)
+        pairs = [tuple(rng.sample(AIRPORTS, 2)) for _ in range(queries)]
+        modes = {
+            "legacy_ilike": lambda db, o, d: _legacy(db, o, d),
+            "exact": lambda db, o, d: route_search(db, o, d, MatchMode.EXACT),
+            "prefix": lambda db, o, d: route_search(db, o[:2], d[:2], MatchMode.PREFIX),
+            "fuzzy": lambda db, o, d: route_search(db, o, d, MatchMode.FUZZY),
+        }
+        results = []
+        with Session(engine) as db:
+            for mode, build in modes.items():
+                timings = []
+                for origin, destination in pairs:
+                    start = time.perf_counter()
+                    db.execute(build(db, origin, destination).order_by(FlightDB.id)).scalars().all()
+                    timings.append((time.perf_counter() - start) * 1000)
+                    db.expunge_all()
+                results.append({
+                    "size": size,
+                    "mode": mode,
+                    "queries": queries,
+                    "p50_ms": round(statistics.median(timings), 3),
+                    "p99_ms": round(percentile(timings, 99), 3),
+                })
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    for size in args.sizes:
+        for row in run(size, args.queries):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Booking list serialization: hand-built dicts vs the single-pass adapter.
+
+    python -m benchmarks.bench_serialize --rows 100 1000 10000
+
+"dicts" is what the booking routes used to do: build a dict per row with
+isoformat() timestamps, then let FastAPI validate the list against
+response_model and JSON-encode it. "adapter" is app.responses.model_response:
+validate straight from the ORM rows and dump JSON bytes in one go.
+Reports rows/sec for each.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models import BookingDB
+from app.responses import booking_list_adapter, model_response
+from app.schemas import BookingRead
+
+RESPONSE_FIELD = create_model_field(name="Response", type_=list[BookingRead], mode="serialization")
+
+
+def booking_rows(count: int) -> list:
+    created = datetime(2025, 11, 1, tzinfo=timezone.utc)
+    return [
+        BookingDB(
+            id=i,
+            user_id=f"user-{i % 500}",
+            flight_id=f"F{i % 10**7:07d}",
+            flight_name="DUB-LHR",
+            origin="DUB",
+            destination="LHR",
+            departure_time="10:30",
+            arrival_time="12:00",
+            departure_date="20/11/2025",
+            arrival_date="20/11/2025",
+            price="€100",
+            company_id=1,
+            flight_pk=i,
+            seat_class="economy",
+            seats=1,
+            status="confirmed",
+            payment_id=None,
+            paid_at=None,
+            created_at=created + timedelta(seconds=i),
+            updated_at=created + timedelta(seconds=i),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def hand_built(b: BookingDB) -> dict:
+    return {
+        "id": b.id,
+        "user_id": b.user_id,
+        "flight_id": b.flight_id,
+        "flight_name": b.flight_name,
+        "origin": b.origin,
+        "destination": b.destination,
+        "departure_time": b.departure_time,
+        "arrival_time": b.arrival_time,
+        "departure_date": b.departure_date,
+        "arrival_date": b.arrival_date,
+        "price": b.price,
+        "company_id": b.company_id,
+        "status": b.status,
+        "payment_id": b.payment_id,
+        "paid_at": b.paid_at,
+        "flight_pk": b.flight_pk,
+        "seat_class": b.seat_class,
+        "seats": b.seats,
+        "created_at": b.created_at.isoformat() if b.created_at else "",
+        "updated_at": b.updated_at.isoformat() if b.updated_at else "",
+    }
+
+
+def via_dicts(rows) -> bytes:
+    content = asyncio.run(serialize_response(field=RESPONSE_FIELD, response_content=[hand_built(b) for b in rows]))
+    return JSONResponse(content).body
+
+
+def via_adapter(rows) -> bytes:
+    return model_response(booking_list_adapter, rows, Response()).body
+
+
+def rows_per_second(fn, rows, min_seconds: float = 1.0) -> float:
+    done, started = 0, time.perf_counter()
+    while True:
+        fn(rows)
+        done += len(rows)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return done / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    for count in args.rows:
+        rows = booking_rows(count)
+        assert json.loads(via_dicts(rows)) == json.loads(via_adapter(rows))
+        result = {"rows": count}
+        for name, fn in (("dicts", via_dicts), ("adapter", via_adapter)):
+            result[f"{name}_rows_per_sec"] = round(rows_per_second(fn, rows))
+        result["speedup"] = round(result["adapter_rows_per_sec"] / result["dicts_rows_per_sec"], 2)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Throughput of the production server from 1 to N gunicorn workers.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --concurrency 200 --requests 10000
+
+For each worker count, `gunicorn app.main:app` (configured by
+gunicorn.conf.py) serves a seeded SQLite file in WAL mode, or --url, with
+the response cache disabled so every request reaches the database. The mix
+is the same as bench_async's. Prints one JSON line per worker count, with
+`scaling` the throughput relative to the first count.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from app.migrations import upgrade
+
+from .bench_async import measure
+from .datagen import populate
+from .loadgen import wait_until_up
+
+
+def serve(url: str, port: int, workers: int) -> subprocess.Popen:
+    env = os.environ | {
+        "DATABASE_URL": url,
+        "SQLITE_WAL": "true",
+        "CACHE_BACKEND": "none",
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_ACCESS_LOG": "",
+    }
+    return subprocess.Popen(["gunicorn", "app.main:app", "--log-level", "warning"], env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL (default: seeded temporary SQLite file)")
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{Path(tmp) / 'load.db'}"
+        if not args.url:
+            engine = create_engine(url)
+            upgrade(engine)
+            populate(engine, args.flights)
+            engine.dispose()
+
+        baseline = None
+        for workers in args.workers:
+            server = serve(url, args.port, workers)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                wait_until_up(base_url)
+                result = asyncio.run(measure(base_url, args.flights, args.concurrency, args.requests))
+            finally:
+                server.terminate()
+                server.wait()
+            baseline = baseline or result["rps"]
+            print(json.dumps({"workers": workers, "concurrency": args.concurrency, **result, "scaling": round(result["rps"] / baseline, 2)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Diff two benchmark results and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Reads the --json output of benchmarks.micro or benchmarks.replay. Compares
+the median per call for micro cases, and p50/p95/p99 per route for replays.
+Prints one JSON object per case, with the change in percent (positive
+means slower). Exits 1 when any case got slower by more than --threshold
+percent, so a CI step can gate on it.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+REPLAY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def timings(document: dict) -> dict:
+    """{(case, metric): value} for either kind of result document."""
+    if document.get("benchmark") == "replay":
+        rows = {"overall": document["overall"], **document["routes"]}
+        return {(route, metric): row[metric] for route, row in rows.items() for metric in REPLAY_METRICS if row.get(metric) is not None}
+    return {(bench["fullname"], "median"): bench["stats"]["median"] for bench in document["benchmarks"]}
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    old, new = timings(baseline), timings(candidate)
+    rows = []
+    for case, metric in sorted(old.keys() & new.keys()):
+        before, after = old[case, metric], new[case, metric]
+        change = (after - before) / before * 100 if before else 0.0
+        rows.append({"case": case, "metric": metric, "baseline": before, "candidate": after, "change_pct": round(change, 1), "regressed": change > threshold})
+    for case, metric in sorted(old.keys() ^ new.keys()):
+        rows.append({"case": case, "metric": metric, "only_in": "baseline" if (case, metric) in old else "candidate"})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    baseline, candidate = (json.loads(Path(path).read_text()) for path in (args.baseline, args.candidate))
+    if baseline.get("benchmark") != candidate.get("benchmark"):
+        parser.error("the two files come from different benchmarks")
+    rows = compare(baseline, candidate, args.threshold)
+    for row in rows:
+        print(json.dumps(row))
+    return 1 if any(row.get("regressed") for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Synthetic companies/flights/bookings for benchmarks.
+
+    python -m benchmarks.datagen sqlite:///bench.db --flights 100000 --bookings 50000
+
+Rows are generated deterministically from a seed and inserted with Core
+executemany in chunks, so a million flights loads in seconds rather than
+going through the ORM one object at a time. The same seed and sizes always
+give the same database, so runs on different machines or commits compare.
+"""
+import argparse
+import json
+import random
+from typing import Iterator
+
+from sqlalchemy import create_engine, insert
+
+from app.fares import rebuild_route_days
+from app.migrations import upgrade
+from app.models import BookingDB, CompanyDB, FlightDB, with_derived_columns
+
+AIRPORTS = [
+    "DUB", "LHR", "LGW", "STN", "CDG", "ORY", "AMS", "FRA", "MUC", "MAD",
+    "BCN", "LIS", "OPO", "FCO", "MXP", "VIE", "ZRH", "GVA", "BRU", "CPH",
+    "ARN", "OSL", "HEL", "WAW", "PRG", "BUD", "ATH", "IST", "EDI", "MAN",
+    "BHX", "GLA", "SNN", "ORK", "KIR", "NOC", "BFS", "JFK", "BOS", "ORD",
+]
+
+CHUNK = 5_000
+
+
+def company_rows(count: int, seed: int = 0) -> Iterator[dict]:
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        yield {
+            "company_id": i,
+            "code": f"{rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}{i % 100:02d}",
+            "name": f"Airline {i}",
+            "country": "Ireland",
+            "email": f"ops{i}@airline.example",
+            "phone": f"0{rng.randrange(10**7, 10**8)}",
+        }
+
+
+def flight_rows(count: int, companies: int, seed: int = 0, months: int = 12) -> Iterator[dict]:
+    """Flights on random days of the first `months` months of 2025."""
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        day = rng.randrange(1, 29)
+        month = rng.randrange(1, months + 1)
+        hour = rng.randrange(5, 22)
+        yield with_derived_columns({
+            "id": i,
+            "name": f"{origin}-{destination}",
+            "flight_id": f"F{i % 10**7:07d}",
+            "origin": origin,
+            "destination": destination,
+            "departure_time": f"{hour:02d}:{rng.choice((0, 15, 30, 45)):02d}",
+            "arrival_time": f"{hour + 2:02d}:00",
+            "departure_date": f"{day:02d}/{month:02d}/2025",
+            "arrival_date": f"{day:02d}/{month:02d}/2025",
+            "price": f"€{rng.randrange(20, 900)}",
+            "business_seats": rng.randrange(0, 30),
+            "economy_seats": rng.randrange(0, 180),
+            "company_id": rng.randrange(1, companies + 1),
+        })
+
+
+def booking_rows(count: int, flights: int, companies: int, seed: int = 0, months: int = 12) -> Iterator[dict]:
+    """Bookings on the flights `flight_rows(flights, companies, seed, months)` generates."""
+    rng = random.Random(seed)
+    flight_list = list(flight_rows(flights, companies, seed, months))
+    for i in range(1, count + 1):
+        flight = flight_list[rng.randrange(flights)]
+        yield {
+            "id": i,
+            "user_id": f"user-{rng.randrange(1000)}",
+            "flight_pk": flight["id"],
+            "flight_id": flight["flight_id"],
+            "flight_name": flight["name"],
+            **{k: flight[k] for k in ("origin", "destination", "departure_time", "arrival_time", "departure_date", "arrival_date", "price")},
+            "company_id": flight["company_id"],
+            "status": rng.choice(("pending", "paid", "confirmed")),
+            "departure_at": flight["departure_at"],
+            "arrival_at": flight["arrival_at"],
+            "price_amount": flight["price_amount"],
+        }
+
+
+def _chunked(rows: Iterator[dict], size: int = CHUNK) -> Iterator[list[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def populate(engine, flights: int, companies: int = 50, seed: int = 0, bookings: int = 0, months: int = 12) -> None:
+    """Insert `companies` airlines, `flights` flights and `bookings` bookings into an empty schema."""
+    with engine.begin() as conn:
+        conn.execute(insert(CompanyDB), list(company_rows(companies, seed)))
+    for chunk in _chunked(flight_rows(flights, companies, seed, months)):
+        with engine.begin() as conn:
+            conn.execute(insert(FlightDB), chunk)
+    for chunk in _chunked(booking_rows(bookings, flights, companies, seed, months)):
+        with engine.begin() as conn:
+            conn.execute(insert(BookingDB), chunk)
+    # Core inserts skip the fare calendar's incremental upkeep.
+    with engine.begin() as conn:
+        rebuild_route_days(conn, CHUNK)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url", help="database URL; must be empty, it is migrated first")
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--bookings", type=int, default=0)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    upgrade(engine)
+    populate(engine, args.flights, args.companies, args.seed, args.bookings, args.months)
+    engine.dispose()
+    print(json.dumps(vars(args)))
+
+
+if __name__ == "__main__":
+    main()
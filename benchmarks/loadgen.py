@@ -0,0 +1,105 @@
+"""Closed-loop HTTP load generator shared by the server benchmarks."""
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from typing import NamedTuple, Optional
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(latencies_ms, errors, elapsed) -> dict:
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "rps": round(len(latencies_ms) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies_ms), 2) if latencies_ms else None,
+        "p95_ms": round(percentile(latencies_ms, 95), 2) if latencies_ms else None,
+        "p99_ms": round(percentile(latencies_ms, 99), 2) if latencies_ms else None,
+    }
+
+
+async def drive(client: httpx.AsyncClient, paths, concurrency: int, total: int, seed: int = 0) -> dict:
+    """Issue `total` GETs drawn from `paths` with `concurrency` in flight."""
+    rng = random.Random(seed)
+    plan = [rng.choice(paths) for _ in range(total)]
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while plan:
+            path = plan.pop()
+            start = time.perf_counter()
+            try:
+                r = await client.get(path)
+                ok = r.status_code < 500
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+class Call(NamedTuple):
+    route: str
+    method: str
+    path: str
+    json: Optional[object] = None
+
+
+async def replay(client: httpx.AsyncClient, plan: list, concurrency: int) -> dict:
+    """Issue the `plan` of Calls in order with `concurrency` in flight.
+
+    Returns the overall summary and one per route, each with its status
+    code counts, so a route that starts failing shows up next to its timings.
+    """
+    pending = list(reversed(plan))
+    latencies, statuses = defaultdict(list), defaultdict(Counter)
+
+    async def worker():
+        while pending:
+            call = pending.pop()
+            start = time.perf_counter()
+            try:
+                r = await client.request(call.method, call.path, json=call.json)
+                status = str(r.status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            latencies[call.route].append((time.perf_counter() - start) * 1000)
+            statuses[call.route][status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    def failed(counts):
+        return sum(n for status, n in counts.items() if not status.isdigit() or int(status) >= 500)
+
+    routes = {
+        route: {**summarize(samples, failed(statuses[route]), elapsed), "status": dict(sorted(statuses[route].items()))}
+        for route, samples in sorted(latencies.items())
+    }
+    everything = [ms for samples in latencies.values() for ms in samples]
+    overall = summarize(everything, sum(r["errors"] for r in routes.values()), elapsed)
+    return {"overall": overall, "routes": routes}
+
+
+def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/health", timeout=1, trust_env=False).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not come up")
@@ -0,0 +1,188 @@
+"""Microbenchmarks for the serialization and query paths.
+
+    python -m benchmarks.micro                          # everything, 10k flights
+    python -m benchmarks.micro -k query --flights 100000 --json micro.json
+
+Timed the way pytest-benchmark does it: each case is calibrated so one
+round lasts at least --min-time, then run for --rounds rounds, and the
+per-call min/max/mean/stddev/median/IQR and ops/sec are reported. The
+query cases run against a SQLite file seeded by benchmarks.datagen, through
+a Session so ORM row construction is included. Prints one JSON document
+whose layout (machine_info, params, benchmarks[].stats) follows
+pytest-benchmark's --benchmark-json.
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable
+
+import pydantic
+import sqlalchemy
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.migrations import upgrade
+from app.models import FlightDB, RouteDayDB
+from app.responses import booking_list_adapter, model_response
+from app.schemas import FlightRead
+from app.search import FlightFilters, FlightSort, MatchMode, apply_flight_filters, route_search, sort_keys
+
+from .bench_serialize import booking_rows
+from .datagen import AIRPORTS, populate
+
+flight_list_adapter = TypeAdapter(list[FlightRead])
+
+
+@dataclass
+class Case:
+    group: str
+    name: str
+    fn: Callable[[], object]
+
+
+def stats(per_call: list) -> dict:
+    quartiles = statistics.quantiles(per_call, n=4) if len(per_call) > 1 else [per_call[0]] * 3
+    mean = statistics.fmean(per_call)
+    return {
+        "min": min(per_call),
+        "max": max(per_call),
+        "mean": mean,
+        "stddev": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "median": statistics.median(per_call),
+        "iqr": quartiles[2] - quartiles[0],
+        "ops": 1 / mean if mean else 0.0,
+        "rounds": len(per_call),
+    }
+
+
+def measure(fn: Callable[[], object], rounds: int, min_time: float, warmup: int = 1) -> tuple:
+    """Per-call seconds for `rounds` rounds, and the iterations per round."""
+    for _ in range(warmup):
+        fn()
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        if time.perf_counter() - started >= min_time:
+            break
+        iterations *= 2
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_call.append((time.perf_counter() - started) / iterations)
+    return per_call, iterations
+
+
+def serialization_cases(rows: int) -> list:
+    bookings = booking_rows(rows)
+    flights = [
+        FlightDB(id=b.id, name=b.flight_name, flight_id=b.flight_id, origin=b.origin, destination=b.destination,
+                 departure_time=b.departure_time, arrival_time=b.arrival_time, departure_date=b.departure_date,
+                 arrival_date=b.arrival_date, price=b.price, business_seats=4, economy_seats=120, company_id=1)
+        for b in bookings
+    ]
+    return [
+        # What cached_flight_page does for a page of flights.
+        Case("serialize", f"flights_model_dump[{rows}]", lambda: [FlightRead.model_validate(f).model_dump(mode="json") for f in flights]),
+        Case("serialize", f"flights_adapter_json[{rows}]", lambda: flight_list_adapter.dump_json(flight_list_adapter.validate_python(flights, from_attributes=True))),
+        Case("serialize", f"bookings_model_response[{rows}]", lambda: model_response(booking_list_adapter, bookings, Response()).body),
+    ]
+
+
+def query_cases(db: Session, flights: int) -> list:
+    origin, destination = AIRPORTS[0], AIRPORTS[1]
+    window = FlightFilters(date(2025, 3, 1), date(2025, 3, 31), None, None)
+    cheap = FlightFilters(None, None, None, 300)
+
+    def rows(stmt):
+        result = db.execute(stmt).scalars().all()
+        db.expunge_all()
+        return result
+
+    def page(filters, sort, limit=20):
+        stmt, keys = sort_keys(apply_flight_filters(select(FlightDB), filters), sort)
+        return rows(stmt.order_by(*keys).limit(limit + 1))
+
+    none = FlightFilters(None, None, None, None)
+    return [
+        Case("query", "flight_by_pk", lambda: (db.get(FlightDB, flights // 2), db.expunge_all())),
+        Case("query", "list_first_page", lambda: page(none, FlightSort.ID)),
+        Case("query", "list_keyset_page", lambda: rows(select(FlightDB).where(FlightDB.id > flights // 2).order_by(FlightDB.id).limit(21))),
+        Case("query", "list_by_price_under_300", lambda: page(cheap, FlightSort.PRICE)),
+        Case("query", "list_departing_in_march", lambda: page(window, FlightSort.DEPARTURE)),
+        Case("query", "route_search_exact", lambda: rows(route_search(db, origin, destination, MatchMode.EXACT).order_by(FlightDB.id).limit(21))),
+        Case("query", "route_search_prefix", lambda: rows(route_search(db, origin[:2], destination[:2], MatchMode.PREFIX).order_by(FlightDB.id).limit(21))),
+        Case("query", "fare_calendar_month", lambda: rows(
+            select(RouteDayDB).where(
+                RouteDayDB.origin_norm == origin.casefold(),
+                RouteDayDB.destination_norm == destination.casefold(),
+                RouteDayDB.day.between(date(2025, 3, 1), date(2025, 3, 31)),
+            ).order_by(RouteDayDB.day)
+        )),
+    ]
+
+
+def machine_info() -> dict:
+    return {
+        "python_version": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "pydantic": pydantic.VERSION,
+        "sqlite": sqlite3.sqlite_version,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="select", default="", help="only cases whose group or name contains this")
+    parser.add_argument("--rows", type=int, default=100, help="rows per serialized page")
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--bookings", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--min-time", type=float, default=0.005, help="minimum seconds per round")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'micro.db'}")
+        upgrade(engine)
+        populate(engine, args.flights, seed=args.seed, bookings=args.bookings)
+        with Session(engine) as db:
+            for case in serialization_cases(args.rows) + query_cases(db, args.flights):
+                if args.select not in case.group and args.select not in case.name:
+                    continue
+                per_call, iterations = measure(case.fn, args.rounds, args.min_time)
+                results.append({
+                    "group": case.group,
+                    "name": case.name,
+                    "fullname": f"{case.group}::{case.name}",
+                    "iterations": iterations,
+                    "stats": stats(per_call),
+                })
+        engine.dispose()
+
+    params = {k: v for k, v in vars(args).items() if k != "json"}
+    document = json.dumps({"benchmark": "micro", "machine_info": machine_info(), "params": params, "benchmarks": results}, indent=2, sort_keys=True)
+    if args.json:
+        Path(args.json).write_text(document + "\n")
+    print(document)
+
+
+if __name__ == "__main__":
+    main()
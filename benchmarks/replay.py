@@ -0,0 +1,123 @@
+"""In-process load test: replay a weighted request mix against app.main:app.
+
+    python -m benchmarks.replay --flights 10000 --bookings 20000 --requests 5000
+    python -m benchmarks.replay --mix my_mix.jsonl --json replay.json
+
+The app is driven through httpx's ASGI transport, with no server or
+socket involved, against a seeded SQLite file, so the numbers are the
+application's own cost per route. The mix is JSON Lines, one request
+template per line:
+
+    {"route": "flight detail", "method": "GET", "path": "/api/flights/{flight_pk}", "weight": 30}
+
+`path` and any string in `json` may name fields of a seeded flight
+({flight_pk}, {flight_id}, {origin}, {destination}, {company_id},
+{departure_date}, ...) plus {day} (its ISO departure day), {month} and a
+{user_id}. A string that is exactly one placeholder keeps the field's
+type. The plan is drawn from --seed, so two runs issue the same requests.
+Prints one JSON document with throughput and p50/p95/p99 per route.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+
+from .datagen import flight_rows, populate
+from .loadgen import Call, replay
+
+DEFAULT_MIX = Path(__file__).with_name("mix.jsonl")
+_PLACEHOLDER = re.compile(r"^\{(\w+)\}$")
+
+
+def load_mix(path) -> list:
+    with open(path) as lines:
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+def fill(template, values: dict):
+    """Substitute `values` into a string, or every string in a JSON value."""
+    if isinstance(template, dict):
+        return {key: fill(value, values) for key, value in template.items()}
+    if isinstance(template, list):
+        return [fill(value, values) for value in template]
+    if isinstance(template, str):
+        whole = _PLACEHOLDER.match(template)
+        if whole:
+            return values[whole.group(1)]
+        return template.format_map(values)
+    return template
+
+
+def build_plan(mix: list, flights: list, total: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    weights = [entry.get("weight", 1) for entry in mix]
+    plan = []
+    for entry in rng.choices(mix, weights, k=total):
+        flight = rng.choice(flights)
+        values = {
+            **flight,
+            "flight_pk": flight["id"],
+            "day": flight["departure_at"].date().isoformat(),
+            "month": f"{flight['departure_at'].month:02d}",
+            "user_id": f"user-{rng.randrange(1000)}",
+        }
+        method = entry.get("method", "GET")
+        plan.append(Call(entry.get("route", f"{method} {entry['path']}"), method, fill(entry["path"], values), fill(entry.get("json"), values)))
+    return plan
+
+
+async def run_plan(app, plan: list, concurrency: int, warmup: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+        if warmup:
+            await replay(client, plan[:warmup], concurrency)
+        return await replay(client, plan[warmup:], concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="request mix, JSON Lines (default: benchmarks/mix.jsonl)")
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--bookings", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200, help="requests replayed first and left out of the results")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on (default: every read reaches the database)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'replay.db'}"
+        # Read by app.database and app.cache when app.main is imported.
+        os.environ["DATABASE_URL"] = url
+        os.environ.setdefault("CACHE_BACKEND", "lru" if args.cache else "none")
+        from app.main import app
+        from app.migrations import upgrade
+
+        engine = create_engine(url)
+        upgrade(engine)
+        populate(engine, args.flights, args.companies, args.seed, args.bookings)
+        engine.dispose()
+
+        flights = list(flight_rows(args.flights, args.companies, args.seed))
+        plan = build_plan(load_mix(args.mix), flights, args.warmup + args.requests, args.seed)
+        results = asyncio.run(run_plan(app, plan, args.concurrency, args.warmup))
+
+    params = {k: v for k, v in vars(args).items() if k != "json"} | {"mix": Path(args.mix).name}
+    document = json.dumps({"benchmark": "replay", "params": params, **results}, indent=2, sort_keys=True)
+    if args.json:
+        Path(args.json).write_text(document + "\n")
+    print(document)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Production serving: gunicorn supervising uvicorn workers.
+
+    gunicorn app.main:app          # picks this file up from the working directory
+
+One worker per CPU by default (WEB_CONCURRENCY overrides). app.main is
+imported once in the master and the workers fork from it, so they start
+fast and share its memory pages; each one then drops the database pool it
+inherited (post_fork) and opens its own connections. Workers are recycled
+after about GUNICORN_MAX_REQUESTS requests, with jitter so they do not all
+restart together, and drain in-flight requests for GUNICORN_GRACEFUL_TIMEOUT
+seconds on shutdown.
+
+Each worker keeps its own response cache, route graph and metrics, and runs
+its own hold sweeper; size DB_POOL_SIZE per worker accordingly.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8003')}")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "app.worker.ServiceWorker"
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    from app import database
+
+    database.dispose_after_fork()
+
+
+def worker_exit(server, worker):
+    from app import database
+
+    database.engine.dispose()
+    database.replicas.dispose()
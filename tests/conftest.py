@@ -1,5 +1,6 @@
 import os
 os.environ["DATABASE_URL"] = "sqlite+pysqlite://"
+os.environ["DB_AUTO_MIGRATE"] = "true"
 
 import pytest
 from fastapi.testclient import TestClient
@@ -8,7 +9,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app, get_db
-from app.models import Base
+from app.migrations import upgrade
 
 # Shared in-memory SQLite Database
 TEST_DB_URL = "sqlite+pysqlite://"
@@ -21,7 +22,7 @@ def enable_foreign_keys(dbapi_connection, connection_record):
 
 TestingSessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
-Base.metadata.create_all(bind=engine)
+upgrade(engine)
 
 @pytest.fixture
 def client():
@@ -0,0 +1,40 @@
+import asyncio
+
+from app.main import app
+from benchmarks.compare import compare
+from benchmarks.datagen import flight_rows
+from benchmarks.loadgen import Call
+from benchmarks.replay import build_plan, fill, run_plan
+
+
+def test_plan_is_reproducible_and_keeps_placeholder_types():
+    mix = [
+        {"route": "detail", "path": "/api/flights/{flight_pk}", "weight": 3},
+        {"route": "book", "method": "POST", "path": "/api/bookings", "json": {"flight_pk": "{flight_pk}", "note": "{origin}-{destination}"}},
+    ]
+    flights = list(flight_rows(20, 3, seed=4))
+    plan = build_plan(mix, flights, 50, seed=4)
+    assert plan == build_plan(mix, flights, 50, seed=4)
+    assert {call.route for call in plan} == {"detail", "book"}
+    post = next(call for call in plan if call.method == "POST")
+    assert isinstance(post.json["flight_pk"], int) and "-" in post.json["note"]
+    assert fill("/x?d={day}", {"day": "2025-03-01"}) == "/x?d=2025-03-01"
+
+
+def test_replay_reports_per_route_percentiles(client):
+    plan = [Call("health", "GET", "/health"), Call("missing", "GET", "/api/flights/999999")] * 10
+    results = asyncio.run(run_plan(app, plan, concurrency=4, warmup=2))
+    assert results["overall"]["requests"] == 18 and results["overall"]["errors"] == 0
+    assert results["routes"]["health"]["status"] == {"200": 9}
+    assert results["routes"]["missing"]["status"] == {"404": 9}
+    assert results["routes"]["health"]["p50_ms"] <= results["routes"]["health"]["p99_ms"]
+
+
+def test_compare_flags_slowdowns_over_the_threshold():
+    def micro(median):
+        return {"benchmark": "micro", "benchmarks": [{"fullname": "query::x", "stats": {"median": median}}]}
+
+    (row,) = compare(micro(1.0), micro(1.2), threshold=10)
+    assert row["change_pct"] == 20.0 and row["regressed"]
+    (row,) = compare(micro(1.0), micro(1.05), threshold=10)
+    assert not row["regressed"]
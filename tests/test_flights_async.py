@@ -0,0 +1,70 @@
+import inspect
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import database, main
+from app.cache import LRUCache
+from app.database import async_database_url
+from app.models import Base
+from app.schemas import CompanyRead, FlightRead, FlightReadWithCompany, BookingRead
+
+pytest.importorskip("aiosqlite")
+
+
+def company_payload():
+    return {"code": "ASY", "name": "AsyncCo", "country": "Ireland", "email": "info@async.com", "phone": "01234567"}
+
+def flight_payload(company_id):
+    return {"name": "Async", "flight_id": "F9900001", "origin": "DUB", "destination": "NOC", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "08-12-2025", "arrival_date": "08-12-2025", "price": "€100", "economy_seats": 1, "company_id": company_id}
+
+@pytest.fixture
+def async_client(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(sync_engine)
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(async_database_url(url))
+    sessions = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    monkeypatch.setattr(database, "DB_ASYNC", True)
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+    monkeypatch.setattr(main, "response_cache", LRUCache())
+
+    api = FastAPI()
+    api.post("/api/companies", response_model=CompanyRead, status_code=201)(main.db_endpoint(main.create_company))
+    api.post("/api/flights", response_model=FlightRead, status_code=201)(main.db_endpoint(main.create_flight))
+    api.get("/api/flights/search", response_model=list[FlightRead])(main.db_endpoint(main.search_flights))
+    api.get("/api/flights/{flight_id}", response_model=FlightReadWithCompany)(main.db_endpoint(main.get_flight))
+    api.post("/api/bookings", response_model=BookingRead, status_code=201)(main.db_endpoint(main.create_booking))
+    with TestClient(api) as c:
+        yield c
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_database_url("postgresql+psycopg://app:app@db:5432/flightdb") == "postgresql+psycopg://app:app@db:5432/flightdb"
+    assert async_database_url("postgresql://app:app@db/flightdb") == "postgresql+psycopg://app:app@db/flightdb"
+
+def test_db_endpoint_is_a_coroutine_only_in_async_mode(monkeypatch):
+    assert main.db_endpoint(main.get_flight) is main.get_flight
+    monkeypatch.setattr(database, "DB_ASYNC", True)
+    wrapped = main.db_endpoint(main.get_flight)
+    assert inspect.iscoroutinefunction(wrapped)
+    assert inspect.signature(wrapped).parameters["db"].annotation is main.AsyncSession
+
+def test_handlers_run_on_async_session(async_client):
+    cid = async_client.post("/api/companies", json=company_payload()).json()["company_id"]
+    flight = async_client.post("/api/flights", json=flight_payload(cid)).json()
+
+    detail = async_client.get(f"/api/flights/{flight['id']}")
+    assert detail.status_code == 200
+    assert detail.json()["company"]["name"] == "AsyncCo"
+    assert [f["id"] for f in async_client.get("/api/flights/search", params={"destination": "noc"}).json()] == [flight["id"]]
+
+    booking = {"user_id": "async-user", "flight_pk": flight["id"], "flight_id": flight["flight_id"], "flight_name": flight["name"], "origin": flight["origin"], "destination": flight["destination"], "departure_time": flight["departure_time"], "arrival_time": flight["arrival_time"], "departure_date": flight["departure_date"], "arrival_date": flight["arrival_date"], "price": flight["price"], "company_id": cid}
+    assert async_client.post("/api/bookings", json=booking).status_code == 201
+    assert async_client.post("/api/bookings", json=booking).status_code == 409
+    assert async_client.get("/api/flights/999").status_code == 404
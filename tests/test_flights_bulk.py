@@ -0,0 +1,79 @@
+from app import bulk
+
+
+def company_payload(code, name="BulkCo"):
+    return {"code": code, "name": name, "country": "Ireland", "email": "info@bulk.com", "phone": "01234567"}
+
+def flight_payload(company_id, flight_id, departure_date="01-12-2025", price="€100"):
+    return {"name": "Bulk", "flight_id": flight_id, "origin": "DUB", "destination": "Bulk Town", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": departure_date, "arrival_date": departure_date, "price": price, "company_id": company_id}
+
+def test_bulk_flights_insert_reports_conflicts(client):
+    cid = client.post("/api/companies", json=company_payload("BK1")).json()["company_id"]
+    rows = [
+        flight_payload(cid, "F9100001"),
+        flight_payload(cid, "F9100002"),
+        flight_payload(cid, "F9100001"),       # duplicate within the batch
+        flight_payload(999999, "F9100003"),    # unknown company
+    ]
+    r = client.post("/api/flights:bulk", json=rows)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["created"] == 2 and data["updated"] == 0
+    assert data["ids"][2] is None and data["ids"][3] is None
+    assert [e["index"] for e in data["errors"]] == [2, 3]
+
+    created = client.get(f"/api/flights/{data['ids'][0]}").json()
+    assert created["flight_id"] == "F9100001"
+
+    # Same rows again in insert mode: everything already exists.
+    again = client.post("/api/flights:bulk", json=rows[:2]).json()
+    assert again["created"] == 0
+    assert {e["detail"] for e in again["errors"]} == {"Already exists"}
+
+def test_bulk_flights_upsert_on_flight_and_date(client):
+    cid = client.post("/api/companies", json=company_payload("BK2")).json()["company_id"]
+    first = client.post("/api/flights:bulk", json=[flight_payload(cid, "F9200001")]).json()
+
+    rows = [
+        flight_payload(cid, "F9200001", price="€55"),
+        flight_payload(cid, "F9200001", departure_date="02-12-2025"),
+    ]
+    r = client.post("/api/flights:bulk", params={"mode": "upsert"}, json=rows)
+    data = r.json()
+    assert data["created"] == 1 and data["updated"] == 1
+    assert data["ids"][0] == first["ids"][0]
+    assert client.get(f"/api/flights/{first['ids'][0]}").json()["price"] == "€55"
+
+    found = client.get("/api/flights/search", params={"destination": "bulk town", "match": "exact", "company_id": cid})
+    assert len(found.json()) == 2
+
+def test_bulk_flights_span_several_chunks(client, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+    cid = client.post("/api/companies", json=company_payload("BK3")).json()["company_id"]
+    rows = [flight_payload(cid, f"F93{n:05d}") for n in range(5)]
+    data = client.post("/api/flights:bulk", json=rows).json()
+    assert data["created"] == 5
+    assert len(set(data["ids"])) == 5
+
+def test_bulk_companies_upsert_on_code(client):
+    r = client.post("/api/companies:bulk", json=[company_payload("Q1A"), company_payload("Q2A")])
+    data = r.json()
+    assert data["created"] == 2
+
+    r = client.post("/api/companies:bulk", params={"mode": "upsert"}, json=[company_payload("Q1A", name="Renamed")])
+    data2 = r.json()
+    assert data2["updated"] == 1
+    assert client.get(f"/api/companies/{data['ids'][0]}").json()["name"] == "Renamed"
+
+def test_bulk_write_isolates_rows_that_fail_in_the_database(client):
+    from conftest import TestingSessionLocal
+    from app.models import FlightDB, with_derived_columns
+    from app.schemas import BulkMode
+
+    cid = client.post("/api/companies", json=company_payload("BK4")).json()["company_id"]
+    rows = [with_derived_columns(flight_payload(c, f"F94{n:05d}")) for n, c in enumerate([cid, 999999, cid])]
+    with TestingSessionLocal() as db:
+        outcome = bulk.bulk_write(db, FlightDB, rows, ("flight_id", "departure_date"), BulkMode.INSERT)
+    assert outcome.created == 2
+    assert outcome.ids[1] is None and outcome.ids[0] and outcome.ids[2]
+    assert outcome.errors == [{"index": 1, "detail": "Rejected by a database constraint"}]
@@ -0,0 +1,107 @@
+import fnmatch
+
+from app.cache import LRUCache, RedisCache
+
+
+def company_payload(name="CacheCo"):
+    return {"code": "CCH", "name": name, "country": "Ireland", "email": "info@cache.com", "phone": "01234567"}
+
+def flight_payload(company_id, flight_id="F9700001"):
+    return {"name": "Cached", "flight_id": flight_id, "origin": "DUB", "destination": "Cache City", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "06-12-2025", "arrival_date": "06-12-2025", "price": "€100", "economy_seats": 3, "company_id": company_id}
+
+def booking_payload(flight):
+    return {"user_id": "cache-user", "flight_pk": flight["id"], "flight_id": flight["flight_id"], "flight_name": flight["name"], "origin": flight["origin"], "destination": flight["destination"], "departure_time": flight["departure_time"], "arrival_time": flight["arrival_time"], "departure_date": flight["departure_date"], "arrival_date": flight["arrival_date"], "price": flight["price"], "company_id": flight["company_id"]}
+
+def test_flight_reads_are_cached_and_invalidated(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    fid = client.post("/api/flights", json=flight_payload(cid)).json()["id"]
+
+    client.get(f"/api/flights/{fid}")
+    hits = client.get("/metrics/cache").json()["hits"]
+    assert client.get(f"/api/flights/{fid}").json()["name"] == "Cached"
+    assert client.get("/metrics/cache").json()["hits"] == hits + 1
+
+    assert client.patch(f"/api/flights/{fid}", json={"name": "Renamed"}).status_code == 200
+    assert client.get(f"/api/flights/{fid}").json()["name"] == "Renamed"
+
+    # Company writes reach the flight detail that embeds the company.
+    assert client.patch(f"/api/companies/{cid}", json={"name": "CacheCo Renamed"}).status_code == 200
+    assert client.get(f"/api/flights/{fid}").json()["company"]["name"] == "CacheCo Renamed"
+    assert client.get(f"/api/companies/{cid}").json()["name"] == "CacheCo Renamed"
+
+def test_lists_see_new_flights_and_seat_changes(client):
+    cid = client.post("/api/companies", json=company_payload(name="CacheCo2")).json()["company_id"]
+    flight = client.post("/api/flights", json=flight_payload(cid)).json()
+    params = {"company_id": cid}
+    assert [f["economy_seats"] for f in client.get("/api/flights", params=params).json()] == [3]
+
+    assert client.post("/api/bookings", json=booking_payload(flight)).status_code == 201
+    assert [f["economy_seats"] for f in client.get("/api/flights", params=params).json()] == [2]
+    search = {"destination": "cache city", "company_id": cid}
+    assert len(client.get("/api/flights/search", params=search).json()) == 1
+
+    client.post("/api/flights", json=flight_payload(cid, "F9700002"))
+    assert len(client.get("/api/flights", params=params).json()) == 2
+    assert len(client.get("/api/flights/search", params=search).json()) == 2
+
+    assert client.delete(f"/api/companies/{cid}").status_code == 204
+    assert client.get("/api/flights", params=params).json() == []
+    assert client.get(f"/api/flights/{flight['id']}").status_code == 404
+
+def test_lru_evicts_and_expires():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", 1, ["t"])
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)            # evicts b, the least recently used
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    cache.invalidate("t")
+    assert cache.get("a") is None and cache.get("c") == 3
+
+    expired = LRUCache(ttl=-1)
+    expired.set("x", 1)
+    assert expired.get("x") is None
+    assert expired.stats()["evictions"] == 1
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member)
+
+    def expire(self, key, seconds):
+        pass
+
+    def smembers(self, key):
+        return set(self.data.get(key, ()))
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+def test_redis_backend_round_trip_and_tags():
+    cache = RedisCache(client=FakeRedis(), ttl=30)
+    cache.set("/api/flights/1?", {"id": 1}, ["flight:1"])
+    cache.set("/api/flights?", [{"id": 1}], ["flights", "flight:1"])
+    assert cache.get("/api/flights/1?") == {"id": 1}
+    cache.invalidate("flight:1")
+    assert cache.get("/api/flights/1?") is None
+    assert cache.get("/api/flights?") is None
+    assert cache.stats() | {"backend": None} == {"backend": None, "hits": 1, "misses": 2, "evictions": 0, "invalidations": 2}
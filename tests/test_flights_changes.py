@@ -0,0 +1,143 @@
+import asyncio
+import json
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app import changes
+from app.models import ChangeDB
+
+from conftest import TestingSessionLocal
+
+
+def company_payload():
+    return {"code": "CHG", "name": "ChangeCo", "country": "Ireland", "email": "info@change.com", "phone": "01234567"}
+
+def flight_payload(company_id, flight_id="F9850001"):
+    return {"name": "Change", "flight_id": flight_id, "origin": "DUB", "destination": "Change City", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "12-12-2025", "arrival_date": "12-12-2025", "price": "€100", "economy_seats": 1, "company_id": company_id}
+
+
+def head():
+    with TestingSessionLocal() as db:
+        return changes.head(db)
+
+
+def feed(client, since):
+    return [(c["entity"], c["op"], c["id"]) for c in client.get(f"/api/changes?since={since}&limit=1000").json()]
+
+
+def test_writes_land_in_the_feed_with_their_current_rows(client):
+    start = head()
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    flight = client.post("/api/flights", json=flight_payload(cid)).json()
+    booking = client.post(f"/api/flights/{flight['id']}/bookings", json={"user_id": "change-user"}).json()
+    # Sold out: the refused booking leaves nothing behind.
+    assert client.post(f"/api/flights/{flight['id']}/bookings", json={"user_id": "change-user"}).status_code == 409
+    client.patch(f"/api/flights/{flight['id']}", json={"price": "€110"})
+    client.delete(f"/api/bookings/{booking['id']}")
+    bulk = client.post("/api/flights:bulk", json=[flight_payload(cid, "F9850002")]).json()
+
+    fid, bid = flight["id"], booking["id"]
+    assert feed(client, start) == [
+        ("company", "insert", cid),
+        ("flight", "insert", fid),
+        ("flight", "update", fid),
+        ("booking", "insert", bid),
+        ("flight", "update", fid),
+        ("booking", "delete", bid),
+        ("flight", "update", fid),
+        ("flight", "insert", bulk["ids"][0]),
+    ]
+    records = client.get(f"/api/changes?since={start}&limit=2").json()
+    assert [r["seq"] for r in records] == [start + 1, start + 2]
+    assert records[0]["data"]["code"] == "CHG"
+    assert (records[1]["data"]["price"], records[1]["data"]["economy_seats"]) == ("€110", 1)
+    assert client.get(f"/api/changes?since={start + 5}&limit=1").json()[0]["data"] is None
+
+    # Deleting the company cascades to its flights.
+    mark = head()
+    client.delete(f"/api/companies/{cid}")
+    assert sorted(feed(client, mark)) == [("company", "delete", cid), ("flight", "delete", fid), ("flight", "delete", bulk["ids"][0])]
+
+
+def test_a_batch_waits_at_a_fresh_gap(client, monkeypatch):
+    monkeypatch.setattr(changes, "SETTLE_SECONDS", 60)
+    start = head()
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    with TestingSessionLocal() as db:
+        # seq start + 2 is still "in flight" in another transaction.
+        db.execute(insert(ChangeDB).values(seq=start + 3, entity="company", entity_id=cid, op="update", changed_at=datetime.utcnow()))
+        db.commit()
+    assert feed(client, start) == [("company", "insert", cid)]
+
+    with TestingSessionLocal() as db:
+        db.execute(insert(ChangeDB).values(seq=start + 4, entity="company", entity_id=cid, op="update", changed_at=datetime.utcnow()))
+        db.commit()
+    monkeypatch.setattr(changes, "SETTLE_SECONDS", 0)
+    assert feed(client, start + 1) == [("company", "update", cid)] * 2
+
+
+class Client:
+    """Stands in for the streaming request; disconnects when told to."""
+
+    def __init__(self):
+        self.gone = False
+
+    async def is_disconnected(self):
+        return self.gone
+
+
+def events(chunk):
+    return [json.loads(line[len("data: "):]) for line in chunk.splitlines() if line.startswith("data: ")]
+
+
+def test_stream_catches_up_then_pushes_new_changes(client, monkeypatch):
+    monkeypatch.setattr(changes, "POLL_SECONDS", 5)
+    start = head()
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+
+    async def scenario():
+        stream = changes.stream(TestingSessionLocal, Client(), start, limit=10)
+        try:
+            assert (await anext(stream)).startswith("retry:")
+            caught_up = events(await anext(stream))
+            assert [(e["entity"], e["op"], e["id"]) for e in caught_up] == [("company", "insert", cid)]
+
+            # A write in this process wakes the stream well before the next poll.
+            pending = asyncio.ensure_future(anext(stream))
+            await asyncio.sleep(0.05)
+            await asyncio.to_thread(client.put, f"/api/companies/{cid}", json=company_payload() | {"name": "Renamed"})
+            pushed = events(await asyncio.wait_for(pending, 2))
+            assert pushed[0]["seq"] == caught_up[0]["seq"] + 1
+            assert pushed[0]["data"]["name"] == "Renamed"
+            assert len(changes.notifier) == 1
+        finally:
+            await stream.aclose()
+        assert len(changes.notifier) == 0
+
+    asyncio.run(scenario())
+
+
+def test_stream_ends_when_the_client_disconnects(client, monkeypatch):
+    monkeypatch.setattr(changes, "POLL_SECONDS", 0.01)
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    since = head() - 1
+
+    async def scenario():
+        request = Client()
+        received = []
+        async for chunk in changes.stream(TestingSessionLocal, request, since, limit=10):
+            received += events(chunk)
+            request.gone = bool(received)
+        return received
+
+    received = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert [(e["seq"], e["entity"], e["id"]) for e in received] == [(since + 1, "company", cid)]
+    assert len(changes.notifier) == 0
+
+
+def test_stream_endpoint_turns_clients_away_at_the_cap(client, monkeypatch):
+    monkeypatch.setattr(changes, "MAX_STREAMS", 0)
+    response = client.get("/api/changes/stream")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
@@ -0,0 +1,77 @@
+def company_payload(name="EtagCo"):
+    return {"code": "ETG", "name": name, "country": "Ireland", "email": "info@etag.com", "phone": "01234567"}
+
+def flight_payload(company_id, flight_id="F9800001"):
+    return {"name": "Tagged", "flight_id": flight_id, "origin": "DUB", "destination": "ORK", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "07-12-2025", "arrival_date": "07-12-2025", "price": "€100", "economy_seats": 3, "company_id": company_id}
+
+def booking_payload(flight):
+    return {"user_id": "etag-user", "flight_pk": flight["id"], "flight_id": flight["flight_id"], "flight_name": flight["name"], "origin": flight["origin"], "destination": flight["destination"], "departure_time": flight["departure_time"], "arrival_time": flight["arrival_time"], "departure_date": flight["departure_date"], "arrival_date": flight["arrival_date"], "price": flight["price"], "company_id": flight["company_id"]}
+
+def test_flight_conditional_get(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    fid = client.post("/api/flights", json=flight_payload(cid)).json()["id"]
+
+    r = client.get(f"/api/flights/{fid}")
+    etag = r.headers["ETag"]
+    r = client.get(f"/api/flights/{fid}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["ETag"] == etag
+
+    client.patch(f"/api/companies/{cid}", json={"name": "EtagCo Renamed"})
+    r = client.get(f"/api/flights/{fid}", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+def test_flight_if_match(client):
+    cid = client.post("/api/companies", json=company_payload(name="EtagCo2")).json()["company_id"]
+    fid = client.post("/api/flights", json=flight_payload(cid)).json()["id"]
+    etag = client.get(f"/api/flights/{fid}").headers["ETag"]
+
+    r = client.patch(f"/api/flights/{fid}", json={"name": "First"}, headers={"If-Match": etag})
+    assert r.status_code == 200
+    new_etag = r.headers["ETag"]
+    assert new_etag != etag
+    assert client.get(f"/api/flights/{fid}").headers["ETag"] == new_etag
+
+    # A second writer still holding the old ETag loses.
+    r = client.put(f"/api/flights/{fid}", json=flight_payload(cid) | {"name": "Second"}, headers={"If-Match": etag})
+    assert r.status_code == 412
+    assert client.get(f"/api/flights/{fid}").json()["name"] == "First"
+
+def test_company_and_booking_etags(client):
+    cid = client.post("/api/companies", json=company_payload(name="EtagCo3")).json()["company_id"]
+    etag = client.get(f"/api/companies/{cid}").headers["ETag"]
+    assert client.get(f"/api/companies/{cid}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.patch(f"/api/companies/{cid}", json={"phone": "55555555"}, headers={"If-Match": etag}).status_code == 200
+    assert client.patch(f"/api/companies/{cid}", json={"phone": "66666666"}, headers={"If-Match": etag}).status_code == 412
+
+    flight = client.post("/api/flights", json=flight_payload(cid)).json()
+    bid = client.post("/api/bookings", json=booking_payload(flight)).json()["id"]
+    etag = client.get(f"/api/bookings/{bid}").headers["ETag"]
+    assert client.get(f"/api/bookings/{bid}", headers={"If-None-Match": etag}).status_code == 304
+    r = client.put(f"/api/bookings/{bid}", json={"status": "paid"}, headers={"If-Match": etag})
+    assert r.status_code == 200
+    assert client.get(f"/api/bookings/{bid}", headers={"If-None-Match": etag}).status_code == 200
+
+def test_collection_etags(client):
+    cid = client.post("/api/companies", json=company_payload(name="EtagCo4")).json()["company_id"]
+    flight = client.post("/api/flights", json=flight_payload(cid)).json()
+    params = {"company_id": cid}
+
+    etag = client.get("/api/flights", params=params).headers["ETag"]
+    assert client.get("/api/flights", params=params, headers={"If-None-Match": etag}).status_code == 304
+    nested = client.get(f"/api/companies/{cid}/flights").headers["ETag"]
+    assert client.get(f"/api/companies/{cid}/flights", headers={"If-None-Match": nested}).status_code == 304
+
+    # A booking changes the seat count, so the page is no longer the same.
+    client.post("/api/bookings", json=booking_payload(flight))
+    r = client.get("/api/flights", params=params, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()[0]["economy_seats"] == 2
+    assert client.get(f"/api/companies/{cid}/flights", headers={"If-None-Match": nested}).status_code == 200
+
+    etag = client.get("/api/users/etag-user/bookings").headers["ETag"]
+    assert client.get("/api/users/etag-user/bookings", headers={"If-None-Match": etag}).status_code == 304
+    etag = client.get("/api/companies", params={"code": "ETG"}).headers["ETag"]
+    assert client.get("/api/companies", params={"code": "ETG"}, headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,34 @@
+import json
+
+
+def company_payload(name="ExportCo"):
+    return {"code": "EXP", "name": name, "country": "Ireland", "email": "info@export.com", "phone": "01234567"}
+
+def flight_payload(company_id, n):
+    return {"name": f"Export {n}", "flight_id": f"F82{n:05d}", "origin": "DUB", "destination": "CDG", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "20-11-2025", "arrival_date": "20-11-2025", "price": "€100", "economy_seats": 5, "company_id": company_id}
+
+def booking_payload(user_id, company_id):
+    return {"user_id": user_id, "flight_id": "F8200001", "flight_name": "Export 1", "origin": "DUB", "destination": "CDG", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "20-11-2025", "arrival_date": "20-11-2025", "price": "€100", "company_id": company_id}
+
+def test_export_flights_ndjson(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    ids = [client.post("/api/flights", json=flight_payload(cid, n)).json()["id"] for n in range(3)]
+
+    r = client.get("/api/flights/export", params={"company_id": cid})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["id"] for row in rows] == ids
+    detail = client.get(f"/api/flights/{ids[0]}").json()
+    detail.pop("company")
+    assert rows[0] == detail
+
+def test_export_bookings_matches_get(client):
+    cid = client.post("/api/companies", json=company_payload(name="ExportCo2")).json()["company_id"]
+    assert client.post("/api/flights", json=flight_payload(cid, 1)).status_code == 201
+    created = client.post("/api/bookings", json=booking_payload("export-user", cid)).json()
+
+    r = client.get("/api/bookings/export", params={"user_id": "export-user"})
+    assert r.status_code == 200
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert rows == [client.get(f"/api/bookings/{created['id']}").json()]
@@ -0,0 +1,84 @@
+import itertools
+
+import pytest
+
+_run = itertools.count()
+
+
+def company_payload(name):
+    return {"code": "FAR", "name": name, "country": "Ireland", "email": "info@fares.com", "phone": "01234567"}
+
+
+def flight_payload(company_id, flight_id, origin, destination, departure_date, price, seats):
+    return {"name": "Fares", "flight_id": flight_id, "origin": origin, "destination": destination, "departure_time": "10:00", "arrival_time": "12:00", "departure_date": departure_date, "arrival_date": departure_date, "price": price, "economy_seats": seats, "company_id": company_id}
+
+
+def booking_payload(flight, seats):
+    return {"user_id": "fares-user", "flight_pk": flight["id"], "flight_id": flight["flight_id"], "flight_name": flight["name"], "origin": flight["origin"], "destination": flight["destination"], "departure_time": flight["departure_time"], "arrival_time": flight["arrival_time"], "departure_date": flight["departure_date"], "arrival_date": flight["arrival_date"], "price": flight["price"], "company_id": flight["company_id"], "seats": seats}
+
+
+@pytest.fixture
+def route(client):
+    n = next(_run)
+    origin, destination = f"Fare Origin {n}", f"Fare Destination {n}"
+    cid = client.post("/api/companies", json=company_payload(f"FareCo {n}")).json()["company_id"]
+    flight_ids = (f"F99{n:02d}{i:03d}" for i in itertools.count())
+
+    def add(departure_date, price, seats, to=destination):
+        payload = flight_payload(cid, next(flight_ids), origin, to, departure_date, price, seats)
+        resp = client.post("/api/flights", json=payload)
+        assert resp.status_code == 201, resp.text
+        return resp.json()
+
+    def calendar(to=destination):
+        resp = client.get("/api/fares/calendar", params={"origin": origin, "destination": to, "departure_from": "2026-04-01", "departure_to": "2026-04-30"})
+        assert resp.status_code == 200, resp.text
+        return [(d["day"][-2:], d["min_price"], d["seats"], d["flights"]) for d in resp.json()]
+
+    return {"add": add, "calendar": calendar, "company_id": cid, "origin": origin}
+
+
+def test_calendar_follows_flight_writes(client, route):
+    cheap = route["add"]("01/04/2026", "€100", 5)
+    route["add"]("01/04/2026", "€80", 0)
+    later = route["add"]("02/04/2026", "€200", 2)
+    assert route["calendar"]() == [("01", "100.00", 5, 2), ("02", "200.00", 2, 1)]
+
+    client.patch(f"/api/flights/{cheap['id']}", json={"price": "€50"})
+    assert route["calendar"]()[0] == ("01", "50.00", 5, 2)
+
+    client.patch(f"/api/flights/{cheap['id']}", json={"departure_date": "03/04/2026"})
+    assert route["calendar"]() == [("01", None, 0, 1), ("02", "200.00", 2, 1), ("03", "50.00", 5, 1)]
+
+    client.put(f"/api/flights/{later['id']}", json={**later, "destination": "Elsewhere", "economy_seats": 9})
+    assert route["calendar"]() == [("01", None, 0, 1), ("03", "50.00", 5, 1)]
+    assert route["calendar"]("Elsewhere")[-1] == ("02", "200.00", 9, 1)
+
+    client.delete(f"/api/flights/{cheap['id']}")
+    assert route["calendar"]() == [("01", None, 0, 1)]
+
+    client.delete(f"/api/companies/{route['company_id']}")
+    assert route["calendar"]() == []
+
+
+def test_calendar_follows_bookings_and_bulk_upserts(client, route):
+    flight = route["add"]("10/04/2026", "€120", 2)
+    route["add"]("10/04/2026", "€300", 4)
+
+    booking = client.post("/api/bookings", json=booking_payload(flight, 2)).json()
+    assert route["calendar"]() == [("10", "300.00", 4, 2)]
+    client.put(f"/api/bookings/{booking['id']}", json={"status": "cancelled"})
+    assert route["calendar"]() == [("10", "120.00", 6, 2)]
+
+    moved = {k: flight[k] for k in flight if k not in ("id",)} | {"departure_date": "10/04/2026", "destination": "Bulk Moved", "price": "€90"}
+    resp = client.post("/api/flights:bulk?mode=upsert", json=[moved])
+    assert resp.json()["updated"] == 1
+    assert route["calendar"]() == [("10", "300.00", 4, 1)]
+    assert route["calendar"]("Bulk Moved")[-1] == ("10", "90.00", 2, 1)
+
+
+def test_calendar_validation(client):
+    params = {"origin": "DUB", "destination": "LHR", "departure_from": "2026-05-02", "departure_to": "2026-05-01"}
+    assert client.get("/api/fares/calendar", params=params).status_code == 400
+    params |= {"departure_from": "2025-01-01", "departure_to": "2026-05-01"}
+    assert client.get("/api/fares/calendar", params=params).status_code == 400
@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from app import main, responses
+from app.cache import LRUCache
+
+
+def company_payload():
+    return {"code": "FJS", "name": "Fäst Jsön", "country": "Ireland", "email": "info@fastjson.com", "phone": "01234567"}
+
+def flight_payload(company_id, flight_id):
+    return {"name": "Fast €", "flight_id": flight_id, "origin": "DUB", "destination": "Fast City", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "09-12-2025", "arrival_date": "09-12-2025", "price": "€100", "economy_seats": 5, "company_id": company_id}
+
+def booking_payload(flight):
+    return {"user_id": "fast-user", "flight_pk": flight["id"], "flight_id": flight["flight_id"], "flight_name": flight["name"], "origin": flight["origin"], "destination": flight["destination"], "departure_time": flight["departure_time"], "arrival_time": flight["arrival_time"], "departure_date": flight["departure_date"], "arrival_date": flight["arrival_date"], "price": flight["price"], "company_id": flight["company_id"]}
+
+
+@pytest.fixture
+def fast_client(client, monkeypatch):
+    """The app's routes rebuilt with FAST_JSON_RESPONSES on, sharing the test database."""
+    monkeypatch.setattr(responses, "FAST_JSON", True)
+    monkeypatch.setattr(main, "response_cache", LRUCache())
+    api = FastAPI(default_response_class=responses.FastJSONResponse)
+    api.router.route_class = responses.TrustedModelRoute
+    for route in main.app.routes:
+        if isinstance(route, APIRoute):
+            api.add_api_route(
+                route.path,
+                route.endpoint,
+                response_model=route.response_model,
+                status_code=route.status_code,
+                methods=list(route.methods),
+                name=route.name,
+            )
+    api.dependency_overrides.update(main.app.dependency_overrides)
+    with TestClient(api) as c:
+        yield c
+
+
+def test_fast_mode_is_byte_identical(client, fast_client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    flight = client.post("/api/flights", json=flight_payload(cid, "F9300001")).json()
+    created = fast_client.post("/api/flights", json=flight_payload(cid, "F9300002"))
+    assert created.status_code == 201
+    assert created.json().keys() == flight.keys() and created.json()["name"] == "Fast €"
+    bid = client.post("/api/bookings", json=booking_payload(flight)).json()["id"]
+
+    for path in (
+        f"/api/flights?company_id={cid}",
+        f"/api/flights/search?destination=fast&company_id={cid}&limit=1",
+        f"/api/flights/{flight['id']}",
+        f"/api/companies/{cid}",
+        f"/api/companies/{cid}/flights",
+        "/api/companies?code=FJS",
+        f"/api/bookings/{bid}",
+        "/api/users/fast-user/bookings",
+        "/api/flights/999999",
+    ):
+        slow, fast = client.get(path), fast_client.get(path)
+        assert (fast.status_code, fast.content) == (slow.status_code, slow.content), path
+        for header in ("ETag", "X-Next-Cursor", "content-type"):
+            assert fast.headers.get(header) == slow.headers.get(header), (path, header)
+
+    etag = fast_client.get(f"/api/flights/{flight['id']}").headers["ETag"]
+    assert fast_client.get(f"/api/flights/{flight['id']}", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_only_read_models_are_trusted():
+    from app.schemas import BulkResult, CompanyRead, FlightReadWithCompany
+
+    assert responses.is_trusted(list[CompanyRead])
+    assert responses.is_trusted(FlightReadWithCompany)
+    assert not responses.is_trusted(BulkResult)
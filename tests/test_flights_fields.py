@@ -0,0 +1,75 @@
+from sqlalchemy import event
+
+MOBILE = "id,flight_id,origin,destination,departure_date,departure_time,price"
+
+
+def company_payload():
+    return {"code": "FLD", "name": "Fieldset Air", "country": "Ireland", "email": "info@fieldset.com", "phone": "01234567"}
+
+def flight_payload(company_id, flight_id):
+    return {"name": "Fieldset", "flight_id": flight_id, "origin": "DUB", "destination": "Fieldset City", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "09-12-2025", "arrival_date": "09-12-2025", "price": "€100", "economy_seats": 5, "company_id": company_id}
+
+def booking_payload(flight):
+    return {"user_id": "fieldset-user", "flight_pk": flight["id"], "flight_id": flight["flight_id"], "flight_name": flight["name"], "origin": flight["origin"], "destination": flight["destination"], "departure_time": flight["departure_time"], "arrival_time": flight["arrival_time"], "departure_date": flight["departure_date"], "arrival_date": flight["arrival_date"], "price": flight["price"], "company_id": flight["company_id"]}
+
+
+def selects(client, path):
+    """The response and the SELECT statements it ran."""
+    from conftest import engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        return client.get(path), statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_flight_fieldsets_narrow_select_and_body(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    flights = [client.post("/api/flights", json=flight_payload(cid, f"F97000{i:02d}")).json() for i in range(3)]
+    wanted = MOBILE.split(",")
+
+    for path in (
+        f"/api/flights?company_id={cid}&limit=2&sort=departure&fields={MOBILE}",
+        f"/api/flights/search?destination=fieldset&company_id={cid}&limit=2&fields={MOBILE}",
+        f"/api/companies/{cid}/flights?limit=2&fields={MOBILE}",
+    ):
+        resp, statements = selects(client, path)
+        assert resp.status_code == 200, path
+        assert resp.json() == [{k: f[k] for k in wanted} for f in flights[:2]]
+        assert "X-Next-Cursor" in resp.headers and "ETag" in resp.headers
+        flight_select = next(s for s in statements if "FROM flights" in s)
+        assert "flights.name" not in flight_select and "flights.economy_seats" not in flight_select
+
+        rest = client.get(path + f"&after={resp.headers['X-Next-Cursor']}")
+        assert rest.json() == [{k: flights[2][k] for k in wanted}]
+        assert client.get(path, headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+
+    # Naming every field is the same as not asking for a fieldset.
+    everything = ",".join(flights[0])
+    assert client.get(f"/api/companies/{cid}/flights?fields={everything}").json() == flights
+
+
+def test_booking_fieldsets(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    flight = client.post("/api/flights", json=flight_payload(cid, "F9700100")).json()
+    booking = client.post("/api/bookings", json=booking_payload(flight)).json()
+
+    for path in ("/api/bookings?user_id=fieldset-user&", "/api/users/fieldset-user/bookings?"):
+        resp, statements = selects(client, path + "fields=status, created_at,id")
+        assert resp.json() == [{"id": booking["id"], "status": "pending", "created_at": booking["created_at"]}]
+        booking_select = next(s for s in statements if "FROM bookings" in s)
+        assert "bookings.flight_name" not in booking_select
+
+
+def test_unknown_fields_are_rejected(client):
+    resp = client.get("/api/flights?fields=id,secret,nope")
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Unknown fields: nope, secret"
+    assert client.get("/api/bookings?fields=,").status_code == 400
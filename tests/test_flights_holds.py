@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import holds, metrics
+from app.main import seats_changed
+from app.models import BookingDB
+
+from conftest import TestingSessionLocal
+
+
+def company_payload():
+    return {"code": "HLD", "name": "HoldCo", "country": "Ireland", "email": "info@hold.com", "phone": "01234567"}
+
+
+def flight_payload(company_id, flight_id):
+    return {"name": "Hold", "flight_id": flight_id, "origin": "DUB", "destination": "Hold Town", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "08-12-2025", "arrival_date": "08-12-2025", "price": "€100", "economy_seats": 5, "business_seats": 2, "company_id": company_id}
+
+
+def booking_payload(flight, **extra):
+    return {"user_id": "hold-user", "flight_pk": flight["id"], "flight_id": flight["flight_id"], "flight_name": flight["name"], "origin": flight["origin"], "destination": flight["destination"], "departure_time": flight["departure_time"], "arrival_time": flight["arrival_time"], "departure_date": flight["departure_date"], "arrival_date": flight["arrival_date"], "price": flight["price"], "company_id": flight["company_id"], **extra}
+
+
+def backdate(booking_ids, age):
+    with TestingSessionLocal() as db:
+        db.execute(update(BookingDB).where(BookingDB.id.in_(booking_ids)).values(created_at=datetime.utcnow() - age))
+        db.commit()
+
+
+def test_sweeper_cancels_expired_holds_and_releases_seats(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    flight = client.post("/api/flights", json=flight_payload(cid, "F9810001")).json()
+    book = lambda **extra: client.post("/api/bookings", json=booking_payload(flight, **extra)).json()
+    stale = [book(seats=2), book(), book(seat_class="business")]
+    paid = book(status="paid")
+    fresh = book()
+    backdate([b["id"] for b in stale + [paid]], timedelta(hours=1))
+    assert client.get(f"/api/flights/{flight['id']}").json()["economy_seats"] == 0
+
+    released = []
+
+    def on_released(*flight_pks):
+        released.extend(flight_pks)
+        seats_changed(*flight_pks)
+
+    expired_before = metrics.registry.render()
+    cancelled = holds.sweep_expired_holds(TestingSessionLocal, ttl=timedelta(minutes=15), batch_size=2, on_released=on_released)
+
+    assert cancelled == 3
+    assert released == [flight["id"], flight["id"]]
+    statuses = {b["id"]: client.get(f"/api/bookings/{b['id']}").json()["status"] for b in stale + [paid, fresh]}
+    assert [statuses[b["id"]] for b in stale] == ["cancelled"] * 3
+    assert (statuses[paid["id"]], statuses[fresh["id"]]) == ("paid", "pending")
+    detail = client.get(f"/api/flights/{flight['id']}").json()
+    assert (detail["economy_seats"], detail["business_seats"]) == (3, 2)
+
+    # Nothing left to expire: a second run changes nothing.
+    assert holds.sweep_expired_holds(TestingSessionLocal, ttl=timedelta(minutes=15)) == 0
+    assert client.get(f"/api/flights/{flight['id']}").json()["economy_seats"] == 3
+    assert holds.EXPIRED.value() >= 3 and holds.SWEEP_BATCH_TIME.count() >= 3
+    assert holds.SWEEP_LAG.value() == 0
+    assert "booking_hold_sweep_lag_seconds" in expired_before
+
+
+def test_sweeper_is_off_without_a_ttl():
+    assert holds.HOLD_TTL == timedelta(0)
+    assert holds.start_sweeper(TestingSessionLocal) is None
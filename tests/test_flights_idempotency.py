@@ -0,0 +1,110 @@
+import itertools
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from app import idempotency
+from app.models import BookingDB, IdempotencyKeyDB
+
+from conftest import TestingSessionLocal
+
+_run = itertools.count()
+
+
+def company_payload(code):
+    return {"code": code, "name": "OnceCo", "country": "Ireland", "email": "info@once.com", "phone": "01234567"}
+
+
+def flight_payload(company_id, flight_id, seats=3):
+    return {"name": "Once", "flight_id": flight_id, "origin": "DUB", "destination": "Once Town", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "07-12-2025", "arrival_date": "07-12-2025", "price": "€100", "economy_seats": seats, "company_id": company_id}
+
+
+def booking_payload(flight, seats=1):
+    return {"user_id": "once-user", "flight_pk": flight["id"], "flight_id": flight["flight_id"], "flight_name": flight["name"], "origin": flight["origin"], "destination": flight["destination"], "departure_time": flight["departure_time"], "arrival_time": flight["arrival_time"], "departure_date": flight["departure_date"], "arrival_date": flight["arrival_date"], "price": flight["price"], "company_id": flight["company_id"], "seats": seats}
+
+
+def new_flight(client, seats=3):
+    n = next(_run)
+    cid = client.post("/api/companies", json=company_payload(f"I{n:02d}")).json()["company_id"]
+    return client.post("/api/flights", json=flight_payload(cid, f"F97{n:05d}", seats)).json()
+
+
+def bookings_for(flight):
+    with TestingSessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(BookingDB).where(BookingDB.flight_pk == flight["id"]))
+
+
+def test_retried_booking_is_replayed_not_rebooked(client):
+    flight = new_flight(client)
+    headers = {"Idempotency-Key": f"book-{flight['id']}"}
+    first = client.post("/api/bookings", json=booking_payload(flight), headers=headers)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    retry = client.post("/api/bookings", json=booking_payload(flight), headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.content == first.content
+    assert bookings_for(flight) == 1
+    assert client.get(f"/api/flights/{flight['id']}").json()["economy_seats"] == 2
+
+    reused = client.post("/api/bookings", json=booking_payload(flight, seats=2), headers=headers)
+    assert reused.status_code == 422
+
+    # Without a key every POST is a new booking, as before.
+    assert client.post("/api/bookings", json=booking_payload(flight)).status_code == 201
+    assert bookings_for(flight) == 2
+
+
+def test_failed_booking_does_not_keep_its_key(client):
+    flight = new_flight(client, seats=1)
+    headers = {"Idempotency-Key": f"full-{flight['id']}"}
+    assert client.post("/api/bookings", json=booking_payload(flight, seats=2), headers=headers).status_code == 409
+    # The refused attempt stored nothing, so a corrected retry goes through.
+    retry = client.post("/api/bookings", json=booking_payload(flight, seats=1), headers=headers)
+    assert retry.status_code == 201
+    assert "Idempotent-Replayed" not in retry.headers
+
+
+def test_expired_key_can_be_used_again(client):
+    flight = new_flight(client)
+    headers = {"Idempotency-Key": f"old-{flight['id']}"}
+    assert client.post("/api/bookings", json=booking_payload(flight), headers=headers).status_code == 201
+    with TestingSessionLocal() as db:
+        db.execute(update(IdempotencyKeyDB).where(IdempotencyKeyDB.key == headers["Idempotency-Key"]).values(expires_at=datetime(2000, 1, 1)))
+        db.commit()
+
+    again = client.post("/api/bookings", json=booking_payload(flight), headers=headers)
+    assert again.status_code == 201
+    assert "Idempotent-Replayed" not in again.headers
+    assert bookings_for(flight) == 2
+
+    with TestingSessionLocal() as db:
+        db.execute(update(IdempotencyKeyDB).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        assert idempotency.sweep_expired(db) >= 1
+        db.commit()
+        assert db.scalar(select(func.count()).select_from(IdempotencyKeyDB)) == 0
+
+
+def test_bulk_write_is_replayed_per_key(client):
+    cid = client.post("/api/companies", json=company_payload("IBK")).json()["company_id"]
+    rows = [flight_payload(cid, "F9790001"), flight_payload(cid, "F9790002")]
+    headers = {"Idempotency-Key": "bulk-flights-1"}
+    first = client.post("/api/flights:bulk", json=rows, headers=headers)
+    assert first.json()["created"] == 2
+
+    retry = client.post("/api/flights:bulk", json=rows, headers=headers)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+
+    # Same key on another route is a different key.
+    companies = client.post("/api/companies:bulk", json=[company_payload("IBL")], headers=headers)
+    assert companies.json()["created"] == 1
+    # The query string is part of the request.
+    assert client.post("/api/flights:bulk?mode=upsert", json=rows, headers=headers).status_code == 422
+
+
+def test_key_must_fit(client):
+    flight = new_flight(client)
+    r = client.post("/api/bookings", json=booking_payload(flight), headers={"Idempotency-Key": "k" * 256})
+    assert r.status_code == 400
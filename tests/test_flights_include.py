@@ -0,0 +1,107 @@
+import itertools
+
+import pytest
+from sqlalchemy import event
+
+from app import main
+from app.cache import LRUCache, NullCache
+
+
+# Each test lists only its own rows: a country and a destination per run.
+runs = itertools.count()
+
+
+def company_payload(code, country="Includia"):
+    return {"code": code, "name": f"Include {code}", "country": country, "email": f"info@{code.lower()}.com", "phone": "01234567"}
+
+def flight_payload(company_id, flight_id, destination):
+    return {"name": "Include", "flight_id": flight_id, "origin": "DUB", "destination": destination, "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "10-12-2025", "arrival_date": "10-12-2025", "price": "€100", "economy_seats": 5, "company_id": company_id}
+
+
+def selects(client, path):
+    """The response and how many SELECT statements it ran."""
+    from conftest import engine
+
+    count = 0
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        nonlocal count
+        count += statement.lstrip().upper().startswith("SELECT")
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        return client.get(path), count
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def airlines(client, monkeypatch):
+    monkeypatch.setattr(main, "response_cache", NullCache())
+    run = next(runs)
+    companies = [client.post("/api/companies", json=company_payload(f"IN{n}", f"Includia {run}")).json() for n in range(4)]
+    flights = [
+        client.post("/api/flights", json=flight_payload(c["company_id"], f"F96{n:01d}{i:04d}", f"Include {run}")).json()
+        for n, c in enumerate(companies)
+        for i in range(3)
+    ]
+    return companies, flights, run
+
+
+def test_flight_lists_embed_their_company_in_one_extra_query(client, airlines):
+    companies, flights, run = airlines
+    by_id = {c["company_id"]: c for c in companies}
+
+    for path in (
+        f"/api/flights/search?destination=include%20{run}&match=exact",
+        f"/api/flights/search?destination=include%20{run}&sort=price",
+    ):
+        small, few = selects(client, f"{path}&limit=2&include=company")
+        large, many = selects(client, f"{path}&limit=12&include=company")
+        assert small.status_code == large.status_code == 200, path
+        assert len(large.json()) == 12
+        assert few == many, path
+        assert all(f["company"] == by_id[f["company_id"]] for f in large.json())
+        # Without include= the body keeps its usual shape.
+        assert "company" not in client.get(f"{path}&limit=2").json()[0]
+
+    cid = companies[1]["company_id"]
+    expected = [{"id": f["id"], "price": f["price"], "company": by_id[cid]} for f in flights[3:6]]
+    assert client.get(f"/api/flights?company_id={cid}&include=company&fields=id,price").json() == expected
+    assert client.get(f"/api/companies/{cid}/flights?include=company&fields=id,price").json() == expected
+
+
+def test_company_lists_embed_their_flights_in_one_extra_query(client, airlines):
+    companies, flights, run = airlines
+    first = companies[0]["company_id"]
+    path = f"/api/companies?country=Includia%20{run}"
+
+    small, few = selects(client, f"{path}&limit=1&include=flights")
+    large, many = selects(client, f"{path}&limit=4&include=flights")
+    assert few == many
+    body = large.json()
+    assert [c["company_id"] for c in body] == [c["company_id"] for c in companies]
+    assert [f["id"] for f in body[2]["flights"]] == [f["id"] for f in flights[6:9]]
+    assert "flights" not in client.get(f"{path}&limit=1").json()[0]
+
+    detail = client.get(f"/api/companies/{first}?include=flights").json()
+    assert detail["flights"] == flights[:3]
+
+
+def test_embedded_rows_are_part_of_the_etag_and_cache(client, airlines, monkeypatch):
+    monkeypatch.setattr(main, "response_cache", LRUCache())
+    companies, flights, run = airlines
+    cid = companies[0]["company_id"]
+    path = f"/api/flights/search?destination=include%20{run}&company_id={cid}&include=company"
+    before = client.get(path)
+    detail = client.get(f"/api/companies/{cid}?include=flights")
+
+    client.put(f"/api/companies/{cid}", json=company_payload("INX", companies[0]["country"]))
+    after = client.get(path)
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert after.json()[0]["company"]["code"] == "INX"
+
+    client.patch(f"/api/flights/{flights[0]['id']}", json={"price": "€150"})
+    changed = client.get(f"/api/companies/{cid}?include=flights", headers={"If-None-Match": detail.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.json()["flights"][0]["price"] == "€150"
@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.inventory import reserve_seats, set_booking_status
+from app.models import Base, CompanyDB, FlightDB, with_derived_columns
+
+
+def company_payload(name="SeatCo"):
+    return {"code": "SEA", "name": name, "country": "Ireland", "email": "info@seat.com", "phone": "01234567"}
+
+def flight_payload(company_id, flight_id, economy=2, business=1):
+    return {"name": "Seats", "flight_id": flight_id, "origin": "DUB", "destination": "LHR", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "05-12-2025", "arrival_date": "05-12-2025", "price": "€100", "economy_seats": economy, "business_seats": business, "company_id": company_id}
+
+def booking_payload(flight, **extra):
+    return {"user_id": "seat-user", "flight_id": flight["flight_id"], "flight_name": flight["name"], "origin": flight["origin"], "destination": flight["destination"], "departure_time": flight["departure_time"], "arrival_time": flight["arrival_time"], "departure_date": flight["departure_date"], "arrival_date": flight["arrival_date"], "price": flight["price"], "company_id": flight["company_id"], **extra}
+
+@pytest.fixture
+def flight(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    r = client.post("/api/flights", json=flight_payload(cid, "F9500001"))
+    assert r.status_code == 201
+    return r.json()
+
+def seats(client, flight):
+    data = client.get(f"/api/flights/{flight['id']}").json()
+    return data["economy_seats"], data["business_seats"]
+
+def test_booking_reserves_and_refuses_oversell(client, flight):
+    r = client.post("/api/bookings", json=booking_payload(flight, flight_pk=flight["id"], seats=2))
+    assert r.status_code == 201
+    assert r.json()["flight_pk"] == flight["id"]
+    assert seats(client, flight) == (0, 1)
+
+    r = client.post("/api/bookings", json=booking_payload(flight, flight_pk=flight["id"]))
+    assert r.status_code == 409
+    assert r.json()["detail"] == "Not enough seats available"
+
+    r = client.post("/api/bookings", json=booking_payload(flight, seat_class="business"))
+    assert r.status_code == 201
+    assert r.json()["flight_pk"] == flight["id"]
+    assert seats(client, flight) == (0, 0)
+
+def test_cancel_and_delete_release_seats(client, flight):
+    b1 = client.post("/api/bookings", json=booking_payload(flight)).json()
+    b2 = client.post("/api/bookings", json=booking_payload(flight)).json()
+    assert seats(client, flight) == (0, 1)
+
+    assert client.put(f"/api/bookings/{b1['id']}", json={"status": "cancelled"}).status_code == 200
+    assert seats(client, flight) == (1, 1)
+    # Cancelling twice must not release twice.
+    assert client.put(f"/api/bookings/{b1['id']}", json={"status": "cancelled"}).status_code == 200
+    assert seats(client, flight) == (1, 1)
+
+    assert client.delete(f"/api/bookings/{b2['id']}").status_code == 204
+    assert seats(client, flight) == (2, 1)
+
+    # Reinstating a cancelled booking takes the seat back, if there still is one.
+    assert client.put(f"/api/bookings/{b1['id']}", json={"status": "pending"}).status_code == 200
+    assert seats(client, flight) == (1, 1)
+
+def test_racing_cancels_release_the_seats_once(client, flight):
+    from conftest import TestingSessionLocal
+
+    booking = client.post("/api/bookings", json=booking_payload(flight)).json()
+    assert seats(client, flight) == (1, 1)
+    # Both requests read the booking while it was still pending.
+    with TestingSessionLocal() as first, TestingSessionLocal() as second:
+        assert set_booking_status(first, booking["id"], "pending", "cancelled") is True
+        first.commit()
+        assert set_booking_status(second, booking["id"], "pending", "cancelled") is None
+        second.rollback()
+        assert second.get(FlightDB, flight["id"]).economy_seats == 2
+    assert client.get(f"/api/bookings/{booking['id']}").json()["status"] == "cancelled"
+    assert client.delete(f"/api/bookings/{booking['id']}").status_code == 204
+    assert client.delete(f"/api/bookings/{booking['id']}").status_code == 404
+    assert seats(client, flight) == (2, 1)
+
+def test_flight_pk_must_match_the_named_flight(client, flight):
+    other = client.post("/api/flights", json=flight_payload(flight["company_id"], "F9500002")).json()
+    r = client.post("/api/bookings", json=booking_payload(flight, flight_pk=other["id"]))
+    assert r.status_code == 422
+    r = client.post("/api/bookings", json=booking_payload(flight, flight_pk=flight["id"], company_id=10**9))
+    assert r.status_code == 422
+    assert seats(client, flight) == seats(client, other) == (2, 1)
+
+def test_booking_unknown_flight_is_404(client, flight):
+    r = client.post("/api/bookings", json=booking_payload(flight, flight_id="F9599999"))
+    assert r.status_code == 404
+    r = client.post("/api/bookings", json=booking_payload(flight, flight_pk=10**9))
+    assert r.status_code == 404
+
+def test_parallel_bookers_never_oversell(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'seats.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(CompanyDB), [company_payload() | {"company_id": 1}])
+        conn.execute(insert(FlightDB), [with_derived_columns(flight_payload(1, "F9600001", economy=25)) | {"id": 1}])
+    Session = sessionmaker(bind=engine)
+
+    results = []
+    def book():
+        with Session() as db:
+            ok = reserve_seats(db, 1, "economy", 1)
+            db.commit()
+            results.append(ok)
+
+    threads = [threading.Thread(target=book) for _ in range(60)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with Session() as db:
+        remaining = db.execute(select(FlightDB.economy_seats).where(FlightDB.id == 1)).scalar_one()
+    engine.dispose()
+    assert results.count(True) == 25
+    assert remaining == 0
@@ -0,0 +1,80 @@
+import itertools
+
+import pytest
+
+from app.itineraries import route_graph
+
+_run = itertools.count()
+
+
+def company_payload(name):
+    return {"code": "ITN", "name": name, "country": "Ireland", "email": "info@itinerary.com", "phone": "01234567"}
+
+
+def flight_payload(company_id, flight_id, origin, destination, departure_time, arrival_time, price):
+    return {"name": "Itinerary", "flight_id": flight_id, "origin": origin, "destination": destination, "departure_time": departure_time, "arrival_time": arrival_time, "departure_date": "10/03/2026", "arrival_date": "10/03/2026", "price": price, "economy_seats": 5, "company_id": company_id}
+
+
+@pytest.fixture
+def network(client):
+    """A -> B -> C with one direct A -> C; connections at B test the rules."""
+    n = next(_run)
+    a, b, c = (f"Itin {place} {n}" for place in "ABC")
+    home, other = (client.post("/api/companies", json=company_payload(f"ItinCo {n}{x}")).json()["company_id"] for x in "xy")
+    legs = {
+        "ab": (home, a, b, "08:00", "09:00", "€100"),
+        "bc_too_soon": (other, b, c, "09:30", "10:30", "€50"),
+        "bc_same_carrier": (home, b, c, "09:50", "10:50", "€80"),
+        "bc_other_carrier": (other, b, c, "09:50", "10:50", "€70"),
+        "bc_later": (other, b, c, "12:00", "13:00", "€60"),
+        "ac_direct": (other, a, c, "08:00", "12:00", "€300"),
+    }
+    ids = {
+        name: client.post("/api/flights", json=flight_payload(leg[0], f"F98{n:02d}{i:03d}", *leg[1:])).json()["id"]
+        for i, (name, leg) in enumerate(legs.items())
+    }
+    return {"a": a, "c": c, "ids": ids, "company": other}
+
+
+def search(client, network, **params):
+    resp = client.get("/api/itineraries/search", params={"origin": network["a"], "destination": network["c"], "date": "2026-03-10", **params})
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def trips(itineraries):
+    return [[leg["id"] for leg in it["legs"]] for it in itineraries]
+
+
+def test_itineraries_by_price_and_duration(client, network):
+    ids = network["ids"]
+    by_price = search(client, network)
+    assert trips(by_price) == [[ids["ab"], ids["bc_later"]], [ids["ab"], ids["bc_same_carrier"]], [ids["ac_direct"]]]
+    assert [(it["price"], it["stops"], it["duration_minutes"]) for it in by_price] == [("160.00", 1, 300), ("180.00", 1, 170), ("300.00", 0, 240)]
+    assert by_price[0]["departure_at"] == "2026-03-10T08:00:00" and by_price[0]["legs"][1]["price"] == "€60"
+
+    by_duration = search(client, network, sort="duration", limit=2)
+    assert trips(by_duration) == [[ids["ab"], ids["bc_same_carrier"]], [ids["ac_direct"]]]
+    assert trips(search(client, network, max_stops=0)) == [[ids["ac_direct"]]]
+    assert search(client, network, date="2026-03-11") == []
+
+
+def test_graph_follows_flight_writes_incrementally(client, network):
+    ids = network["ids"]
+    search(client, network)
+    builds = route_graph.builds
+
+    assert client.patch(f"/api/flights/{ids['bc_later']}", json={"price": "€500"}).status_code == 200
+    assert client.delete(f"/api/flights/{ids['bc_same_carrier']}").status_code == 204
+    assert trips(search(client, network)) == [[ids["ac_direct"]], [ids["ab"], ids["bc_later"]]]
+    assert route_graph.builds == builds
+
+    client.delete(f"/api/companies/{network['company']}")
+    assert search(client, network) == []
+    assert route_graph.builds == builds
+
+
+def test_itinerary_search_validation(client):
+    resp = client.get("/api/itineraries/search", params={"origin": "Dub", "destination": " dub ", "date": "2026-03-10"})
+    assert resp.status_code == 400
+    assert client.get("/api/itineraries/search", params={"origin": "DUB", "destination": "LHR", "date": "2026-03-10", "max_stops": 9}).status_code == 422
@@ -0,0 +1,67 @@
+from app import metrics
+
+
+def company_payload(name):
+    return {"code": "MTR", "name": name, "country": "Ireland", "email": "info@metrics.com", "phone": "01234567"}
+
+
+def flight_payload(company_id):
+    return {"name": "Metered", "flight_id": "F9800001", "origin": "DUB", "destination": "Metric City", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "07-12-2025", "arrival_date": "07-12-2025", "price": "€100", "economy_seats": 3, "company_id": company_id}
+
+
+def sample(text, line_start):
+    return next(float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(line_start))
+
+
+def test_requests_are_labelled_by_route_template(client):
+    route = "/api/flights/{flight_id}"
+    before = metrics.LATENCY.count("GET", route)
+    cid = client.post("/api/companies", json=company_payload("MetricsCo")).json()["company_id"]
+    fid = client.post("/api/flights", json=flight_payload(cid)).json()["id"]
+    client.get(f"/api/flights/{fid}")
+    client.get("/api/flights/999999")
+
+    assert metrics.LATENCY.count("GET", route) == before + 2
+    assert metrics.REQUESTS.value("GET", route, "404") >= 1
+    assert metrics.IN_FLIGHT.value("GET") == 0
+
+    text = client.get("/metrics").text
+    assert f'http_requests_total{{method="GET",route="{route}",status="200"}}' in text
+    assert f'http_request_duration_seconds_bucket{{method="GET",route="{route}",le="+Inf"}}' in text
+    assert "/api/flights/%d" % fid not in text
+
+    client.get("/no/such/path")
+    assert metrics.REQUESTS.value("GET", "unmatched", "404") >= 1
+
+
+def test_db_and_serialization_time_are_attributed(client):
+    route = "/api/companies/{company_id}"
+    before = metrics.DB_QUERIES.count(route)
+    cid = client.post("/api/companies", json=company_payload("MetricsCo2")).json()["company_id"]
+    client.get(f"/api/companies/{cid}?uncached={cid}")
+
+    assert metrics.DB_QUERIES.count(route) == before + 1
+    text = client.get("/metrics").text
+    assert sample(text, f'http_request_db_queries_sum{{route="{route}"}}') >= 1
+    assert sample(text, f'http_response_serialize_seconds_sum{{route="{route}"}}') > 0
+
+    client.get("/health")
+    assert sample(client.get("/metrics").text, 'http_request_db_queries_sum{route="/health"}') == 0
+
+
+def test_exposition_includes_cache_and_pool(client):
+    text = client.get("/metrics")
+    assert text.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE response_cache_hits_total counter" in text.text
+    assert 'db_pool_checkouts_total{engine="sync"}' in text.text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "/x")
+    lines = histogram.collect()
+    assert 'demo_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/x"} 4' in lines
@@ -0,0 +1,93 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app.migrations import LATEST_VERSION, SchemaOutOfDate, check_schema, current_version, upgrade
+from app.models import BookingDB, FlightDB, RouteDayDB, sqlite_has_fts5_trigram
+from app.search import MatchMode, route_search
+
+# The tables as the original import-time create_all() left them.
+LEGACY_SCHEMA = (
+    "CREATE TABLE companies (company_id INTEGER NOT NULL, code VARCHAR(3) NOT NULL, name VARCHAR(100) NOT NULL, "
+    "country VARCHAR(100) NOT NULL, email VARCHAR(255) NOT NULL, phone VARCHAR(20) NOT NULL, PRIMARY KEY (company_id))",
+    "CREATE TABLE flights (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, flight_id VARCHAR(8) NOT NULL, "
+    "origin VARCHAR(32) NOT NULL, destination VARCHAR(255) NOT NULL, departure_time VARCHAR(5) NOT NULL, "
+    "arrival_time VARCHAR(5) NOT NULL, departure_date VARCHAR(10) NOT NULL, arrival_date VARCHAR(10) NOT NULL, "
+    "price VARCHAR(10) NOT NULL, business_seats INTEGER NOT NULL, economy_seats INTEGER NOT NULL, "
+    "company_id INTEGER NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(company_id) REFERENCES companies (company_id) ON DELETE CASCADE)",
+    "CREATE TABLE bookings (id INTEGER NOT NULL, user_id VARCHAR(100) NOT NULL, flight_id VARCHAR(8) NOT NULL, "
+    "flight_name VARCHAR(100) NOT NULL, origin VARCHAR(32) NOT NULL, destination VARCHAR(255) NOT NULL, "
+    "departure_time VARCHAR(5) NOT NULL, arrival_time VARCHAR(5) NOT NULL, departure_date VARCHAR(10) NOT NULL, "
+    "arrival_date VARCHAR(10) NOT NULL, price VARCHAR(10) NOT NULL, company_id INTEGER NOT NULL, "
+    "status VARCHAR(20) NOT NULL, payment_id VARCHAR(100), paid_at VARCHAR(50), "
+    "created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP), PRIMARY KEY (id))",
+    "INSERT INTO companies VALUES (1, 'OLD', 'Old Air', 'Ireland', 'o@old.com', '01234567')",
+    "INSERT INTO flights VALUES (1, 'Old', 'F0000001', 'Dublin', 'London  Heathrow', '06:30', '08:00', "
+    "'12/11/2025', '12/11/2025', '€75', 0, 10, 1)",
+    "INSERT INTO bookings (id, user_id, flight_id, flight_name, origin, destination, departure_time, arrival_time, "
+    "departure_date, arrival_date, price, company_id, status) VALUES (1, 'u1', 'F0000001', 'Old', 'Dublin', "
+    "'London  Heathrow', '06:30', '08:00', '12/11/2025', '12/11/2025', '€75', 1, 'confirmed')",
+)
+
+LOOKUP_INDEXES = {
+    "flights": {"ix_flights_company_id", "ix_flights_route_departure", "ix_flights_natural_key"},
+    "bookings": {"ix_bookings_user_id", "ix_bookings_flight_id", "ix_bookings_flight_pk"},
+    "changes": {"ix_changes_changed_at"},
+    "companies": {"ix_companies_code"},
+}
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    engine.dispose()
+
+
+def index_names(engine, table):
+    return {i["name"] for i in inspect(engine).get_indexes(table)}
+
+
+def test_fresh_database_upgrades_to_latest(file_engine):
+    assert upgrade(file_engine) == list(range(1, LATEST_VERSION + 1))
+    assert upgrade(file_engine) == []
+    with file_engine.connect() as conn:
+        assert current_version(conn) == LATEST_VERSION
+    for table, names in LOOKUP_INDEXES.items():
+        assert names <= index_names(file_engine, table)
+
+
+def test_legacy_database_is_brought_up_to_date(file_engine):
+    with file_engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    upgrade(file_engine)
+
+    for table, names in LOOKUP_INDEXES.items():
+        assert names <= index_names(file_engine, table)
+    with file_engine.connect() as conn:
+        flight = conn.execute(select(FlightDB.__table__)).one()._mapping
+        booking = conn.execute(select(BookingDB.__table__)).one()._mapping
+        assert (flight["version"], flight["origin_norm"], flight["destination_norm"]) == (1, "dublin", "london heathrow")
+        assert (flight["departure_at"], flight["price_amount"]) == (datetime(2025, 11, 12, 6, 30), Decimal("75"))
+        assert (booking["flight_pk"], booking["seat_class"], booking["seats"]) == (1, "economy", 1)
+        route_day = conn.execute(select(RouteDayDB.__table__)).one()
+        assert tuple(route_day) == ("dublin", "london heathrow", date(2025, 11, 12), Decimal("75"), 10, 1)
+
+    if sqlite_has_fts5_trigram():
+        with Session(file_engine) as db:
+            found = db.execute(route_search(db, destination="heathrow", mode=MatchMode.FUZZY)).scalars().all()
+            assert [f.id for f in found] == [1]
+
+
+def test_startup_check_refuses_stale_schema(file_engine):
+    upgrade(file_engine, target=LATEST_VERSION - 1)
+    with pytest.raises(SchemaOutOfDate):
+        check_schema(file_engine, auto_migrate=False)
+    assert check_schema(file_engine, auto_migrate=True) == LATEST_VERSION
+    assert check_schema(file_engine, auto_migrate=False) == LATEST_VERSION
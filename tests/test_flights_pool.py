@@ -0,0 +1,116 @@
+import runpy
+import threading
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from app import database
+from app.pool import TimedQueuePool
+from app.worker import ServiceWorker
+
+
+def test_pool_options_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "600")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "2500")
+    monkeypatch.setenv("SQL_ECHO", "true")
+
+    options = database.engine_options("postgresql+psycopg://app:app@db/flightdb")
+    assert options["poolclass"] is TimedQueuePool
+    assert (options["pool_size"], options["max_overflow"], options["pool_recycle"]) == (3, 0, 600)
+    assert options["pool_pre_ping"] is False
+    assert options["echo"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=2500"}
+
+    # In-memory SQLite keeps its single-connection pool.
+    assert "poolclass" not in database.engine_options("sqlite+pysqlite://")
+
+
+def test_sqlite_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_WAL", "true")
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "normal")
+    url = f"sqlite:///{tmp_path / 'pragmas.db'}"
+    engine = database.instrument(create_engine(url, **database.engine_options(url)))
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+    engine.dispose()
+
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "sometimes")
+    with pytest.raises(RuntimeError):
+        database.configure_sqlite(create_engine(url))
+
+
+def test_pool_stats_count_waits_and_timeouts(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "1")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.2")
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = database.instrument(create_engine(url, **database.engine_options(url)))
+
+    first, second = engine.connect(), engine.connect()
+    stats = database.pool_status(engine)
+    assert (stats["checked_out"], stats["overflow"], stats["overflow_peak"]) == (2, 1, 1)
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+
+    released = threading.Timer(0.05, second.close)
+    released.start()
+    with engine.connect():
+        pass
+    released.join()
+    first.close()
+
+    stats = database.pool_status(engine)
+    assert stats["checkouts"] == 3
+    assert stats["timeouts"] == 1
+    assert stats["waits"] == 4
+    assert stats["wait_seconds_max"] >= 0.2
+    assert stats["checked_out"] == 0
+
+    # dispose() builds a new pool that keeps feeding the same counters.
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert database.pool_status(engine)["checkouts"] == 4
+    engine.dispose()
+
+
+def test_pool_metrics_endpoint(client):
+    stats = client.get("/metrics/pool").json()
+    assert {"checkouts", "overflow_peak", "timeouts", "wait_seconds_total", "wait_seconds_max"} <= stats.keys()
+
+
+def test_dispose_after_fork_leaves_the_parents_connections_open(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'fork.db'}"
+    engine = database.instrument(create_engine(url, **database.engine_options(url)))
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", None)
+
+    inherited = engine.connect()
+    old_pool = engine.pool
+    database.dispose_after_fork()
+
+    assert engine.pool is not old_pool
+    assert inherited.execute(text("SELECT 1")).scalar() == 1
+    with engine.connect():
+        pass
+    inherited.close()
+    engine.dispose()
+
+
+def test_gunicorn_config(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.setenv("GUNICORN_ACCESS_LOG", "")
+    config = runpy.run_path(str(Path(__file__).parents[1] / "gunicorn.conf.py"))
+
+    assert config["workers"] == 3
+    assert config["preload_app"] is True
+    assert config["accesslog"] is None
+    assert config["graceful_timeout"] == 30 and config["max_requests_jitter"] > 0
+    module, _, name = config["worker_class"].rpartition(".")
+    assert (module, name) == (ServiceWorker.__module__, ServiceWorker.__name__)
+    assert ServiceWorker.CONFIG_KWARGS["lifespan"] == "on"
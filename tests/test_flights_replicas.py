@@ -0,0 +1,77 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app import database, main, replicas
+from app.cache import NullCache
+from app.migrations import upgrade
+from app.replicas import REPLICA_STICKY_COOKIE, Replica
+
+
+def company_payload():
+    return {"code": "RPL", "name": "ReplicaCo", "country": "Ireland", "email": "info@replica.com", "phone": "01234567"}
+
+
+def flight_payload(company_id):
+    return {"name": "Replica", "flight_id": "F9830001", "origin": "DUB", "destination": "Lag Town", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "08-12-2025", "arrival_date": "08-12-2025", "price": "€100", "company_id": company_id}
+
+
+def replica(tmp_path, name):
+    """A replica that never catches up: its own empty SQLite file."""
+    url = f"sqlite:///{tmp_path / f'{name}.db'}"
+    engine = create_engine(url)
+    upgrade(engine)
+    return Replica(name, engine)
+
+
+@pytest.fixture
+def lagging(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "response_cache", NullCache())
+    monkeypatch.setattr(database.replicas, "replicas", [replica(tmp_path, "replica-0")])
+    yield database.replicas.replicas[0]
+    database.replicas.dispose()
+
+
+def test_reads_go_to_the_replica_until_the_client_writes(client, lagging):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    flight = client.post("/api/flights", json=flight_payload(cid)).json()
+    assert REPLICA_STICKY_COOKIE in client.cookies
+
+    # The writer reads its own write from the primary...
+    assert client.get(f"/api/flights/{flight['id']}").status_code == 200
+    # ...while another client is served by the replica, which has not seen it.
+    with TestClient(main.app) as other:
+        assert other.get(f"/api/flights/{flight['id']}").status_code == 404
+        assert other.get("/api/companies", params={"code": "RPL"}).json() == []
+        # Writes always go to the primary.
+        assert other.put(f"/api/flights/{flight['id']}", json=flight_payload(cid) | {"price": "€120"}).status_code == 200
+
+    # Once the stickiness window has passed, the writer reads the replica too.
+    client.cookies.set(REPLICA_STICKY_COOKIE, "0")
+    assert client.get(f"/api/flights/{flight['id']}").status_code == 404
+    assert replicas.READS.value("replica") >= 3
+
+
+def test_unhealthy_replica_falls_back_to_the_primary(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "response_cache", NullCache())
+    broken = Replica("replica-broken", create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"))
+    monkeypatch.setattr(database.replicas, "replicas", [broken])
+
+    cid = client.post("/api/companies", json=company_payload() | {"code": "RPB"}).json()["company_id"]
+    with TestClient(main.app) as other:
+        assert other.get(f"/api/companies/{cid}").status_code == 200
+        assert not broken.healthy
+        assert replicas.FAILURES.value("replica-broken") == 1
+        # Skipped without another connection attempt while it is down.
+        assert other.get(f"/api/companies/{cid}").status_code == 200
+        assert replicas.FAILURES.value("replica-broken") == 1
+        assert other.get("/metrics/pool").json()["replica-broken"]["healthy"] is False
+
+
+def test_replicas_are_used_round_robin(tmp_path):
+    pair = database.ReplicaSet([replica(tmp_path, "a"), replica(tmp_path, "b")])
+    picked = [pair.candidates()[0].name for _ in range(4)]
+    assert picked == ["a", "b", "a", "b"]
+    pair.replicas[0].mark_down()
+    assert [r.name for r in pair.candidates()] == ["b"]
+    pair.dispose()
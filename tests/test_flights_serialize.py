@@ -0,0 +1,18 @@
+import json
+
+from fastapi import Response
+
+from app.responses import booking_list_adapter, model_response
+from benchmarks.bench_serialize import booking_rows, hand_built
+
+
+def test_adapter_matches_the_hand_built_booking_dicts():
+    rows = booking_rows(3)
+    rows[0].updated_at = None
+    response = Response()
+    response.headers["ETag"] = '"page"'
+
+    rendered = model_response(booking_list_adapter, rows, response)
+    assert rendered.headers["ETag"] == '"page"'
+    assert json.loads(rendered.body) == [hand_built(b) for b in rows]
+    assert json.loads(rendered.body)[0]["updated_at"] == ""
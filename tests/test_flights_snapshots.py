@@ -0,0 +1,61 @@
+from sqlalchemy import event
+
+from app.snapshots import flight_snapshots
+
+
+def company_payload():
+    return {"code": "SNP", "name": "SnapCo", "country": "Ireland", "email": "info@snap.com", "phone": "01234567"}
+
+def flight_payload(company_id):
+    return {"name": "Snap", "flight_id": "F9840001", "origin": "DUB", "destination": "Snap City", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "11-12-2025", "arrival_date": "11-12-2025", "price": "€100", "economy_seats": 3, "business_seats": 1, "company_id": company_id}
+
+
+def book(client, flight_pk, **extra):
+    """The response and the flight-detail SELECTs it ran."""
+    from conftest import engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "flights.flight_id" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        return client.post(f"/api/flights/{flight_pk}/bookings", json={"user_id": "snap-user", **extra}), statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_compact_booking_copies_the_flight_from_its_snapshot(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    flight = client.post("/api/flights", json=flight_payload(cid)).json()
+
+    first, selects = book(client, flight["id"])
+    assert first.status_code == 201
+    assert len(selects) == 1
+    booking = first.json()
+    copied = {k: flight[k] for k in ("flight_id", "origin", "destination", "departure_time", "arrival_time", "departure_date", "arrival_date", "price", "company_id")}
+    assert {k: booking[k] for k in copied} == copied
+    assert (booking["flight_name"], booking["flight_pk"], booking["status"], booking["seat_class"]) == ("Snap", flight["id"], "pending", "economy")
+
+    hits = flight_snapshots.hits
+    second, selects = book(client, flight["id"], seat_class="business")
+    assert second.status_code == 201 and selects == []
+    assert flight_snapshots.hits == hits + 1
+    detail = client.get(f"/api/flights/{flight['id']}").json()
+    assert (detail["economy_seats"], detail["business_seats"]) == (2, 0)
+    assert book(client, flight["id"], seat_class="business")[0].status_code == 409
+
+
+def test_flight_writes_refresh_the_snapshot(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    flight = client.post("/api/flights", json=flight_payload(cid)).json()
+    assert book(client, flight["id"])[0].json()["price"] == "€100"
+
+    client.patch(f"/api/flights/{flight['id']}", json={"price": "€130"})
+    assert book(client, flight["id"])[0].json()["price"] == "€130"
+
+    client.delete(f"/api/companies/{cid}")
+    assert book(client, flight["id"])[0].status_code == 404
+    assert client.post("/api/flights/999999/bookings", json={"user_id": "snap-user"}).status_code == 404
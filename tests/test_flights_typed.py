@@ -0,0 +1,91 @@
+import itertools
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from app.models import parse_date, parse_price, parse_timestamp
+
+_run = itertools.count()
+
+
+def company_payload(name):
+    return {"code": "TYP", "name": name, "country": "Ireland", "email": "info@typed.com", "phone": "01234567"}
+
+
+def flight_payload(company_id, flight_id, destination, departure_date, departure_time, price):
+    return {"name": "Typed", "flight_id": flight_id, "origin": "DUB", "destination": destination, "departure_time": departure_time, "arrival_time": "23:00", "departure_date": departure_date, "arrival_date": departure_date, "price": price, "company_id": company_id}
+
+
+@pytest.fixture
+def schedule(client):
+    n = next(_run)
+    destination = f"Typed City {n}"
+    cid = client.post("/api/companies", json=company_payload(f"TypedCo {n}")).json()["company_id"]
+    rows = [
+        ("12/11/2025", "09:00", "€250"),
+        ("20-11-2025", "07:15", "€99.50"),
+        ("2025-11-22", "18:40", "€1234567"),
+        ("20/11/2025", "21:05", "€120"),
+        ("31/02/2025", "25:99", "free"),
+    ]
+    ids = [
+        client.post("/api/flights", json=flight_payload(cid, f"F95{n:02d}{i:03d}", destination, *row)).json()["id"]
+        for i, row in enumerate(rows)
+    ]
+    return {"destination": destination, "ids": ids}
+
+
+def test_parsers():
+    assert parse_date("12/11/2025") == parse_date("12-11-2025") == parse_date("2025-11-12") == date(2025, 11, 12)
+    assert parse_date("11/31/2025") is None
+    assert parse_timestamp("20-11-2025", "07:15") == datetime(2025, 11, 20, 7, 15)
+    assert parse_timestamp("20-11-2025", "7am") is None
+    assert parse_price("€1234567") == Decimal("1234567")
+    assert parse_price("€ 99,50") == Decimal("99.50")
+    assert parse_price("1,299.00") == Decimal("1299.00")
+    assert parse_price("free") is None
+
+
+def test_departure_window_and_price_ceiling(client, schedule):
+    ids = schedule["ids"]
+    search = {"destination": schedule["destination"], "match": "exact"}
+
+    window = client.get("/api/flights/search", params=search | {"departure_from": "2025-11-20", "departure_to": "2025-11-20"})
+    assert [f["id"] for f in window.json()] == [ids[1], ids[3]]
+
+    cheap = client.get("/api/flights/search", params=search | {"max_price": "120"})
+    assert [f["id"] for f in cheap.json()] == [ids[1], ids[3]]
+
+    both = client.get("/api/flights/search", params=search | {"departure_from": "2025-11-21", "min_price": "200"})
+    assert [f["id"] for f in both.json()] == [ids[2]]
+
+    bad = client.get("/api/flights/search", params=search | {"departure_from": "2025-11-21", "departure_to": "2025-11-20"})
+    assert bad.status_code == 400
+
+
+def _all_pages(client, params):
+    seen, cursor = [], None
+    while True:
+        resp = client.get("/api/flights/search", params=params | ({"after": cursor} if cursor else {}))
+        assert resp.status_code == 200
+        seen += [f["id"] for f in resp.json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+
+
+def test_sort_by_price_and_departure_pages_with_typed_cursors(client, schedule):
+    ids = schedule["ids"]
+    search = {"destination": schedule["destination"], "match": "exact", "limit": 1}
+    # The unparseable row has no price or departure, so it drops out of those orders.
+    assert _all_pages(client, search | {"sort": "price"}) == [ids[1], ids[3], ids[0], ids[2]]
+    assert _all_pages(client, search | {"sort": "departure"}) == [ids[0], ids[1], ids[3], ids[2]]
+
+    assert client.patch(f"/api/flights/{ids[2]}", json={"price": "€10"}).status_code == 200
+    assert _all_pages(client, search | {"sort": "price"})[0] == ids[2]
+
+
+def test_list_flights_filters(client, schedule):
+    listed = client.get("/api/flights", params={"departure_from": "2025-11-22", "max_price": "2000000", "limit": 1000})
+    assert schedule["ids"][2] in [f["id"] for f in listed.json()]
+    assert schedule["ids"][0] not in [f["id"] for f in listed.json()]
@@ -0,0 +1,65 @@
+import base64
+import json
+
+
+def company_payload(name="PageCo"):
+    return {"code": "PGE", "name": name, "country": "Ireland", "email": "info@page.com", "phone": "01234567"}
+
+def flight_payload(company_id, n):
+    return {"name": f"Paged {n}", "flight_id": f"F81{n:05d}", "origin": "DUB", "destination": "LHR", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "20-11-2025", "arrival_date": "20-11-2025", "price": "€100", "economy_seats": 10, "company_id": company_id}
+
+def booking_payload(user_id, company_id):
+    return {"user_id": user_id, "flight_id": "F8100001", "flight_name": "Paged 1", "origin": "DUB", "destination": "LHR", "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "20-11-2025", "arrival_date": "20-11-2025", "price": "€100", "company_id": company_id}
+
+def collect(client, url, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"after": cursor} if cursor else {}))
+        r = client.get(url, params=query)
+        assert r.status_code == 200
+        pages.append([item.get("id", item.get("company_id")) for item in r.json()])
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+        assert 'rel="next"' in r.headers["Link"]
+
+def test_flights_keyset_pages_by_company(client):
+    cid = client.post("/api/companies", json=company_payload()).json()["company_id"]
+    ids = [client.post("/api/flights", json=flight_payload(cid, n)).json()["id"] for n in range(5)]
+
+    pages = collect(client, "/api/flights", company_id=cid, limit=2)
+    assert pages == [ids[0:2], ids[2:4], ids[4:5]]
+
+    nested = collect(client, f"/api/companies/{cid}/flights", limit=3)
+    assert nested == [ids[0:3], ids[3:5]]
+
+def test_search_is_paginated(client):
+    cid = client.post("/api/companies", json=company_payload(name="PageCo2")).json()["company_id"]
+    ids = [client.post("/api/flights", json=flight_payload(cid, n)).json()["id"] for n in range(3)]
+    pages = collect(client, "/api/flights/search", origin="dub", company_id=cid, limit=2)
+    assert pages == [ids[0:2], ids[2:3]]
+
+def test_bookings_filter_and_paginate(client):
+    cid = client.post("/api/companies", json=company_payload(name="PageCo3")).json()["company_id"]
+    assert client.post("/api/flights", json=flight_payload(cid, 1)).status_code == 201
+    for _ in range(3):
+        assert client.post("/api/bookings", json=booking_payload("page-user", cid)).status_code == 201
+    assert client.post("/api/bookings", json=booking_payload("other-user", cid)).status_code == 201
+
+    pages = collect(client, "/api/bookings", user_id="page-user", status="pending", limit=2)
+    assert [len(p) for p in pages] == [2, 1]
+    pages = collect(client, "/api/users/page-user/bookings", limit=2)
+    assert [len(p) for p in pages] == [2, 1]
+
+def test_limit_is_bounded(client):
+    assert client.get("/api/flights", params={"limit": 0}).status_code == 422
+    assert client.get("/api/flights", params={"limit": 100000}).status_code == 422
+
+def test_invalid_cursor_rejected(client):
+    assert client.get("/api/flights", params={"after": "not-a-cursor!"}).status_code == 400
+    wrong_shape = base64.urlsafe_b64encode(b'{"id": 1}').decode()
+    assert client.get("/api/flights", params={"after": wrong_shape}).status_code == 400
+    # Right length, wrong element types: a bad comparison, not a 500.
+    for values in ([{"a": 1}], ["1"], [1.5], [True], [[1]]):
+        cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        assert client.get("/api/flights", params={"after": cursor}).status_code == 400, values
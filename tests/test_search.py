@@ -0,0 +1,70 @@
+import itertools
+
+import pytest
+
+from app.models import sqlite_has_fts5_trigram
+
+
+def company_payload(name="SearchCo"):
+    return {"code": "SRC", "name": name, "country": "Ireland", "email": "info@search.com", "phone": "01234567"}
+
+def flight_payload(company_id, flight_id, origin, destination):
+    return {"name": f"{origin}-{destination}", "flight_id": flight_id, "origin": origin, "destination": destination, "departure_time": "10:30", "arrival_time": "12:00", "departure_date": "20-11-2025", "arrival_date": "20-11-2025", "price": "€100", "company_id": company_id}
+
+# The test database is shared, so every fixture run gets its own place names.
+_run = itertools.count(1)
+
+@pytest.fixture
+def route_ids(client):
+    c = client.post("/api/companies", json=company_payload())
+    assert c.status_code == 201
+    cid = c.json()["company_id"]
+    n = next(_run)
+    ids = {"n": n}
+    for fid, origin, destination in [
+        ("F7000001", f"Shannon{n}", f"Boston Logan{n}"),
+        ("F7000002", f"  SHANNON{n} ", f"Bordeaux{n}"),
+        ("F7000003", f"Cork{n}", f"Boston Logan{n}"),
+    ]:
+        r = client.post("/api/flights", json=flight_payload(cid, fid, origin, destination))
+        assert r.status_code == 201
+        ids[fid] = r.json()["id"]
+    return ids
+
+def search_ids(client, **params):
+    r = client.get("/api/flights/search", params=params)
+    assert r.status_code == 200
+    return {f["id"] for f in r.json()}
+
+def test_search_exact_is_case_and_space_insensitive(client, route_ids):
+    found = search_ids(client, origin=f"shannon{route_ids['n']}", match="exact")
+    assert found == {route_ids["F7000001"], route_ids["F7000002"]}
+
+def test_search_prefix_is_default(client, route_ids):
+    found = search_ids(client, origin=f"shannon{route_ids['n']}", destination="bo")
+    assert found == {route_ids["F7000001"], route_ids["F7000002"]}
+    assert route_ids["F7000001"] in search_ids(client, origin="shan")
+
+def test_search_prefix_does_not_match_substrings(client, route_ids):
+    assert search_ids(client, destination=f"logan{route_ids['n']}", match="prefix") == set()
+
+def test_search_prefix_of_the_last_code_point(client, route_ids):
+    assert search_ids(client, origin="\U0010ffff") == set()
+    assert search_ids(client, origin=f"shannon{route_ids['n']}\U0010ffff\U0010ffff") == set()
+
+def test_search_fuzzy_matches_substrings(client, route_ids):
+    found = search_ids(client, destination=f"logan{route_ids['n']}", match="fuzzy")
+    assert found == {route_ids["F7000001"], route_ids["F7000003"]}
+
+def test_search_fuzzy_sees_updated_routes(client, route_ids):
+    fid = route_ids["F7000003"]
+    r = client.patch(f"/api/flights/{fid}", json={"destination": "Bordeaux Merignac"})
+    assert r.status_code == 200
+    assert fid in search_ids(client, destination="merignac", match="fuzzy")
+    assert fid not in search_ids(client, destination=f"logan{route_ids['n']}", match="fuzzy")
+
+@pytest.mark.skipif(not sqlite_has_fts5_trigram(), reason="SQLite built without FTS5 trigram")
+def test_search_fuzzy_index_dropped_on_delete(client, route_ids):
+    fid = route_ids["F7000002"]
+    assert client.delete(f"/api/flights/{fid}").status_code == 204
+    assert fid not in search_ids(client, destination=f"deaux{route_ids['n']}", match="fuzzy")